@@ -1,45 +1,146 @@
 import sys
 import argparse
 import os
-from src.lexer import Lexer
-from src.tokens import TokenType
+from src.lexer import LEXERS, tokenize_file
+from src.tokens import TokenStore
+from src.symbols import SymbolTable
 from src.parser import Parser
+from src.callgraph import prune_unreachable
+from src.unroll import UNROLL_BUDGET
+from src.inliner import INLINE_BUDGET
+from src.ctfe import CTFE_BUDGET
+from src.options import CompileOptions, resolve_options
+from src.pass_manager import PassManager, build_pipeline
+from src.parallel_parser import parse_parallel
 from src.semantic_analysis import SemanticAnalyzer, SemanticError
 from src.desugaring import Desugarer
-from src.optimizer import Optimizer
+from src.middle_end import FusedMiddleEnd
+from src.hashcons import HashConsFactory
+from src.serialization import SerializationError, cache_path, load, save
 from src.codegen import LLVMCodeGen
+import src.ast_nodes as ast
 
-def get_all_tokens(lexer):
-    tokens = []
-    while True:
-        tok = lexer.get_next_token()
-        if tok.type == TokenType.EOF:
-            break
-        tokens.append(tok)
-    return tokens
-
-def compile_source(source_code, debug=False):
+def compile_source(source_code, options=None, **overrides):
+    # options: CompileOptions; gli argomenti con il nome di un campo la modificano
+    options = resolve_options(options, overrides)
     print(f"[INFO] Avvio compilazione...")
+    warn_ignored(options.ignored())
+    # Tabella dei simboli condivisa da tutte le fasi della compilazione
+    symbols = SymbolTable()
+    # Con hash_cons le espressioni uguali sono un unico nodo condiviso
+    exprs = HashConsFactory() if options.hash_cons else None
+
+    # Con la cache l'AST di un sorgente già visto viene caricato senza lexing né parsing.
+    # Il parsing pigro produce un AST parziale e non usa la cache.
+    path = cache_path(options.ast_cache, source_code) if options.ast_cache and not options.lazy else None
+    if path and os.path.exists(path):
+        try:
+            ast_root = load(path, symbols)
+            if options.debug:
+                print(f"[DEBUG] Cache AST: caricato {path}")
+            return compile_ast(ast_root, symbols, options, exprs)
+        except (OSError, SerializationError) as e:
+            print(f"[AVVISO] Cache AST non valida, il sorgente viene rianalizzato: {e}")
+            symbols = SymbolTable()
+
     try:
-        lexer = Lexer(source_code)
-        tokens = get_all_tokens(lexer)
-        if debug:
+        lexer = LEXERS[options.lexer_kind](source_code, symbols)
+        tokens = TokenStore.from_tokens(lexer.tokenize(), source_code, symbols)
+        if options.debug:
             print(f"[DEBUG] Lexer: Trovati {len(tokens)} token.")
     except Exception as e:
         print(f"[ERRORE] Lexer: {e}")
         return None
 
+    ast_root = parse_tokens(tokens, options, line_index=tokens.line_index, symbols=symbols, exprs=exprs)
+    if ast_root is None:
+        return None
+    if path:
+        # L'AST va salvato prima del middle end, che lo modifica sul posto
+        try:
+            os.makedirs(options.ast_cache, exist_ok=True)
+            save(ast_root, path)
+            if options.debug:
+                print(f"[DEBUG] Cache AST: salvato {path}")
+        except OSError as e:
+            print(f"[AVVISO] Impossibile scrivere la cache AST: {e}")
+    return compile_ast(ast_root, symbols, options, exprs)
+
+def compile_tokens(tokens, options=None, line_index=None, symbols=None, **overrides):
+    # tokens può essere una lista, un TokenStore o un generatore (lexing in streaming)
+    options = resolve_options(options, overrides)
+    warn_ignored(options.ignored(pretokenized=True, streaming=not isinstance(tokens, TokenStore)))
+    if symbols is None:
+        symbols = SymbolTable()
+    exprs = HashConsFactory() if options.hash_cons else None
+    ast_root = parse_tokens(tokens, options, line_index=line_index, symbols=symbols, exprs=exprs)
+    if ast_root is None:
+        return None
+    return compile_ast(ast_root, symbols, options, exprs)
+
+def warn_ignored(messages):
+    for message in messages:
+        print(f"[AVVISO] {message}")
+
+def parse_tokens(tokens, options, line_index=None, symbols=None, exprs=None):
+    debug, lazy, exports, jobs = options.debug, options.lazy, options.exports, options.jobs
     try:
-        parser = Parser(tokens)
-        ast_root = parser.parse()
+        if jobs != 1 and not lazy and isinstance(tokens, TokenStore):
+            # Dichiarazioni globali analizzate in parallelo (jobs=0: tutti i core)
+            ast_root = parse_parallel(tokens, jobs, line_index=line_index, symbols=symbols, exprs=exprs)
+        else:
+            parser = Parser(tokens, line_index=line_index, symbols=symbols, lazy=lazy, exprs=exprs)
+            ast_root = parser.parse()
+        if lazy:
+            # Solo i corpi raggiungibili da main (e dalle funzioni esportate) vengono analizzati
+            removed = prune_unreachable(ast_root, ['main', *exports])
+            if debug:
+                print(f"[DEBUG] Parser: {parser.bodies_parsed} corpi analizzati, "
+                      f"{len(removed)} funzioni non raggiungibili scartate.")
         if debug:
             print("[DEBUG] Parser: AST costruito con successo.")
     except Exception as e:
         print(f"[ERRORE] Parser: {e}")
         return None
+    return ast_root
 
+def compile_ast(ast_root, symbols, options=None, exprs=None):
+    options = options or CompileOptions()
+    debug = options.debug
+    if options.fused:
+        ast_root = fused_middle_end(ast_root, symbols, debug, exprs)
+    else:
+        ast_root = middle_end(ast_root, symbols, debug, exprs)
+    if ast_root is None:
+        return None
+
+    # Dopo la semantica (gli errori nelle funzioni inutilizzate restano segnalati):
+    # eliminazione delle funzioni irraggiungibili e passi di ottimizzazione
+    manager = PassManager(build_pipeline(options, exprs))
     try:
-        desugarer = Desugarer()
+        manager.run(ast_root)
+    except Exception as e:
+        print(f"[ERRORE] Ottimizzazione ({manager.stats.current}): {e}")
+        return None
+    if debug or options.stats:
+        for line in manager.stats.report():
+            print(f"[STATISTICHE] {line}")
+    if debug and exprs is not None:
+        print(f"[DEBUG] Hash-consing: {len(exprs.table)} espressioni distinte, "
+              f"{exprs.hits} costruzioni riusate.")
+
+    try:
+        codegen = LLVMCodeGen(symbols)
+        llvm_ir = codegen.generate_code(ast_root)
+        print("[INFO] Generazione Codice completata.")
+        return str(llvm_ir)
+    except Exception as e:
+        print(f"[ERRORE] CodeGen: {e}")
+        return None
+
+def middle_end(ast_root, symbols, debug=False, exprs=None):
+    try:
+        desugarer = Desugarer(symbols, exprs)
         ast_root = desugarer.visit(ast_root)
         if debug:
             print("[DEBUG] Desugaring: Zucchero sintattico rimosso.")
@@ -48,7 +149,7 @@ def compile_source(source_code, debug=False):
         return None
 
     try:
-        analyzer = SemanticAnalyzer()
+        analyzer = SemanticAnalyzer(symbols)
         analyzer.visit(ast_root)
         if debug:
             print("[DEBUG] Semantic Analysis: Nessun errore rilevato.")
@@ -56,29 +157,67 @@ def compile_source(source_code, debug=False):
         print(f"[ERRORE] Semantica: {e}")
         return None
 
+    return ast_root
+
+def fused_middle_end(ast_root, symbols, debug=False, exprs=None):
+    # Desugaring, semantica e constant folding in un'unica visita dell'AST
     try:
-        optimizer = Optimizer()
-        ast_root = optimizer.visit(ast_root)
+        ast_root = FusedMiddleEnd(symbols, exprs).visit(ast_root)
         if debug:
-            print("[DEBUG] Optimizer: Costanti pre-calcolate.")
-    except Exception as e:
-        print(f"[ERRORE] Optimizer: {e}")
+            print("[DEBUG] Middle end: desugaring, semantica e ottimizzazione in una sola visita.")
+    except SemanticError as e:
+        print(f"[ERRORE] Semantica: {e}")
         return None
-
-    try:
-        codegen = LLVMCodeGen()
-        llvm_ir = codegen.generate_code(ast_root)
-        print("[INFO] Generazione Codice completata.")
-        return str(llvm_ir)
     except Exception as e:
-        print(f"[ERRORE] CodeGen: {e}")
+        print(f"[ERRORE] Middle end: {e}")
         return None
+    return ast_root
 
 def main():
     parser = argparse.ArgumentParser(description="Compilatore MiniLang -> LLVM IR")
     parser.add_argument('input_file', help="Il file sorgente da compilare")
     parser.add_argument('-o', '--output', help="Nome del file di output (.ll)", default="output.ll")
     parser.add_argument('--debug', action='store_true', help="Stampa messaggi di debug delle fasi")
+    parser.add_argument('--lexer', choices=sorted(LEXERS), default='regex',
+                        help="Implementazione del lexer (default: regex)")
+    parser.add_argument('--stream', action='store_true',
+                        help="Lexing in streaming dal file mappato in memoria (mmap)")
+    parser.add_argument('--lazy', action='store_true',
+                        help="Analizza solo i corpi delle funzioni raggiungibili da main")
+    parser.add_argument('--export', action='append', default=[], metavar='NOME',
+                        help="Funzione usata dall'esterno, radice aggiuntiva per --lazy e --prune")
+    parser.add_argument('--prune', action='store_true',
+                        help="Elimina le funzioni non raggiungibili da main e dalle --export")
+    parser.add_argument('--fused', action='store_true',
+                        help="Desugaring, semantica e ottimizzazione in un'unica visita dell'AST")
+    parser.add_argument('-j', '--jobs', type=int, default=1, metavar='N',
+                        help="Processi per il parsing delle dichiarazioni globali (0: tutti i core)")
+    parser.add_argument('--ast-cache', metavar='DIR',
+                        help="Directory in cui salvare e riusare l'AST dei sorgenti già analizzati")
+    parser.add_argument('--hash-cons', action='store_true',
+                        help="Condivide le sottoespressioni uguali in un unico nodo dell'AST")
+    parser.add_argument('--icf', action='store_true',
+                        help="Unisce le funzioni con corpo identico (lambda comprese)")
+    parser.add_argument('-O', dest='opt_level', type=int, choices=(0, 1, 2), default=1,
+                        help="Livello di ottimizzazione: -O0 nessuna, -O1 (default) folding e propagazione "
+                             "delle costanti al punto fisso, -O2 anche valutazione delle chiamate pure, "
+                             "inlining, LICM, CSE, srotolamento e unione delle funzioni identiche")
+    parser.add_argument('--stats', action='store_true',
+                        help="Stampa tempi e contatori di ciascun passo di ottimizzazione")
+    parser.add_argument('--unroll-budget', type=int, default=UNROLL_BUDGET, metavar='N',
+                        help=f"Nodi dell'AST per srotolare un repeat a conteggio costante "
+                             f"(solo con -O2, altrimenti ignorato con un avviso; 0: disattivato, "
+                             f"default: {UNROLL_BUDGET})")
+    parser.add_argument('--inline-budget', type=int, default=INLINE_BUDGET, metavar='N',
+                        help=f"Nodi dell'AST oltre i quali una funzione non viene espansa nei "
+                             f"chiamanti (solo con -O2; 0: disattivato, default: {INLINE_BUDGET})")
+    parser.add_argument('--ctfe-budget', type=int, default=CTFE_BUDGET, metavar='N',
+                        help=f"Istruzioni eseguibili per valutare a compile time una chiamata pura "
+                             f"con argomenti costanti (solo con -O2; 0: disattivato, default: {CTFE_BUDGET})")
+    parser.add_argument('--no-licm', dest='licm', action='store_false',
+                        help="Non sposta le espressioni invarianti fuori dai cicli (solo con -O2)")
+    parser.add_argument('--no-cse', dest='cse', action='store_false',
+                        help="Non elimina le sottoespressioni comuni (solo con -O2)")
 
     args = parser.parse_args()
 
@@ -86,10 +225,21 @@ def main():
         print(f"Errore: Il file '{args.input_file}' non esiste.")
         sys.exit(1)
 
-    with open(args.input_file, 'r') as f:
-        source_code = f.read()
+    options = CompileOptions(debug=args.debug, stats=args.stats, lexer_kind=args.lexer, lazy=args.lazy,
+                             exports=tuple(args.export), jobs=args.jobs, ast_cache=args.ast_cache,
+                             hash_cons=args.hash_cons, fused=args.fused, prune=args.prune, icf=args.icf,
+                             opt_level=args.opt_level, unroll_budget=args.unroll_budget,
+                             inline_budget=args.inline_budget, ctfe_budget=args.ctfe_budget,
+                             licm=args.licm, cse=args.cse)
 
-    llvm_result = compile_source(source_code, debug=args.debug)
+    if args.stream:
+        print(f"[INFO] Avvio compilazione...")
+        symbols = SymbolTable()
+        llvm_result = compile_tokens(tokenize_file(args.input_file, symbols), options, symbols=symbols)
+    else:
+        with open(args.input_file, 'r') as f:
+            source_code = f.read()
+        llvm_result = compile_source(source_code, options)
 
     if llvm_result:
         with open(args.output, 'w') as f:
@@ -0,0 +1,60 @@
+import dataclasses
+import gc
+import sys
+import tracemalloc
+from src.lexer import RegexLexer
+from src.parser import Parser
+import src.ast_nodes as ast
+from benchmarks.generate import generate_program
+
+
+def dict_classes():
+    # Gemelli dei nodi come dataclass senza __slots__ (rappresentazione precedente)
+    mirrors = {}
+    for name in dir(ast):
+        cls = getattr(ast, name)
+        if isinstance(cls, type) and issubclass(cls, ast.ASTNode) and cls is not ast.LazyBlock:
+            specs = [(f.name, f.type, dataclasses.field(default=f.default))
+                     if f.default is not dataclasses.MISSING else (f.name, f.type)
+                     for f in dataclasses.fields(cls)]
+            mirrors[cls] = dataclasses.make_dataclass(name, specs)
+    return mirrors
+
+
+def convert(node, mirrors):
+    # Copia iterativa dell'albero nei gemelli con __dict__
+    def copy(value):
+        if isinstance(value, ast.ASTNode):
+            return convert(value, mirrors)
+        if isinstance(value, list):
+            return [copy(item) for item in value]
+        return value
+    return mirrors[type(node)](*[copy(getattr(node, name)) for name in ast.field_names(type(node))])
+
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return current, result
+
+
+def main():
+    n_funcs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    source = generate_program(n_funcs)
+    tokens = list(RegexLexer(source).tokenize())
+    mirrors = dict_classes()
+
+    slotted, program = measure(lambda: Parser(tokens).parse())
+    n_nodes = sum(1 for _ in ast.walk(program))
+    with_dict, _ = measure(lambda: convert(program, mirrors))
+    print(f"{n_nodes} nodi")
+    print(f"  dataclass con __dict__: {with_dict / 2**20:.1f} MB ({with_dict / n_nodes:.0f} B/nodo)")
+    print(f"  dataclass con __slots__: {slotted / 2**20:.1f} MB ({slotted / n_nodes:.0f} B/nodo)")
+    print(f"  riduzione: {with_dict / slotted:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
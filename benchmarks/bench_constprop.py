@@ -0,0 +1,71 @@
+import contextlib
+import io
+import sys
+import time
+import aether
+from src.lexer import RegexLexer
+from src.parser import Parser
+from src.symbols import SymbolTable
+from src.codegen import LLVMCodeGen
+from src.pass_manager import PassManager, EffectsPass, FoldPass, ConstPropPass
+from benchmarks.generate import generate_program
+
+# Funzioni con parametri di configurazione legati a 'let' e copie di variabili
+FUNC_TEMPLATE = """func step_{i}(a) {{
+    let scale = {k};
+    let limit = scale * 4;
+    let debug = 0;
+    let b = a;
+    let offset = b + scale;
+    if (debug) {{ print_result(offset); }}
+    if (limit > 10) {{ offset = offset * 2; }} else {{ offset = offset - 1; }}
+    let total = 0;
+    let i = 0;
+    while (i < limit) {{
+        total = total + offset + scale;
+        i = i + 1;
+    }}
+    return total;
+}}
+
+"""
+
+
+def generate(n_funcs):
+    parts = ["extern func print_result(n);\n\n"]
+    for i in range(n_funcs):
+        parts.append(FUNC_TEMPLATE.format(i=i, k=i % 7 + 1))
+    calls = "".join(f"    v = v + step_{i}(v);\n" for i in range(n_funcs))
+    parts.append(f"func main() {{\n    let v = 1;\n{calls}    return v;\n}}\n")
+    return "".join(parts)
+
+
+def compile_ir(source, passes):
+    symbols = SymbolTable()
+    with contextlib.redirect_stdout(io.StringIO()):
+        program = Parser(list(RegexLexer(source, symbols).tokenize()), symbols=symbols).parse()
+        program = aether.middle_end(program, symbols)
+        start = time.perf_counter()
+        PassManager(passes).run(program)
+        elapsed = time.perf_counter() - start
+        llvm_ir = str(LLVMCodeGen(symbols).generate_code(program))
+    return llvm_ir, elapsed
+
+
+def report(label, source):
+    folded, folded_time = compile_ir(source, [EffectsPass(), FoldPass()])
+    propagated, propagated_time = compile_ir(source, [EffectsPass(), FoldPass(), ConstPropPass()])
+    counts = [(ir.count(" = load "), ir.count("  store "), ir.count(" br ")) for ir in (folded, propagated)]
+    (loads, stores, branches), (loads_cp, stores_cp, branches_cp) = counts
+    print(f"{label}: load {loads} -> {loads_cp}, store {stores} -> {stores_cp}, "
+          f"salti {branches} -> {branches_cp}, ottimizzazione {folded_time:.3f}s -> {propagated_time:.3f}s")
+
+
+def main():
+    n_funcs = int(sys.argv[1]) if len(sys.argv) > 1 else 300
+    report(f"{n_funcs} funzioni di calcolo", generate_program(n_funcs))
+    report(f"{n_funcs} funzioni con costanti", generate(n_funcs))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+import contextlib
+import ctypes
+import io
+import sys
+import time
+import llvmlite.binding as llvm
+import aether
+
+# Ciclo caldo il cui corpo ripete sottoespressioni che dipendono dal contatore
+# (e quindi non escono dal ciclo): un polinomio e una distanza al quadrato
+SOURCE = """
+func work(a, b, n) {{
+    let s = 0;
+    let i = 0;
+    while (i < n) {{
+        let x = (i * a + b) * (i * a + b) - (i * a + b);
+        let d = (x - i * b) * (x - i * b) + (x - i * b) / 3;
+        s = s + x * d - (i * a + b) * (x - i * b);
+        i = i + 1;
+    }}
+    return s;
+}}
+func main() {{
+    return work(3, 2, {n});
+}}
+"""
+
+REPEATS = 5
+
+
+def run(source, cse):
+    # Inlining e CTFE disattivati: renderebbero costanti i parametri di work
+    with contextlib.redirect_stdout(io.StringIO()):
+        llvm_ir = aether.compile_source(source, opt_level=2, cse=cse, inline_budget=0, ctfe_budget=0)
+    loop = llvm_ir.split("while_cond:")[1].split("while_after:")[0]
+    instructions = sum(1 for line in loop.splitlines() if line.startswith("  "))
+    module = llvm.parse_assembly(llvm_ir.replace("x86_64-pc-windows-gnu", llvm.get_process_triple()))
+    # Nessuna ottimizzazione di LLVM: conta solo la forma dell'IR emesso
+    machine = llvm.Target.from_default_triple().create_target_machine(opt=0)
+    engine = llvm.create_mcjit_compiler(module, machine)
+    engine.finalize_object()
+    main = ctypes.CFUNCTYPE(ctypes.c_int64)(engine.get_function_address("main"))
+    # Migliore di REPEATS esecuzioni
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = main()
+        best = min(best, time.perf_counter() - start)
+    return result, instructions, best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    llvm.initialize_native_target()
+    llvm.initialize_native_asmprinter()
+    source = SOURCE.format(n=n)
+    expected, plain_size, plain_time = run(source, False)
+    result, eliminated_size, eliminated_time = run(source, True)
+    assert result == expected
+    print(f"{n} iterazioni, LLVM -O0: istruzioni nel ciclo {plain_size} -> {eliminated_size}, "
+          f"esecuzione {plain_time:.3f}s -> {eliminated_time:.3f}s ({plain_time / eliminated_time:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import contextlib
+import ctypes
+import io
+import sys
+import time
+import llvmlite.binding as llvm
+import aether
+from src.ctfe import CTFE_BUDGET
+
+# Funzioni pure chiamate con argomenti costanti: una ricorsione esponenziale,
+# che a compile time costa un passo per argomento grazie alla cache, e un
+# ciclo che calcola una tabella di valori
+SOURCE = """
+func fib(n) {{
+    if (n < 2) {{ return n; }}
+    return fib(n - 1) + fib(n - 2);
+}}
+func checksum(n) {{
+    let s = 0;
+    let i = 0;
+    while (i < n) {{ s = s * 31 + i; i = i + 1; }}
+    return s;
+}}
+func main() {{
+    return fib({n}) + checksum(500);
+}}
+"""
+
+REPEATS = 5
+
+
+def run(source, budget):
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        llvm_ir = aether.compile_source(source, opt_level=2, ctfe_budget=budget)
+    compile_time = time.perf_counter() - start
+    module = llvm.parse_assembly(llvm_ir.replace("x86_64-pc-windows-gnu", llvm.get_process_triple()))
+    machine = llvm.Target.from_default_triple().create_target_machine(opt=0)
+    engine = llvm.create_mcjit_compiler(module, machine)
+    engine.finalize_object()
+    main = ctypes.CFUNCTYPE(ctypes.c_int64)(engine.get_function_address("main"))
+    # Migliore di REPEATS esecuzioni
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = main()
+        best = min(best, time.perf_counter() - start)
+    return result, compile_time, best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 30
+    llvm.initialize_native_target()
+    llvm.initialize_native_asmprinter()
+    source = SOURCE.format(n=n)
+    expected, plain_compile, plain_time = run(source, 0)
+    result, ctfe_compile, ctfe_time = run(source, CTFE_BUDGET)
+    assert result == expected
+    print(f"fib({n}) + checksum(500), LLVM -O0: compilazione {plain_compile:.3f}s -> {ctfe_compile:.3f}s, "
+          f"esecuzione {plain_time * 1000:.2f}ms -> {ctfe_time * 1000:.4f}ms")
+
+
+if __name__ == "__main__":
+    main()
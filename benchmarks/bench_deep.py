@@ -0,0 +1,48 @@
+import sys
+import time
+from src.lexer import RegexLexer
+from src.parser import Parser
+from src.desugaring import Desugarer
+from src.semantic_analysis import SemanticAnalyzer
+from src.optimizer import Optimizer
+from src.codegen import LLVMCodeGen
+
+
+def chain_program(kind, depth):
+    if kind == "binaria":
+        return "func main() { let a = 1; return " + " + ".join(["a"] * depth) + "; }"
+    return "func main() { let a = 1; return " + "-" * depth + "a; }"
+
+
+def phases(source):
+    timings = []
+
+    def timed(name, fn):
+        start = time.perf_counter()
+        result = fn()
+        timings.append((name, time.perf_counter() - start))
+        return result
+
+    tokens = timed("lexer", lambda: list(RegexLexer(source).tokenize()))
+    program = timed("parser", lambda: Parser(tokens).parse())
+    program = timed("desugar", lambda: Desugarer().visit(program))
+    timed("semantica", lambda: SemanticAnalyzer().visit(program))
+    program = timed("optimizer", lambda: Optimizer().visit(program))
+    timed("codegen", lambda: LLVMCodeGen().generate_code(program))
+    return timings
+
+
+def main():
+    max_depth = int(sys.argv[1]) if len(sys.argv) > 1 else 100000
+    print(f"limite di ricorsione di Python: {sys.getrecursionlimit()}")
+    for kind in ("binaria", "unaria"):
+        depth = 1000
+        while depth <= max_depth:
+            timings = phases(chain_program(kind, depth))
+            detail = "  ".join(f"{name} {elapsed:.3f}s" for name, elapsed in timings)
+            print(f"{kind:>8} profondità {depth:>8}: {detail}")
+            depth *= 10
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,26 @@
+import sys
+from src.lexer import RegexLexer
+from src.parser import Parser
+from src.hashcons import HashConsFactory
+from benchmarks.generate import generate_program, generate_expression_program
+from benchmarks.bench_ast_memory import measure
+
+
+def compare(label, source):
+    tokens = list(RegexLexer(source).tokenize())
+    plain, _ = measure(lambda: Parser(tokens).parse())
+    factory = HashConsFactory()
+    shared, _ = measure(lambda: (Parser(tokens, exprs=factory).parse(), factory))
+    print(f"{label}: AST {plain / 2**20:.1f} MB -> {shared / 2**20:.1f} MB con hash-consing "
+          f"({plain / shared:.2f}x), {len(factory.table)} espressioni distinte, "
+          f"{factory.hits} riusate")
+
+
+def main():
+    n_funcs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    compare("Funzioni", generate_program(n_funcs))
+    compare("Espressioni", generate_expression_program(n_funcs // 10))
+
+
+if __name__ == "__main__":
+    main()
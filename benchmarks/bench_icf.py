@@ -0,0 +1,75 @@
+import contextlib
+import io
+import sys
+import time
+import llvmlite.binding as llvm
+import aether
+
+# Sorgente ricco di lambda: poche forme distinte ripetute in ogni funzione,
+# e funzioni di supporto duplicate con nomi diversi
+SHAPES = ("(q) => q * 2 + 1", "(q) => q - 3", "(q) => q * q", "(q) => -q + 7")
+
+FUNC_TEMPLATE = """func helper_{i}(a, b) {{
+    let s = a * b;
+    if (s > 100) {{ return s - a; }}
+    return s + b;
+}}
+
+func work_{i}(x) {{
+    let y = x |> {shape_a};
+    let z = y |> {shape_b};
+    return helper_{i}(y, z);
+}}
+
+"""
+
+DEFINE = "\ndefine "
+NEWLINE = "\n"
+
+
+def generate(n_funcs):
+    parts = ["extern func print_result(n);\n\n"]
+    for i in range(n_funcs):
+        parts.append(FUNC_TEMPLATE.format(i=i, shape_a=SHAPES[i % len(SHAPES)],
+                                          shape_b=SHAPES[(i // len(SHAPES)) % len(SHAPES)]))
+    calls = "".join(f"    print_result(work_{i}({i}));\n" for i in range(n_funcs))
+    parts.append(f"func main() {{\n{calls}    return 0;\n}}\n")
+    return "".join(parts)
+
+
+def compile_ir(source, icf):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        llvm_ir = aether.compile_source(source, icf=icf)
+        return llvm_ir, time.perf_counter() - start
+
+
+def llvm_stats(llvm_ir):
+    # Parsing dell'IR, verifica ed emissione del file oggetto
+    machine = llvm.Target.from_default_triple().create_target_machine()
+    start = time.perf_counter()
+    module = llvm.parse_assembly(llvm_ir)
+    module.verify()
+    obj = machine.emit_object(module)
+    return time.perf_counter() - start, len(obj)
+
+
+def main():
+    n_funcs = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    llvm.initialize_native_target()
+    llvm.initialize_native_asmprinter()
+    source = generate(n_funcs)
+    full, full_time = compile_ir(source, icf=False)
+    folded, folded_time = compile_ir(source, icf=True)
+    full_llvm, full_size = llvm_stats(full)
+    folded_llvm, folded_size = llvm_stats(folded)
+    print(f"{n_funcs} funzioni, {2 * n_funcs} lambda: "
+          f"{full.count(DEFINE)} -> {folded.count(DEFINE)} funzioni, "
+          f"IR {full.count(NEWLINE)} -> {folded.count(NEWLINE)} righe")
+    print(f"compilazione {full_time:.3f}s -> {folded_time:.3f}s  "
+          f"LLVM {full_llvm:.3f}s -> {folded_llvm:.3f}s ({full_llvm / folded_llvm:.2f}x)  "
+          f"oggetto {full_size} -> {folded_size} byte")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,70 @@
+import contextlib
+import ctypes
+import io
+import sys
+import time
+import llvmlite.binding as llvm
+import aether
+from src.inliner import INLINE_BUDGET
+
+# Funzioni piccole chiamate in un ciclo caldo: una con più return che
+# seleziona l'operazione (costante in ogni punto di chiamata) e una lambda
+SOURCE = """
+func calculate(op, a, b) {{
+    if (op == 1) {{ return a + b; }}
+    if (op == 2) {{ return a - b; }}
+    if (op == 3) {{ return a * b; }}
+    return a / b;
+}}
+func main() {{
+    let s = 0;
+    let i = 0;
+    while (i < {n}) {{
+        s = calculate(1, s, i);
+        s = calculate(3, s, 3);
+        s = calculate(4, s, 2);
+        s = calculate(2, s, i / 7) |> (q) => q - q / 1000003 * 1000003;
+        i = i + 1;
+    }}
+    return s;
+}}
+"""
+
+REPEATS = 5
+
+
+def run(source, budget):
+    with contextlib.redirect_stdout(io.StringIO()):
+        llvm_ir = aether.compile_source(source, opt_level=2, inline_budget=budget)
+    calls = llvm_ir.count(" call ")
+    instructions = sum(1 for line in llvm_ir.splitlines() if line.startswith("  "))
+    module = llvm.parse_assembly(llvm_ir.replace("x86_64-pc-windows-gnu", llvm.get_process_triple()))
+    # Nessuna ottimizzazione di LLVM: conta solo la forma dell'IR emesso
+    machine = llvm.Target.from_default_triple().create_target_machine(opt=0)
+    engine = llvm.create_mcjit_compiler(module, machine)
+    engine.finalize_object()
+    main = ctypes.CFUNCTYPE(ctypes.c_int64)(engine.get_function_address("main"))
+    # Migliore di REPEATS esecuzioni
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = main()
+        best = min(best, time.perf_counter() - start)
+    return result, calls, instructions, best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 5000000
+    llvm.initialize_native_target()
+    llvm.initialize_native_asmprinter()
+    source = SOURCE.format(n=n)
+    expected, plain_calls, plain_size, plain_time = run(source, 0)
+    result, inlined_calls, inlined_size, inlined_time = run(source, INLINE_BUDGET)
+    assert result == expected
+    print(f"{n} iterazioni, LLVM -O0: chiamate {plain_calls} -> {inlined_calls}, "
+          f"istruzioni IR {plain_size} -> {inlined_size}, "
+          f"esecuzione {plain_time:.3f}s -> {inlined_time:.3f}s ({plain_time / inlined_time:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+import gc
+import sys
+import time
+from src.lexer import RegexLexer
+from src.parser import Parser
+from src.desugaring import Desugarer
+from src.semantic_analysis import SemanticAnalyzer
+from src.codegen import LLVMCodeGen
+from src.symbols import SymbolTable
+from benchmarks.generate import generate_variable_program
+
+
+def front_end(source, symbols):
+    tokens = list(RegexLexer(source, symbols).tokenize())
+    program = Parser(tokens, symbols=symbols).parse()
+    return Desugarer(symbols).visit(program)
+
+
+def timed(fn, repeat=5):
+    best = float('inf')
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            fn()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return best
+
+
+def main():
+    n_funcs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    n_vars = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    source = generate_variable_program(n_funcs, n_vars)
+    print(f"{n_funcs} funzioni x {n_vars} variabili")
+
+    # Id assegnati dal lexer e condivisi con tutte le fasi
+    symbols = SymbolTable()
+    shared = front_end(source, symbols)
+    # Nessuna tabella condivisa: ogni fase interna i nomi al momento dell'uso
+    local = front_end(source, None)
+
+    local_sema = timed(lambda: SemanticAnalyzer().visit(local))
+    shared_sema = timed(lambda: SemanticAnalyzer(symbols).visit(shared))
+    local_codegen = timed(lambda: LLVMCodeGen().visit(local))
+    shared_codegen = timed(lambda: LLVMCodeGen(symbols).visit(shared))
+
+    print(f"{'':>22}{'id dal lexer':>14}{'interning locale':>18}")
+    print(f"{'Analisi semantica':>22}{shared_sema:>13.3f}s{local_sema:>17.3f}s")
+    print(f"{'CodeGen (visita)':>22}{shared_codegen:>13.3f}s{local_codegen:>17.3f}s")
+    print(f"Simboli distinti: {len(symbols)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,41 @@
+import gc
+import sys
+import time
+from src.lexer import RegexLexer
+from src.tokens import TokenStore
+from src.parser import Parser
+from src.callgraph import prune_unreachable
+from benchmarks.generate import generate_program
+
+
+def parse(store, lazy, repeat=3):
+    # Il tempo pigro include la visita di raggiungibilità che materializza i corpi
+    best = float('inf')
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            parser = Parser(store, lazy=lazy)
+            program = parser.parse()
+            if lazy:
+                prune_unreachable(program)
+            best = min(best, time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return best, parser.bodies_parsed, program
+
+
+def main():
+    n_funcs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    for percent in (5, 25, 100):
+        n_called = n_funcs * percent // 100
+        source = generate_program(n_funcs, n_called)
+        store = TokenStore.from_tokens(RegexLexer(source).tokenize(), source)
+        eager, _, _ = parse(store, lazy=False)
+        lazy, parsed, _ = parse(store, lazy=True)
+        print(f"{percent:>3}% raggiunte: parsing completo {eager:.3f}s  "
+              f"pigro {lazy:.3f}s ({parsed} corpi su {2 * n_funcs + 1})  ({eager / lazy:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import sys
+import time
+from src.lexer import Lexer, RegexLexer
+from src.tokens import TokenType
+from benchmarks.generate import generate_program
+
+
+def drain(lexer):
+    count = 0
+    for tok in lexer.tokenize():
+        if tok.type == TokenType.EOF:
+            break
+        count += 1
+    return count
+
+
+def bench(lexer_cls, source, repeat=3):
+    best = float('inf')
+    count = 0
+    for _ in range(repeat):
+        start = time.perf_counter()
+        count = drain(lexer_cls(source))
+        best = min(best, time.perf_counter() - start)
+    return best, count
+
+
+def main():
+    n_funcs = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    source = generate_program(n_funcs)
+    size_mb = len(source) / (1024 * 1024)
+    print(f"Sorgente: {n_funcs} funzioni, {size_mb:.2f} MB")
+
+    results = {}
+    for name, cls in (('manual', Lexer), ('regex', RegexLexer)):
+        elapsed, count = bench(cls, source)
+        results[name] = elapsed
+        print(f"{name:>8}: {elapsed:.3f}s  {count} token  {size_mb / elapsed:.2f} MB/s")
+
+    print(f"Speedup regex/manual: {results['manual'] / results['regex']:.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+import contextlib
+import ctypes
+import io
+import sys
+import time
+import llvmlite.binding as llvm
+import aether
+
+# Ciclo caldo con una condizione e un corpo che ricalcolano a ogni iterazione
+# espressioni sui parametri, che il ciclo non modifica
+SOURCE = """
+func scale(x) {{ return x * 3 + 1; }}
+func work(a, b, n) {{
+    let s = 0;
+    let i = 0;
+    while (i < n * a - b) {{
+        s = s + (a * b - scale(a)) * i + (b * b + a) / 7;
+        i = i + 1;
+    }}
+    return s;
+}}
+func main() {{
+    return work(3, 2, {n});
+}}
+"""
+
+REPEATS = 5
+
+
+def run(source, licm):
+    # Inlining e CTFE disattivati: renderebbero costanti i parametri di work
+    with contextlib.redirect_stdout(io.StringIO()):
+        llvm_ir = aether.compile_source(source, opt_level=2, licm=licm, inline_budget=0, ctfe_budget=0)
+    loop = llvm_ir.split("while_cond:")[1].split("while_after:")[0]
+    instructions = sum(1 for line in loop.splitlines() if line.startswith("  "))
+    module = llvm.parse_assembly(llvm_ir.replace("x86_64-pc-windows-gnu", llvm.get_process_triple()))
+    # Nessuna ottimizzazione di LLVM: conta solo la forma dell'IR emesso
+    machine = llvm.Target.from_default_triple().create_target_machine(opt=0)
+    engine = llvm.create_mcjit_compiler(module, machine)
+    engine.finalize_object()
+    main = ctypes.CFUNCTYPE(ctypes.c_int64)(engine.get_function_address("main"))
+    # Migliore di REPEATS esecuzioni
+    best = float("inf")
+    for _ in range(REPEATS):
+        start = time.perf_counter()
+        result = main()
+        best = min(best, time.perf_counter() - start)
+    return result, instructions, best
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 2000000
+    llvm.initialize_native_target()
+    llvm.initialize_native_asmprinter()
+    source = SOURCE.format(n=n)
+    expected, plain_size, plain_time = run(source, False)
+    result, moved_size, moved_time = run(source, True)
+    assert result == expected
+    print(f"{n * 3 - 2} iterazioni, LLVM -O0: istruzioni nel ciclo {plain_size} -> {moved_size}, "
+          f"esecuzione {plain_time:.3f}s -> {moved_time:.3f}s ({plain_time / moved_time:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
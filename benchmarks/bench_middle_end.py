@@ -0,0 +1,59 @@
+import copy
+import gc
+import sys
+import time
+from src.lexer import RegexLexer
+from src.parser import Parser
+from src.symbols import SymbolTable
+from src.desugaring import Desugarer
+from src.semantic_analysis import SemanticAnalyzer
+from src.optimizer import Optimizer
+from src.middle_end import FusedMiddleEnd
+import src.ast_nodes as ast
+from benchmarks.generate import generate_program
+
+
+def sequential(program, symbols):
+    program = Desugarer(symbols).visit(program)
+    SemanticAnalyzer(symbols).visit(program)
+    return Optimizer().visit(program)
+
+
+def fused(program, symbols):
+    return FusedMiddleEnd(symbols).visit(program)
+
+
+def timed(run, source, repeat=3):
+    # Ogni ripetizione lavora su un AST nuovo: le fasi lo modificano sul posto
+    best = float('inf')
+    result = None
+    for _ in range(repeat):
+        symbols = SymbolTable()
+        program = Parser(list(RegexLexer(source, symbols).tokenize()), symbols=symbols).parse()
+        gc.collect()
+        gc.disable()
+        try:
+            start = time.perf_counter()
+            result = run(program, symbols)
+            best = min(best, time.perf_counter() - start)
+        finally:
+            gc.enable()
+    return best, result
+
+
+def main():
+    n_funcs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    source = generate_program(n_funcs)
+    program = Parser(list(RegexLexer(source).tokenize())).parse()
+    n_nodes = sum(1 for _ in ast.walk(program))
+
+    three, expected = timed(sequential, source)
+    one, actual = timed(fused, source)
+    print(f"{n_nodes} nodi")
+    print(f"  tre visite separate: {three:.3f}s ({three / n_nodes * 1e6:.2f} µs/nodo)")
+    print(f"  visita fusa:         {one:.3f}s ({one / n_nodes * 1e6:.2f} µs/nodo)  ({three / one:.2f}x)")
+    print(f"  AST identico: {actual == expected}")
+
+
+if __name__ == "__main__":
+    main()
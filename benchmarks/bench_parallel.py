@@ -0,0 +1,33 @@
+import os
+import sys
+import time
+from src.lexer import RegexLexer
+from src.tokens import TokenStore
+from src.parser import Parser
+from src.parallel_parser import parse_parallel
+from benchmarks.generate import generate_program
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return time.perf_counter() - start, result
+
+
+def main():
+    n_funcs = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    source = generate_program(n_funcs)
+    store = TokenStore.from_tokens(RegexLexer(source).tokenize(), source)
+    serial, expected = timed(lambda: Parser(list(store)).parse())
+    print(f"{len(store)} token, {os.cpu_count()} core disponibili")
+    print(f"  sequenziale: {serial:.3f}s")
+    jobs = 2
+    while jobs <= max(2, os.cpu_count() or 1):
+        elapsed, program = timed(lambda: parse_parallel(store, jobs))
+        print(f"  {jobs:>2} processi: {elapsed:.3f}s  ({serial / elapsed:.2f}x)  "
+              f"AST identico: {program == expected}")
+        jobs *= 2
+
+
+if __name__ == "__main__":
+    main()
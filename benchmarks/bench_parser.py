@@ -0,0 +1,91 @@
+import gc
+import sys
+import time
+from src.lexer import RegexLexer
+from src.parser import Parser
+from src.tokens import TokenType
+import src.ast_nodes as ast
+from benchmarks.generate import generate_program, generate_expression_program
+
+
+class CascadeParser(Parser):
+    # Riferimento: discesa ricorsiva con una funzione per livello di precedenza
+    # e lookahead lambda che scandisce l'intera lista di parametri
+    def parse_binary_expr(self, min_precedence=1):
+        return self.parse_logic_expr()
+
+    def _left_assoc(self, operand, types):
+        left = operand()
+        while any(self.check(t) for t in types):
+            op = self.consume().type
+            left = ast.BinaryExpr(left, op, operand())
+        return left
+
+    def parse_logic_expr(self):
+        return self._left_assoc(self.parse_equality_expr, (TokenType.AND, TokenType.OR))
+
+    def parse_equality_expr(self):
+        return self._left_assoc(self.parse_rel_expr, (TokenType.EQ, TokenType.NE))
+
+    def parse_rel_expr(self):
+        return self._left_assoc(self.parse_add_expr, (TokenType.LT, TokenType.GT, TokenType.LE, TokenType.GE))
+
+    def parse_add_expr(self):
+        return self._left_assoc(self.parse_mul_expr, (TokenType.PLUS, TokenType.MINUS))
+
+    def parse_mul_expr(self):
+        return self._left_assoc(self.parse_unary_expr, (TokenType.MUL, TokenType.DIV))
+
+    def is_lambda_lookahead(self):
+        offset = 1
+        if self.peek(offset) and self.peek(offset).type == TokenType.RPAREN:
+            return self.peek(offset + 1) and self.peek(offset + 1).type == TokenType.ARROW
+        if self.peek(offset) and self.peek(offset).type == TokenType.ID:
+            offset += 1
+            while True:
+                token = self.peek(offset)
+                if not token:
+                    return False
+                if token.type == TokenType.RPAREN:
+                    return self.peek(offset + 1) and self.peek(offset + 1).type == TokenType.ARROW
+                elif token.type == TokenType.COMMA:
+                    offset += 1
+                    if not (self.peek(offset) and self.peek(offset).type == TokenType.ID):
+                        return False
+                    offset += 1
+                else:
+                    return False
+        return False
+
+
+def bench(parser_cls, tokens, repeat=5):
+    best = float('inf')
+    program = None
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            program = parser_cls(tokens).parse()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return best, program
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    workloads = (
+        ("espressioni", generate_expression_program(size)),
+        ("programma misto", generate_program(size)),
+    )
+    for name, source in workloads:
+        tokens = [tok for tok in RegexLexer(source).tokenize() if tok.type != TokenType.EOF]
+        cascade, expected = bench(CascadeParser, tokens)
+        pratt, actual = bench(Parser, tokens)
+        print(f"{name:>16}: {len(tokens)} token  cascata {cascade:.3f}s  "
+              f"precedence climbing {pratt:.3f}s  ({cascade / pratt:.2f}x)  "
+              f"AST identico: {expected == actual}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,44 @@
+import contextlib
+import io
+import sys
+import time
+import llvmlite.binding as llvm
+import aether
+from benchmarks.generate import generate_program
+
+
+def compile_ir(source, prune):
+    with contextlib.redirect_stdout(io.StringIO()):
+        start = time.perf_counter()
+        llvm_ir = aether.compile_source(source, prune=prune)
+        return llvm_ir, time.perf_counter() - start
+
+
+def llvm_time(llvm_ir):
+    # Parsing dell'IR, verifica ed emissione del file oggetto
+    llvm.initialize_native_target()
+    llvm.initialize_native_asmprinter()
+    machine = llvm.Target.from_default_triple().create_target_machine()
+    start = time.perf_counter()
+    module = llvm.parse_assembly(llvm_ir)
+    module.verify()
+    machine.emit_object(module)
+    return time.perf_counter() - start
+
+
+def main():
+    n_funcs = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    for percent in (5, 25, 100):
+        source = generate_program(n_funcs, n_funcs * percent // 100)
+        full, full_time = compile_ir(source, prune=False)
+        pruned, pruned_time = compile_ir(source, prune=True)
+        removed = full.count("\ndefine ") - pruned.count("\ndefine ")
+        full_lines, pruned_lines = full.count("\n"), pruned.count("\n")
+        full_llvm, pruned_llvm = llvm_time(full), llvm_time(pruned)
+        print(f"{percent:>3}% raggiunte: {removed} funzioni rimosse, IR {full_lines} -> {pruned_lines} righe")
+        print(f"      compilazione {full_time:.3f}s -> {pruned_time:.3f}s  "
+              f"LLVM {full_llvm:.3f}s -> {pruned_llvm:.3f}s ({full_llvm / pruned_llvm:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
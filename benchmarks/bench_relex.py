@@ -0,0 +1,34 @@
+import sys
+import time
+from src.lexer import RegexLexer, relex
+from src.tokens import TokenStore
+from benchmarks.generate import generate_program
+
+
+def main():
+    n_funcs = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    source = generate_program(n_funcs)
+    lines = source.count('\n')
+
+    start = time.perf_counter()
+    store = TokenStore.from_tokens(RegexLexer(source).tokenize(), source)
+    full = time.perf_counter() - start
+    print(f"Sorgente: {lines} righe, {len(store)} token")
+    print(f"Lexing completo:        {full * 1e3:9.2f} ms")
+
+    # Digitazione simulata: un carattere alla volta a metà file
+    offset = source.index("let x = a", len(source) // 2) + len("let x")
+    edits = 200
+    start = time.perf_counter()
+    for i in range(edits):
+        relex(store, offset + i, 0, "y")
+    per_edit = (time.perf_counter() - start) / edits
+    print(f"Rilessatura incrementale: {per_edit * 1e6:7.1f} us/edit  ({full / per_edit:.0f}x)")
+
+    expected = [(t.type, t.value, t.start, t.end) for t in RegexLexer(store.text).tokenize()][:-1]
+    actual = [(t.type, t.value, t.start, t.end) for t in store]
+    print("Risultato coerente con il lexing completo:", expected == actual)
+
+
+if __name__ == "__main__":
+    main()
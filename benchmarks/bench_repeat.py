@@ -0,0 +1,63 @@
+import contextlib
+import ctypes
+import io
+import sys
+import time
+import llvmlite.binding as llvm
+import aether
+
+# 'cost' simula un conteggio costoso da calcolare: il risultato è n, dopo n iterazioni
+COST = """
+func cost(n) {{
+    let s = 0;
+    let i = 0;
+    while (i < n) {{ s = s * 31 + i; s = s - (s / 1000003) * 1000003; i = i + 1; }}
+    return n + (s < 0);
+}}
+"""
+
+REPEAT = COST + """
+func main() {{
+    let acc = 0;
+    repeat(cost({n})) {{ acc = acc + 1; }}
+    return acc;
+}}
+"""
+
+# Traduzione precedente del repeat: il conteggio nella condizione del while
+WHILE = COST + """
+func main() {{
+    let acc = 0;
+    let i = 0;
+    while (i < cost({n})) {{ acc = acc + 1; i = i + 1; }}
+    return acc;
+}}
+"""
+
+
+def run(source):
+    with contextlib.redirect_stdout(io.StringIO()):
+        llvm_ir = aether.compile_source(source)
+    module = llvm.parse_assembly(llvm_ir.replace("x86_64-pc-windows-gnu", llvm.get_process_triple()))
+    machine = llvm.Target.from_default_triple().create_target_machine()
+    engine = llvm.create_mcjit_compiler(module, machine)
+    engine.finalize_object()
+    main = ctypes.CFUNCTYPE(ctypes.c_int64)(engine.get_function_address("main"))
+    start = time.perf_counter()
+    result = main()
+    return result, time.perf_counter() - start
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    llvm.initialize_native_target()
+    llvm.initialize_native_asmprinter()
+    hoisted, hoisted_time = run(REPEAT.format(n=n))
+    reevaluated, reevaluated_time = run(WHILE.format(n=n))
+    assert hoisted == reevaluated == n
+    print(f"repeat(cost({n})): conteggio nella condizione {reevaluated_time * 1000:.2f}ms, "
+          f"valutato una volta {hoisted_time * 1000:.3f}ms ({reevaluated_time / hoisted_time:.0f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,46 @@
+import gc
+import sys
+import time
+from src.lexer import RegexLexer
+from src.parser import Parser
+from src.symbols import SymbolTable
+from src.serialization import dumps, loads
+from benchmarks.generate import generate_program
+
+
+def best_time(function, repeat=3):
+    best = float('inf')
+    gc.disable()
+    try:
+        for _ in range(repeat):
+            start = time.perf_counter()
+            result = function()
+            best = min(best, time.perf_counter() - start)
+    finally:
+        gc.enable()
+    return best, result
+
+
+def lex_and_parse(source):
+    symbols = SymbolTable()
+    return Parser(list(RegexLexer(source, symbols).tokenize()), symbols=symbols).parse()
+
+
+def main():
+    n_funcs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    source = generate_program(n_funcs)
+
+    parse_time, program = best_time(lambda: lex_and_parse(source))
+    dump_time, data = best_time(lambda: dumps(program))
+    load_time, restored = best_time(lambda: loads(data, SymbolTable()))
+    assert restored == program
+
+    print(f"Sorgente: {len(source)} byte, AST serializzato: {len(data)} byte "
+          f"({len(data) / len(source):.0%})")
+    print(f"Lexing + parsing: {parse_time:.3f}s")
+    print(f"Caricamento AST:  {load_time:.3f}s  ({parse_time / load_time:.2f}x)")
+    print(f"Salvataggio AST:  {dump_time:.3f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+import sys
+from src.semantic_analysis import SemanticAnalyzer
+from src.codegen import LLVMCodeGen
+from src.symbols import SymbolTable
+import src.ast_nodes as ast
+from benchmarks.generate import generate_variable_program
+from benchmarks.bench_interning import front_end, timed
+
+
+def clear_slots(program):
+    # AST come prima della risoluzione: il codegen cerca ogni variabile per simbolo
+    for node in ast.walk(program):
+        if isinstance(node, (ast.VariableExpr, ast.AssignExpr, ast.VarDecl)):
+            node.slot = None
+        elif isinstance(node, ast.FunctionDecl):
+            node.frame_size = None
+
+
+def lookups(program, symbols):
+    # Solo la ricerca delle variabili, senza la costruzione dell'IR
+    codegen = LLVMCodeGen(symbols)
+    variables = [node for node in ast.walk(program) if isinstance(node, ast.VariableExpr)]
+    for node in variables:
+        codegen.func_symtab.set(node.sym, node.name)
+    codegen.frame = [None] * (1 + max((node.slot or 0) for node in variables))
+    return timed(lambda: [codegen.lookup_variable(node) for node in variables]), len(variables)
+
+
+def main():
+    n_funcs = int(sys.argv[1]) if len(sys.argv) > 1 else 2000
+    n_vars = int(sys.argv[2]) if len(sys.argv) > 2 else 20
+    source = generate_variable_program(n_funcs, n_vars)
+    print(f"{n_funcs} funzioni x {n_vars} variabili")
+
+    symbols = SymbolTable()
+    program = front_end(source, symbols)
+    sema = timed(lambda: SemanticAnalyzer(symbols).visit(program))
+    with_slots = timed(lambda: LLVMCodeGen(symbols).visit(program))
+    slot_lookup, n_lookups = lookups(program, symbols)
+    clear_slots(program)
+    by_symbol = timed(lambda: LLVMCodeGen(symbols).visit(program))
+    symbol_lookup, _ = lookups(program, symbols)
+
+    print(f"Analisi semantica con risoluzione degli slot: {sema:.3f}s")
+    print(f"CodeGen (visita): per simbolo {by_symbol:.3f}s  per slot {with_slots:.3f}s  "
+          f"({by_symbol / with_slots:.2f}x)")
+    print(f"Ricerca di {n_lookups} variabili: per simbolo {symbol_lookup * 1000:.1f}ms  "
+          f"per slot {slot_lookup * 1000:.1f}ms  ({symbol_lookup / slot_lookup:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,43 @@
+import sys
+import tracemalloc
+from src.lexer import RegexLexer
+from src.tokens import TokenStore, TokenType
+from benchmarks.generate import generate_program
+
+
+class DictToken:
+    # Rappresentazione originale del Token (con __dict__ e senza posizione)
+    def __init__(self, type, value=None):
+        self.type = type
+        self.value = value
+
+
+def measure(build):
+    tracemalloc.start()
+    result = build()
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, current
+
+
+def main():
+    n_funcs = int(sys.argv[1]) if len(sys.argv) > 1 else 3000
+    source = generate_program(n_funcs)
+    tokens = [tok for tok in RegexLexer(source).tokenize() if tok.type != TokenType.EOF]
+    count = len(tokens)
+
+    cases = (
+        ("Token con __dict__", lambda: [DictToken(tok.type, tok.value) for tok in tokens]),
+        ("Token con __slots__", lambda: [tok.__class__(tok.type, tok.value, tok.start, tok.end) for tok in tokens]),
+        ("TokenStore", lambda: TokenStore.from_tokens(tokens, source)),
+    )
+    print(f"{count} token")
+    baseline = None
+    for name, build in cases:
+        _, size = measure(build)
+        baseline = baseline or size
+        print(f"{name:>20}: {size / count:6.1f} byte/token  ({baseline / size:.1f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import contextlib
+import ctypes
+import io
+import sys
+import time
+import llvmlite.binding as llvm
+import aether
+from src.unroll import UNROLL_BUDGET
+
+# Cicli brevi a conteggio costante annidati in un ciclo esterno
+SOURCE = """
+func main() {{
+    let s = 0;
+    let i = 0;
+    while (i < {n}) {{
+        repeat(8) {{ s = s + i; }}
+        repeat(3) {{ repeat(4) {{ s = s - 1; }} }}
+        repeat(20) {{ s = s * 3 + 1; s = s - (s / 1000003) * 1000003; }}
+        i = i + 1;
+    }}
+    return s;
+}}
+"""
+
+
+def run(source, budget):
+    with contextlib.redirect_stdout(io.StringIO()):
+        llvm_ir = aether.compile_source(source, opt_level=2, unroll_budget=budget)
+    branches = llvm_ir.count(" br ")
+    module = llvm.parse_assembly(llvm_ir.replace("x86_64-pc-windows-gnu", llvm.get_process_triple()))
+    # Nessuna ottimizzazione di LLVM: conta solo la forma dell'IR emesso
+    machine = llvm.Target.from_default_triple().create_target_machine(opt=0)
+    engine = llvm.create_mcjit_compiler(module, machine)
+    engine.finalize_object()
+    main = ctypes.CFUNCTYPE(ctypes.c_int64)(engine.get_function_address("main"))
+    start = time.perf_counter()
+    result = main()
+    return result, branches, time.perf_counter() - start
+
+
+def main():
+    n = int(sys.argv[1]) if len(sys.argv) > 1 else 200000
+    llvm.initialize_native_target()
+    llvm.initialize_native_asmprinter()
+    source = SOURCE.format(n=n)
+    expected, loop_branches, loop_time = run(source, 0)
+    result, unrolled_branches, unrolled_time = run(source, UNROLL_BUDGET)
+    assert result == expected
+    print(f"{n} iterazioni esterne, LLVM -O0: salti {loop_branches} -> {unrolled_branches}, "
+          f"esecuzione {loop_time:.3f}s -> {unrolled_time:.3f}s ({loop_time / unrolled_time:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+# Generatori di sorgenti .ae sintetici per i benchmark
+
+EXTERNS = """extern func print_result(n);
+extern func get_input();
+"""
+
+FUNC_TEMPLATE = """func calc_{i}(op, a, b) {{
+    let x = a * {k} + b;
+    let y = x - (a / 2);
+    if (op == 1 && x > y) {{ return x + y; }}
+    if (op != 2) {{ return x |> add_{i}(y); }}
+    while (x >= 0) {{
+        x = x - {k};
+    }}
+    repeat(3) {{
+        print_result(x);
+    }}
+    return !op;
+}}
+
+func add_{i}(p, q) {{
+    return p + q;
+}}
+
+"""
+
+MAIN_TEMPLATE = """func main() {{
+    let v = get_input();
+{calls}    return 0;
+}}
+"""
+
+
+def generate_program(n_funcs, n_called=None):
+    # main chiama solo le prime n_called funzioni (tutte se non specificato)
+    if n_called is None:
+        n_called = n_funcs
+    parts = [EXTERNS]
+    for i in range(n_funcs):
+        parts.append(FUNC_TEMPLATE.format(i=i, k=i % 97 + 1))
+    calls = "".join(f"    v = calc_{i}(1, v, {i});\n" for i in range(n_called))
+    parts.append(MAIN_TEMPLATE.format(calls=calls))
+    return "".join(parts)
+
+
+def generate_expression_program(n_terms, depth=3):
+    # Corpo dominato da espressioni lunghe e parentesizzate
+    term = "(a + b * c - (d / 2))"
+    for _ in range(depth):
+        term = f"({term} * {term} - a)"
+    lines = [f"    let r{i} = {term} + r{i - 1};" if i else f"    let r0 = {term};"
+             for i in range(n_terms)]
+    body = "\n".join(lines)
+    return f"func main() {{\n    let a = 1;\n    let b = 2;\n    let c = 3;\n    let d = 4;\n{body}\n    return r{n_terms - 1};\n}}\n"
+
+
+def generate_variable_program(n_funcs, n_vars):
+    # Molte funzioni, ciascuna con molte variabili locali lette e riassegnate
+    parts = ["extern func print_result(n);\n"]
+    for i in range(n_funcs):
+        decls = "".join(f"    let v{j} = p + {j};\n" for j in range(n_vars))
+        uses = "".join(f"    v{j} = v{j} + v{j - 1} * p;\n" for j in range(1, n_vars))
+        parts.append(f"func f{i}(p) {{\n{decls}{uses}    return v{n_vars - 1};\n}}\n\n")
+    calls = "".join(f"    acc = acc + f{i}(acc);\n" for i in range(n_funcs))
+    parts.append(f"func main() {{\n    let acc = 0;\n{calls}    print_result(acc);\n    return 0;\n}}\n")
+    return "".join(parts)
@@ -1,110 +1,309 @@
-from dataclasses import dataclass
+import copy
+import functools
+import sys
+from dataclasses import dataclass, field, fields
+from enum import IntEnum
 from typing import List, Optional, Union, Any
 
-@dataclass
+# I nodi usano __slots__ (nessun __dict__ per istanza) dove dataclass lo supporta
+if sys.version_info >= (3, 10):
+    node_dataclass = dataclass(slots=True)
+else:
+    node_dataclass = dataclass
+
+def annotation():
+    # Campo calcolato dalle fasi del compilatore: escluso da confronto e repr
+    return field(default=None, compare=False, repr=False)
+
+class Effect(IntEnum):
+    # Effetti di una funzione sulla memoria visibile al chiamante, ordinati:
+    # l'effetto di una funzione è il massimo tra quelli delle funzioni chiamate
+    PURE = 0        # nessun accesso (readnone)
+    READONLY = 1    # sola lettura (readonly)
+    IMPURE = 2      # effetti arbitrari (default delle extern)
+
+@node_dataclass
 class ASTNode:
-    pass
+    def __reduce__(self):
+        # Pickle compatto: costruttore e valori dei campi, senza __dict__
+        return (type(self), tuple([getattr(self, name) for name in field_names(type(self))]))
 
-@dataclass
+@node_dataclass
 class Expr(ASTNode):
     pass
 
-@dataclass
+@node_dataclass
 class LiteralExpr(Expr):
     value: int
 
-@dataclass
+@node_dataclass
 class VariableExpr(Expr):
     name: str
+    sym: Optional[int] = annotation()
+    # Indice della variabile nel frame della funzione (analisi semantica)
+    slot: Optional[int] = annotation()
 
-@dataclass
+@node_dataclass
 class BinaryExpr(Expr):
     left: Expr
     operator: Any
     right: Expr
 
-@dataclass
+@node_dataclass
 class UnaryExpr(Expr):
     operator: Any
     operand: Expr
 
-@dataclass
+@node_dataclass
 class PipeExpr(Expr):
     left: Expr
     right: Expr
 
-@dataclass
+@node_dataclass
 class AssignExpr(Expr):
     name: str
     value: Expr
+    sym: Optional[int] = annotation()
+    slot: Optional[int] = annotation()
 
-@dataclass
+@node_dataclass
 class CallExpr(Expr):
     callee: str
     args: List[Expr]
+    sym: Optional[int] = annotation()
+    # Dichiarazione (FunctionDecl o ExternDecl) risolta dall'analisi semantica
+    decl: Optional['ASTNode'] = annotation()
 
-@dataclass
+@node_dataclass
 class LambdaExpr(Expr):
     params: List[str]
     body: Expr
+    param_syms: Optional[List[int]] = annotation()
 
-@dataclass
+@node_dataclass
 class Stmt(ASTNode):
     pass
 
-@dataclass
+@node_dataclass
 class ReturnStmt(Stmt):
     value: Expr
 
-@dataclass
+@node_dataclass
 class ExprStmt(Stmt):
     expr: Expr
 
-@dataclass
+@node_dataclass
 class VarDecl(Stmt):
     name: str
     initializer: Expr
+    sym: Optional[int] = annotation()
+    slot: Optional[int] = annotation()
 
-@dataclass
+@node_dataclass
 class Block(Stmt):
     statements: List[Stmt]
 
-@dataclass
+class LazyBlock(Block):
+    # Corpo di funzione non ancora analizzato: parse_body viene invocata
+    # al primo accesso a statements e il risultato sostituisce il thunk
+    __slots__ = ('_parse_body', '_statements')
+
+    def __init__(self, parse_body):
+        self._parse_body = parse_body
+        self._statements = None
+
+    @property
+    def statements(self):
+        if self._parse_body is not None:
+            parse_body, self._parse_body = self._parse_body, None
+            self._statements = parse_body()
+        return self._statements
+
+    @statements.setter
+    def statements(self, value):
+        self._parse_body = None
+        self._statements = value
+
+    @property
+    def materialized(self):
+        return self._parse_body is None
+
+    def __reduce__(self):
+        return (Block, (self.statements,))
+
+    def __eq__(self, other):
+        if isinstance(other, Block):
+            return self.statements == other.statements
+        return NotImplemented
+
+    def __repr__(self):
+        if not self.materialized:
+            return "LazyBlock(<non analizzato>)"
+        return f"LazyBlock(statements={self.statements!r})"
+
+@node_dataclass
 class IfStmt(Stmt):
     condition: Expr
     then_branch: Block
     else_branch: Optional[Block]
 
-@dataclass
+@node_dataclass
 class WhileStmt(Stmt):
     condition: Expr
     body: Block
+    # Ciclo contato generato da un repeat: la condizione è 'contatore < limite',
+    # il limite non cambia durante il ciclo e il corpo termina con l'incremento
+    counted: Optional[bool] = annotation()
 
-@dataclass
+@node_dataclass
 class RepeatStmt(Stmt):
     count: Expr
     body: Block
 
-@dataclass
+@node_dataclass
 class FunctionDecl(ASTNode):
     name: str
     params: List[str]
     body: Block
+    sym: Optional[int] = annotation()
+    param_syms: Optional[List[int]] = annotation()
+    # Numero di slot del frame: parametri e variabili locali
+    frame_size: Optional[int] = annotation()
+    # Effetto inferito e terminazione garantita (vedi src/effects.py)
+    effect: Optional[Effect] = annotation()
+    willreturn: Optional[bool] = annotation()
 
-@dataclass
+@node_dataclass
 class ExternDecl(ASTNode):
     name: str
     params: List[str]
+    # Dichiarato nel sorgente: 'extern pure func' / 'extern readonly func'
+    effect: Effect = Effect.IMPURE
+    sym: Optional[int] = annotation()
+    param_syms: Optional[List[int]] = annotation()
+    willreturn: Optional[bool] = annotation()
 
-@dataclass
+@node_dataclass
 class Program(ASTNode):
     declarations: List[Union[FunctionDecl, ExternDecl, VarDecl]]
 
+_FIELD_NAMES = {}
+
+def field_names(node_type):
+    names = _FIELD_NAMES.get(node_type)
+    if names is None:
+        names = _FIELD_NAMES[node_type] = tuple(f.name for f in fields(node_type))
+    return names
+
+_CHILD_FIELD_NAMES = {}
+
+def child_field_names(node_type):
+    # Campi strutturali, annotazioni escluse: la dichiarazione risolta di una
+    # chiamata non è un figlio del nodo
+    names = _CHILD_FIELD_NAMES.get(node_type)
+    if names is None:
+        names = _CHILD_FIELD_NAMES[node_type] = tuple(f.name for f in fields(node_type) if f.compare)
+    return names
+
+def iter_child_nodes(node):
+    for name in child_field_names(type(node)):
+        value = getattr(node, name)
+        if isinstance(value, ASTNode):
+            yield value
+        elif isinstance(value, list):
+            for item in value:
+                if isinstance(item, ASTNode):
+                    yield item
+
+def walk(node):
+    # Visita iterativa in preordine di tutti i nodi del sottoalbero
+    stack = [node]
+    while stack:
+        node = stack.pop()
+        yield node
+        children = list(iter_child_nodes(node))
+        children.reverse()
+        stack.extend(children)
+
+def copy_tree(node):
+    # Copia iterativa dei nodi strutturali del sottoalbero; le annotazioni
+    # (simboli, slot, dichiarazione chiamata) sono condivise con l'originale
+    root = copy.copy(node)
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        for name in child_field_names(type(current)):
+            value = getattr(current, name)
+            if isinstance(value, ASTNode):
+                value = copy.copy(value)
+                setattr(current, name, value)
+                stack.append(value)
+            elif isinstance(value, list):
+                value = [copy.copy(item) if isinstance(item, ASTNode) else item for item in value]
+                setattr(current, name, value)
+                stack.extend(item for item in value if isinstance(item, ASTNode))
+    return root
+
+def iterative(method):
+    # Metodo di visita scritto come generatore: 'valore = yield figlio' affida la
+    # visita del figlio al motore a stack esplicito di NodeVisitor e ne riceve il
+    # risultato, così la profondità dell'AST non consuma lo stack di Python
+    @functools.wraps(method)
+    def visit_method(self, node):
+        return self.run(method(self, node))
+    visit_method.step = method
+    return visit_method
+
 class NodeVisitor:
+    # Tabella di dispatch per classe di visitor: tipo di nodo -> (metodo, passo
+    # iterativo o None), risolta una sola volta per ciascun tipo di nodo
+    _dispatch = {}
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        cls._dispatch = {}
+
+    @classmethod
+    def resolve(cls, node_type):
+        # Le sottoclassi di un nodo (es. LazyBlock) usano il visitor della classe base
+        for base in node_type.__mro__:
+            method = getattr(cls, 'visit_' + base.__name__, None)
+            if method is not None:
+                break
+        else:
+            method = cls.generic_visit
+        entry = cls._dispatch[node_type] = (method, getattr(method, 'step', None))
+        return entry
+
     def visit(self, node):
-        method_name = 'visit_' + type(node).__name__
-        visitor = getattr(self, method_name, self.generic_visit)
-        return visitor(node)
+        method, step = self._dispatch.get(type(node)) or self.resolve(type(node))
+        if step is None:
+            return method(self, node)
+        return self.run(step(self, node))
+
+    def run(self, generator):
+        # Motore iterativo: una pila di generatori al posto della ricorsione.
+        # I visitor non iterativi (foglie) vengono chiamati direttamente.
+        dispatch = self._dispatch
+        stack = []
+        current = generator
+        value = None
+        while True:
+            try:
+                child = current.send(value)
+            except StopIteration as stop:
+                if not stack:
+                    return stop.value
+                current = stack.pop()
+                value = stop.value
+                continue
+            method, step = dispatch.get(type(child)) or self.resolve(type(child))
+            if step is None:
+                value = method(self, child)
+            else:
+                stack.append(current)
+                current = step(self, child)
+                value = None
 
     def generic_visit(self, node):
-        raise Exception(f'No visit_{type(node).__name__} method')
\ No newline at end of file
+        raise Exception(f'No visit_{type(node).__name__} method')
@@ -0,0 +1,103 @@
+import src.ast_nodes as ast
+
+def referenced_functions(node, functions):
+    # Nomi di funzione usati nel sottoalbero: chiamate dirette e riferimenti
+    # come valore (pipe verso una variabile, lambda assegnate)
+    names = set()
+    for child in ast.walk(node):
+        if isinstance(child, ast.CallExpr):
+            name = child.callee
+        elif isinstance(child, ast.VariableExpr):
+            name = child.name
+        else:
+            continue
+        if name in functions:
+            names.add(name)
+    return names
+
+def reachable_functions(program, roots=('main',)):
+    functions = {decl.name: decl for decl in program.declarations
+                 if isinstance(decl, (ast.FunctionDecl, ast.ExternDecl))}
+
+    worklist = [name for name in roots if name in functions]
+    for decl in program.declarations:
+        if isinstance(decl, ast.VarDecl):
+            worklist.extend(referenced_functions(decl, functions))
+
+    reached = set(worklist)
+    while worklist:
+        decl = functions[worklist.pop()]
+        if isinstance(decl, ast.ExternDecl):
+            continue
+        # Con il parsing pigro l'accesso al corpo lo materializza: solo le
+        # funzioni raggiunte vengono effettivamente analizzate
+        for name in referenced_functions(decl.body, functions):
+            if name not in reached:
+                reached.add(name)
+                worklist.append(name)
+    return reached
+
+def prune_unreachable(program, roots=('main',)):
+    # Rimuove le funzioni non raggiungibili dalle radici, le extern restano
+    reached = reachable_functions(program, roots)
+    kept, removed = [], []
+    for decl in program.declarations:
+        if isinstance(decl, ast.FunctionDecl) and decl.name not in reached:
+            removed.append(decl.name)
+        else:
+            kept.append(decl)
+    program.declarations = kept
+    return removed
+
+def call_graph(program):
+    # Funzione -> funzioni a cui fa riferimento il suo corpo
+    functions = {decl.name: decl for decl in program.declarations if isinstance(decl, ast.FunctionDecl)}
+    return {name: sorted(referenced_functions(decl.body, functions)) for name, decl in functions.items()}
+
+def strongly_connected(graph):
+    # Componenti fortemente connesse del grafo delle chiamate (Tarjan,
+    # iterativo), in ordine inverso topologico: ogni componente segue quelle
+    # delle funzioni che chiama
+    index, low = {}, {}
+    stack, on_stack = [], set()
+    components = []
+    for root in graph:
+        if root in index:
+            continue
+        work = [(root, 0)]
+        while work:
+            name, position = work.pop()
+            if position == 0:
+                index[name] = low[name] = len(index)
+                stack.append(name)
+                on_stack.add(name)
+            callees = graph[name]
+            if position < len(callees):
+                work.append((name, position + 1))
+                callee = callees[position]
+                if callee not in index:
+                    work.append((callee, 0))
+                elif callee in on_stack:
+                    low[name] = min(low[name], index[callee])
+                continue
+            if low[name] == index[name]:
+                component = []
+                while True:
+                    member = stack.pop()
+                    on_stack.discard(member)
+                    component.append(member)
+                    if member == name:
+                        break
+                components.append(component)
+            if work:
+                caller = work[-1][0]
+                low[caller] = min(low[caller], low[name])
+    return components
+
+def recursive_functions(graph, components):
+    # Funzioni in un ciclo del grafo delle chiamate, anche solo con se stesse
+    recursive = set()
+    for component in components:
+        if len(component) > 1 or component[0] in graph[component[0]]:
+            recursive.update(component)
+    return recursive
@@ -1,16 +1,36 @@
 from llvmlite import ir
-from src.ast_nodes import NodeVisitor
+from src.ast_nodes import NodeVisitor, iterative
+from src.symbols import SymbolTable, ScopeMap
 from src.tokens import TokenType
 import src.ast_nodes as ast
 import re
 
+# Suggerimenti per le ottimizzazioni di LLVM associati ai cicli contati (!llvm.loop)
+LOOP_HINTS = (
+    ("llvm.loop.mustprogress",),
+    ("llvm.loop.unroll.enable",),
+    ("llvm.loop.vectorize.enable", True),
+)
+
 class LLVMCodeGen(NodeVisitor):
-    def __init__(self):
+    def __init__(self, symbols=None):
         self.module = ir.Module(name="main_module")
         self.module.triple = "x86_64-pc-windows-gnu"
         self.builder = None
-        self.func_symtab = {}
-        self.functions = {}
+        self.alloca_builder = None
+        # Tabelle indicizzate per id di simbolo (vedi SemanticAnalyzer)
+        self.shared_symbols = symbols is not None
+        self.symbols = symbols if symbols is not None else SymbolTable()
+        self.func_symtab = ScopeMap()
+        # alloca della funzione corrente indicizzate per slot (vedi SemanticAnalyzer);
+        # i nodi senza slot, mai passati dalla semantica, usano func_symtab
+        self.frame = []
+        self.functions = []
+        # Funzioni marcate 'willreturn' (attributo non gestito da llvmlite, aggiunto al testo dell'IR)
+        self.willreturn = set()
+        # Metadati dei suggerimenti, condivisi da tutti i cicli contati
+        self.loop_hints = None
+        self.loop_count = 0
 
         # Tipi
         self.i64 = ir.IntType(64)
@@ -20,6 +40,13 @@ class LLVMCodeGen(NodeVisitor):
     def generate_code(self, node):
         self.visit(node)
         ir_code = str(self.module)
+        if self.willreturn:
+            ir_code = re.sub(
+                r'^((?:define|declare) .+? @"(.+?)"\(.*?\))',
+                lambda m: m.group(1) + ' willreturn' if m.group(2) in self.willreturn else m.group(1),
+                ir_code,
+                flags=re.MULTILINE
+            )
         ir_code = re.sub(
             r'(define .+? @".+?"\(.*?\))',
             r'\1 "stack-probe-size"="1048576"',
@@ -28,6 +55,33 @@ class LLVMCodeGen(NodeVisitor):
         return ir_code
         #return str(self.module)
 
+    def sym(self, node, name):
+        if self.shared_symbols and node.sym is not None:
+            return node.sym
+        return self.symbols.intern(name)
+
+    def add_attributes(self, func, decl):
+        # Attributi dagli effetti dichiarati (extern) o inferiti (src/effects.py)
+        effect = decl.effect
+        if effect is None:
+            return
+        if effect == ast.Effect.PURE:
+            func.attributes.add('readnone')
+        elif effect == ast.Effect.READONLY:
+            func.attributes.add('readonly')
+        # Il linguaggio non ha eccezioni: le funzioni definite non propagano unwind,
+        # per le extern lo garantisce solo la dichiarazione pure/readonly
+        if isinstance(decl, ast.FunctionDecl) or effect != ast.Effect.IMPURE:
+            func.attributes.add('nounwind')
+        if decl.willreturn:
+            self.willreturn.add(decl.name)
+
+    def lookup_function(self, sym):
+        if sym < len(self.functions):
+            return self.functions[sym]
+        return None
+
+    @iterative
     def visit_Program(self, node):
         # Raccolta delle dichiarazioni di tutte le funzioni
         for decl in node.declarations:
@@ -38,85 +92,116 @@ class LLVMCodeGen(NodeVisitor):
             # i64 per default
             func_type = ir.FunctionType(self.i64, arg_types)
 
-            if isinstance(decl, ast.ExternDecl):
-                func = ir.Function(self.module, func_type, name=func_name)
-                self.functions[func_name] = func
-
-            elif isinstance(decl, ast.FunctionDecl):
+            if isinstance(decl, (ast.ExternDecl, ast.FunctionDecl)):
                 func = ir.Function(self.module, func_type, name=func_name)
-                self.functions[func_name] = func
+                self.add_attributes(func, decl)
+                sym = self.sym(decl, func_name)
+                if sym >= len(self.functions):
+                    self.functions.extend([None] * (sym + 1 - len(self.functions)))
+                self.functions[sym] = func
 
         # Generazione del corpo delle funzioni definite
         for decl in node.declarations:
             if isinstance(decl, ast.FunctionDecl):
-                self.visit(decl)
+                yield decl
 
         return self.module
 
     def visit_ExternDecl(self, node):
         pass
 
+    @iterative
     def visit_FunctionDecl(self, node):
-        func = self.functions[node.name]
+        func = self.functions[self.sym(node, node.name)]
 
         # entry block
         block = func.append_basic_block(name="entry")
         self.builder = ir.IRBuilder(block)
+        # Tutte le alloca in testa al blocco d'ingresso, anche quelle dei 'let'
+        # nei cicli: una sola per chiamata e promuovibili a registri (mem2reg)
+        self.alloca_builder = ir.IRBuilder(block)
 
         # gestione della memoria
-        self.func_symtab = {}
+        self.func_symtab.reset()
+        self.frame = [None] * (node.frame_size or len(node.params))
+        if self.shared_symbols and node.param_syms is not None:
+            param_syms = node.param_syms
+        else:
+            param_syms = [self.symbols.intern(param) for param in node.params]
         for i, arg in enumerate(func.args):
             arg.name = node.params[i]
-            alloca = self.builder.alloca(self.i64, name=arg.name)
+            alloca = self.entry_alloca(arg.name)
             self.builder.store(arg, alloca)
-            self.func_symtab[arg.name] = alloca
+            # I parametri occupano i primi slot del frame
+            self.frame[i] = alloca
+            self.func_symtab.set(param_syms[i], alloca)
 
-        self.visit(node.body)
+        yield node.body
 
         # return implicito
         if not self.builder.block.is_terminated:
             self.builder.ret(ir.Constant(self.i64, 0))
 
+    def entry_alloca(self, name):
+        alloca = self.alloca_builder.alloca(self.i64, name=name)
+        # Il builder principale scrive sempre in coda al blocco corrente
+        self.builder.position_at_end(self.builder.block)
+        return alloca
+
+    @iterative
     def visit_Block(self, node):
         for stmt in node.statements:
-            self.visit(stmt)
+            yield stmt
             if self.builder.block.is_terminated:
                 break
 
+    @iterative
     def visit_VarDecl(self, node):
-        init_val = self.visit(node.initializer)
+        init_val = yield node.initializer
 
-        alloca = self.builder.alloca(self.i64, name=node.name)
+        alloca = self.entry_alloca(node.name)
         self.builder.store(init_val, alloca)
 
-        self.func_symtab[node.name] = alloca
+        if node.slot is not None:
+            self.frame[node.slot] = alloca
+        else:
+            self.func_symtab.set(self.sym(node, node.name), alloca)
 
+    @iterative
     def visit_AssignExpr(self, node):
-        new_val = self.visit(node.value)
+        new_val = yield node.value
 
-        if node.name not in self.func_symtab:
+        alloca = self.lookup_variable(node)
+        if alloca is None:
             raise Exception(f"Variabile non definita nel codegen: {node.name}")
 
-        alloca = self.func_symtab[node.name]
         self.builder.store(new_val, alloca)
         return new_val
 
+    def lookup_variable(self, node):
+        slot = node.slot
+        if slot is not None:
+            return self.frame[slot]
+        return self.func_symtab.get(self.sym(node, node.name))
+
     def visit_VariableExpr(self, node):
-        if node.name not in self.func_symtab:
+        alloca = self.lookup_variable(node)
+        if alloca is None:
             raise Exception(f"Variabile non trovata: {node.name}")
 
-        alloca = self.func_symtab[node.name]
         return self.builder.load(alloca, name=node.name)
 
     def visit_LiteralExpr(self, node):
         return ir.Constant(self.i64, node.value)
 
+    @iterative
     def visit_ReturnStmt(self, node):
-        retval = self.visit(node.value)
+        retval = yield node.value
         self.builder.ret(retval)
 
+    @iterative
     def visit_IfStmt(self, node):
-        cond_val = self.visit(node.condition)
+        cond_val = yield node.condition
         cond_bool = self.builder.icmp_signed('!=', cond_val, ir.Constant(self.i64, 0))
 
         then_block = self.builder.append_basic_block(name="then")
@@ -128,7 +213,7 @@ class LLVMCodeGen(NodeVisitor):
 
             # Genera codice Else
             self.builder.position_at_start(else_block)
-            self.visit(node.else_branch)
+            yield node.else_branch
             if not self.builder.block.is_terminated:
                 self.builder.branch(merge_block)
         else:
@@ -136,13 +221,18 @@ class LLVMCodeGen(NodeVisitor):
 
         # Genera codice Then
         self.builder.position_at_start(then_block)
-        self.visit(node.then_branch)
+        yield node.then_branch
         if not self.builder.block.is_terminated:
             self.builder.branch(merge_block)
 
         self.builder.position_at_start(merge_block)
 
+    @iterative
     def visit_WhileStmt(self, node):
+        if node.counted:
+            yield from self.counted_loop(node)
+            return
+
         cond_block = self.builder.append_basic_block(name="while_cond")
         body_block = self.builder.append_basic_block(name="while_body")
         after_block = self.builder.append_basic_block(name="while_after")
@@ -151,23 +241,58 @@ class LLVMCodeGen(NodeVisitor):
 
         # Blocco Condizione
         self.builder.position_at_start(cond_block)
-        cond_val = self.visit(node.condition)
+        cond_val = yield node.condition
         cond_bool = self.builder.icmp_signed('!=', cond_val, ir.Constant(self.i64, 0))
         self.builder.cbranch(cond_bool, body_block, after_block)
 
         # Blocco Corpo
         self.builder.position_at_start(body_block)
-        self.visit(node.body)
+        yield node.body
         if not self.builder.block.is_terminated:
             self.builder.branch(cond_block)
 
         # Dopo il While
         self.builder.position_at_start(after_block)
 
+    def counted_loop(self, node):
+        # Forma canonica: controllo d'ingresso nel blocco corrente, poi un corpo
+        # con il test in fondo (latch) su cui è annotato !llvm.loop
+        body_block = self.builder.append_basic_block(name="repeat_body")
+        after_block = self.builder.append_basic_block(name="repeat_after")
+
+        cond_val = yield node.condition
+        cond_bool = self.builder.icmp_signed('!=', cond_val, ir.Constant(self.i64, 0))
+        self.builder.cbranch(cond_bool, body_block, after_block)
+
+        self.builder.position_at_start(body_block)
+        yield node.body
+        if not self.builder.block.is_terminated:
+            cond_val = yield node.condition
+            cond_bool = self.builder.icmp_signed('!=', cond_val, ir.Constant(self.i64, 0))
+            latch = self.builder.cbranch(cond_bool, body_block, after_block)
+            latch.set_metadata('llvm.loop', self.loop_metadata())
+
+        self.builder.position_at_start(after_block)
 
+    def loop_metadata(self):
+        # Identificatore del ciclo: nodo autoreferenziale, distinto per ciascun ciclo
+        module = self.module
+        if self.loop_hints is None:
+            self.loop_hints = [
+                module.add_metadata([ir.MetaDataString(module, name),
+                                     *(ir.Constant(self.i1, int(value)) for value in values)])
+                for name, *values in LOOP_HINTS
+            ]
+        self.loop_count += 1
+        loop_id = module.add_metadata([ir.MetaDataString(module, f"aether.loop.{self.loop_count}")])
+        loop_id.operands = (loop_id, *self.loop_hints)
+        return loop_id
+
+
+    @iterative
     def visit_BinaryExpr(self, node):
-        lhs = self.visit(node.left)
-        rhs = self.visit(node.right)
+        lhs = yield node.left
+        rhs = yield node.right
 
         op = node.operator
 
@@ -196,8 +321,9 @@ class LLVMCodeGen(NodeVisitor):
 
         raise Exception(f"Operatore non supportato in CodeGen: {op}")
 
+    @iterative
     def visit_UnaryExpr(self, node):
-        operand = self.visit(node.operand)
+        operand = yield node.operand
         if node.operator == TokenType.MINUS:
             return self.builder.neg(operand, name="negtmp")
         elif node.operator == TokenType.NOT:
@@ -205,16 +331,20 @@ class LLVMCodeGen(NodeVisitor):
             return self.builder.zext(is_zero, self.i64, name="nottmp")
         return None
 
+    @iterative
     def visit_CallExpr(self, node):
-        callee_func = self.functions.get(node.callee)
+        callee_func = self.lookup_function(self.sym(node, node.callee))
         if not callee_func:
             raise Exception(f"Funzione sconosciuta: {node.callee}")
 
-        args = [self.visit(arg) for arg in node.args]
+        args = []
+        for arg in node.args:
+            args.append((yield arg))
         return self.builder.call(callee_func, args, name="calltmp")
 
+    @iterative
     def visit_ExprStmt(self, node):
-        self.visit(node.expr)
+        yield node.expr
 
     def visit_RepeatStmt(self, node):
         raise NotImplementedError("RepeatStmt deve essere rimosso dal Desugarer prima del CodeGen")
@@ -0,0 +1,227 @@
+from src.ast_nodes import NodeVisitor, iterative
+import src.ast_nodes as ast
+from src.hashcons import ExprFactory
+from src.effects import removable_call
+
+def assigned_names(node):
+    # Variabili definite o assegnate nel sottoalbero
+    return {child.name for child in ast.walk(node) if isinstance(child, (ast.VarDecl, ast.AssignExpr))}
+
+class ConstantPropagator(NodeVisitor):
+    # Propagazione di costanti e copie dentro una funzione. Lo stato associa a
+    # una variabile il letterale o la variabile (un VariableExpr) che contiene;
+    # le espressioni sono visitate nell'ordine di valutazione del codegen.
+    # Ai rami di un if sopravvivono i fatti comuni, in un while quelli sulle
+    # variabili che il ciclo non assegna. Ogni modifica dello stato è registrata
+    # con il valore precedente: i rami si annullano e si confrontano senza
+    # copiare lo stato, solo sulle variabili toccate. I nodi condivisi non
+    # vengono modificati: il padre è ricostruito con la factory delle espressioni.
+    def __init__(self, exprs=None):
+        self.exprs = exprs or ExprFactory()
+        self.env = {}
+        self.log = []
+        self.readers = {}
+        self.replaced = 0
+
+    def update(self, name, value):
+        env = self.env
+        previous = env.get(name)
+        if previous is value:
+            return
+        self.log.append((name, previous))
+        if value is None:
+            del env[name]
+        else:
+            env[name] = value
+
+    def undo(self, mark):
+        env, log = self.env, self.log
+        while len(log) > mark:
+            name, previous = log.pop()
+            if previous is None:
+                env.pop(name, None)
+            else:
+                env[name] = previous
+
+    def kill(self, name):
+        # La variabile cambia valore: cadono il suo fatto e le copie che la leggono
+        env = self.env
+        self.update(name, None)
+        for other in self.readers.get(name, ()):
+            value = env.get(other)
+            if isinstance(value, ast.VariableExpr) and value.name == name:
+                self.update(other, None)
+
+    def define(self, name, value):
+        self.kill(name)
+        if isinstance(value, ast.LiteralExpr):
+            self.update(name, value)
+        elif isinstance(value, ast.VariableExpr) and value.name != name:
+            self.update(name, value)
+            self.readers.setdefault(value.name, []).append(name)
+
+    @iterative
+    def visit_FunctionDecl(self, node):
+        self.env = {}
+        self.log = []
+        self.readers = {}
+        node.body = yield node.body
+        return node
+
+    @iterative
+    def visit_Block(self, node):
+        statements = []
+        for stmt in node.statements:
+            statements.append((yield stmt))
+        node.statements = statements
+        return node
+
+    @iterative
+    def visit_VarDecl(self, node):
+        node.initializer = yield node.initializer
+        self.define(node.name, node.initializer)
+        return node
+
+    @iterative
+    def visit_AssignExpr(self, node):
+        node.value = yield node.value
+        self.define(node.name, node.value)
+        return node
+
+    @iterative
+    def visit_IfStmt(self, node):
+        node.condition = yield node.condition
+        mark = len(self.log)
+        node.then_branch = yield node.then_branch
+        after_then = {name: self.env.get(name) for name, _ in self.log[mark:]}
+        self.undo(mark)
+        if node.else_branch:
+            node.else_branch = yield node.else_branch
+        # Per le variabili toccate solo dal ramo else il valore dopo il then è quello iniziale
+        for name, previous in self.log[mark:]:
+            after_then.setdefault(name, previous)
+        env = self.env
+        for name, value in after_then.items():
+            current = env.get(name)
+            if current is not None and current != value:
+                self.update(name, None)
+        return node
+
+    @iterative
+    def visit_WhileStmt(self, node):
+        for name in assigned_names(node):
+            self.kill(name)
+        mark = len(self.log)
+        node.condition = yield node.condition
+        node.body = yield node.body
+        # Il ciclo può non essere mai eseguito
+        self.undo(mark)
+        return node
+
+    @iterative
+    def visit_ReturnStmt(self, node):
+        node.value = yield node.value
+        return node
+
+    @iterative
+    def visit_ExprStmt(self, node):
+        node.expr = yield node.expr
+        return node
+
+    @iterative
+    def visit_BinaryExpr(self, node):
+        left = yield node.left
+        right = yield node.right
+        return self.exprs.rebuild_binary(node, left, right)
+
+    @iterative
+    def visit_UnaryExpr(self, node):
+        return self.exprs.rebuild_unary(node, (yield node.operand))
+
+    @iterative
+    def visit_CallExpr(self, node):
+        args = []
+        for arg in node.args:
+            args.append((yield arg))
+        node.args = args
+        return node
+
+    def visit_VariableExpr(self, node):
+        value = self.env.get(node.name)
+        if value is None:
+            return node
+        self.replaced += 1
+        return value
+
+    def visit_LiteralExpr(self, node):
+        return node
+
+def written_variable(stmt):
+    # Variabile scritta da una dichiarazione o da un assegnamento usato come
+    # istruzione, con il valore assegnato
+    if isinstance(stmt, ast.VarDecl):
+        return stmt.name, stmt.initializer
+    if isinstance(stmt, ast.ExprStmt) and isinstance(stmt.expr, ast.AssignExpr):
+        return stmt.expr.name, stmt.expr.value
+    return None, None
+
+def remove_dead_variables(decl):
+    # Variabili mai lette dopo la propagazione: le dichiarazioni e gli
+    # assegnamenti che le scrivono vengono eliminati se nessun valore assegnato
+    # ha effetti. Un assegnamento annidato in un'espressione mantiene la variabile.
+    blocks = []
+    kept = set()
+    assigns = []
+    for node in ast.walk(decl.body):
+        if isinstance(node, ast.VariableExpr):
+            kept.add(node.name)
+        elif isinstance(node, ast.AssignExpr):
+            assigns.append(node)
+        elif isinstance(node, ast.Block):
+            blocks.append(node)
+    statement_assigns = set()
+    writes = set()
+    for block in blocks:
+        for stmt in block.statements:
+            name, value = written_variable(stmt)
+            if name is None:
+                continue
+            writes.add(name)
+            if isinstance(stmt, ast.ExprStmt):
+                statement_assigns.add(id(stmt.expr))
+            if name not in kept and not removable_call(value):
+                kept.add(name)
+    kept.update(node.name for node in assigns if id(node) not in statement_assigns)
+    dead = writes - kept
+    if not dead:
+        return 0
+
+    removed = 0
+    for block in blocks:
+        statements = [stmt for stmt in block.statements if written_variable(stmt)[0] not in dead]
+        removed += len(block.statements) - len(statements)
+        block.statements = statements
+    return removed
+
+def merge_overwritten_declarations(decl):
+    # 'let x = c; x = e;' diventa 'let x = e;' se c non ha effetti ed e non legge
+    # né assegna x
+    merged = 0
+    for block in ast.walk(decl.body):
+        if not isinstance(block, ast.Block):
+            continue
+        statements = []
+        for stmt in block.statements:
+            previous = statements[-1] if statements else None
+            if isinstance(previous, ast.VarDecl) and isinstance(stmt, ast.ExprStmt) \
+                    and isinstance(stmt.expr, ast.AssignExpr) and stmt.expr.name == previous.name \
+                    and removable_call(previous.initializer) \
+                    and not any(isinstance(node, (ast.VariableExpr, ast.AssignExpr)) and node.name == previous.name
+                                for node in ast.walk(stmt.expr.value)):
+                previous.initializer = stmt.expr.value
+                merged += 1
+                continue
+            statements.append(stmt)
+        if merged:
+            block.statements = statements
+    return merged
@@ -0,0 +1,204 @@
+import src.ast_nodes as ast
+from src.ast_nodes import Effect
+from src.hashcons import ExprFactory
+from src.inliner import local_variable
+from src.licm import statement_blocks
+
+CSE_PREFIX = "__cse"
+
+# Istruzioni di una regione lineare; un if la chiude con la propria condizione
+STRAIGHT_LINE = (ast.VarDecl, ast.ExprStmt, ast.ReturnStmt)
+
+def statement_expression(stmt):
+    if isinstance(stmt, ast.VarDecl):
+        return stmt.initializer
+    elif isinstance(stmt, ast.ExprStmt):
+        return stmt.expr
+    elif isinstance(stmt, ast.ReturnStmt):
+        return stmt.value
+    return stmt.condition
+
+def set_statement_expression(stmt, expr):
+    if isinstance(stmt, ast.VarDecl):
+        stmt.initializer = expr
+    elif isinstance(stmt, ast.ExprStmt):
+        stmt.expr = expr
+    elif isinstance(stmt, ast.ReturnStmt):
+        stmt.value = expr
+    else:
+        stmt.condition = expr
+
+def regions(statements):
+    # Sequenze di istruzioni consecutive senza cicli né rami
+    region = []
+    for stmt in statements:
+        if isinstance(stmt, STRAIGHT_LINE) and statement_expression(stmt) is not None:
+            region.append(stmt)
+            continue
+        if isinstance(stmt, ast.IfStmt):
+            region.append(stmt)
+        if region:
+            yield region
+        region = []
+    if region:
+        yield region
+
+def postorder(expr):
+    # Una voce per occorrenza, nell'ordine di valutazione del codegen: nodo,
+    # posizione in cui inizia il suo sottoalbero e posizioni dei figli
+    order = []
+    values = []
+    stack = [(expr, None, 0)]
+    while stack:
+        node, children, start = stack.pop()
+        if children is None:
+            children = list(ast.iter_child_nodes(node))
+            stack.append((node, children, len(order)))
+            stack.extend((child, None, 0) for child in reversed(children))
+            continue
+        positions = values[len(values) - len(children):]
+        del values[len(values) - len(children):]
+        values.append(len(order))
+        order.append((node, start, positions))
+    return order
+
+def has_effects(node):
+    # Valutazione che non si può anticipare: assegnamento o chiamata che può
+    # avere effetti o non terminare
+    if isinstance(node, ast.AssignExpr):
+        return True
+    if isinstance(node, ast.CallExpr):
+        decl = node.decl
+        return decl is None or decl.effect is None or decl.effect == Effect.IMPURE or not decl.willreturn
+    return False
+
+def pure_call(node):
+    return node.decl is not None and node.decl.effect == Effect.PURE
+
+class ValueNumbering:
+    # Eliminazione delle sottoespressioni comuni con la numerazione dei valori
+    # locale. In una regione lineare ogni occorrenza di un'espressione riceve un
+    # numero di valore, calcolato dall'operatore e dai numeri dei figli; le
+    # variabili sono numerate per versione, che cresce a ogni assegnamento o
+    # dichiarazione. Due occorrenze con lo stesso numero hanno lo stesso valore.
+    # Un'espressione ripetuta (operatore o chiamata a funzione pura) viene
+    # calcolata una volta in una temporanea dichiarata prima dell'istruzione
+    # della prima occorrenza, se in quell'istruzione nulla con effetti la
+    # precede. Le funzioni non accedono alle variabili del chiamante: le
+    # chiamate impure non invalidano i valori, ma non sono mai riutilizzate.
+    def __init__(self, exprs=None):
+        self.exprs = exprs or ExprFactory()
+        self.counter = 0
+        self.eliminated = 0
+
+    def run(self, decl):
+        eliminated = self.eliminated
+        for block in statement_blocks(decl.body):
+            # istruzione -> temporanee da dichiarare subito prima
+            inserted = {}
+            for region in regions(block.statements):
+                self.number_region(decl, region, inserted)
+            if inserted:
+                statements = []
+                for stmt in block.statements:
+                    statements.extend(inserted.get(id(stmt), ()))
+                    statements.append(stmt)
+                block.statements = statements
+        return self.eliminated - eliminated
+
+    def number_region(self, decl, region, inserted):
+        table = {}
+        versions = {}
+        orders = []
+        # numero di valore -> occorrenze (istruzione, posizione, inizio del sottoalbero)
+        occurrences = {}
+        # per istruzione: posizione della prima valutazione con effetti
+        barriers = []
+        fresh = 0
+        for index, stmt in enumerate(region):
+            order = postorder(statement_expression(stmt))
+            orders.append(order)
+            numbers = []
+            barrier = len(order)
+            for position, (node, start, children) in enumerate(order):
+                if has_effects(node):
+                    barrier = min(barrier, position)
+                key = None
+                if isinstance(node, ast.LiteralExpr):
+                    key = ("literal", node.value)
+                elif isinstance(node, ast.VariableExpr):
+                    key = ("variable", node.name, versions.get(node.name, 0))
+                elif isinstance(node, ast.BinaryExpr):
+                    key = ("binary", node.operator, numbers[children[0]], numbers[children[1]])
+                elif isinstance(node, ast.UnaryExpr):
+                    key = ("unary", node.operator, numbers[children[0]])
+                elif isinstance(node, ast.CallExpr) and pure_call(node):
+                    key = ("call", node.callee) + tuple(numbers[child] for child in children)
+                elif isinstance(node, ast.AssignExpr):
+                    versions[node.name] = versions.get(node.name, 0) + 1
+                # Assegnamenti e chiamate impure hanno sempre un numero nuovo
+                if key is None:
+                    fresh += 1
+                    number = -fresh
+                else:
+                    number = table.setdefault(key, len(table))
+                numbers.append(number)
+                if key is not None and key[0] not in ("literal", "variable"):
+                    occurrences.setdefault(number, []).append((index, position, start))
+            barriers.append(barrier)
+            if isinstance(stmt, ast.VarDecl):
+                versions[stmt.name] = versions.get(stmt.name, 0) + 1
+
+        # Prima le espressioni più grandi: le occorrenze ripetute che
+        # contengono non vanno più valutate
+        groups = sorted((found for found in occurrences.values() if len(found) > 1),
+                        key=lambda found: found[0][1] - found[0][2], reverse=True)
+        dead = [[] for _ in region]
+        # posizione (istruzione, posizione) -> (temporanea, dichiarazione o None)
+        replacements = {}
+        for found in groups:
+            live = [(index, position, start) for index, position, start in found
+                    if not any(first <= start and position <= last for first, last in dead[index])]
+            first = next((i for i, (index, _, start) in enumerate(live) if barriers[index] >= start), None)
+            if first is None or len(live) - first < 2:
+                continue
+            live = live[first:]
+            self.counter += 1
+            variable = local_variable(f"{CSE_PREFIX}{self.counter}", decl.frame_size)
+            decl.frame_size += 1
+            declaration = ast.VarDecl(variable.name, None)
+            declaration.slot = variable.slot
+            index, position, start = live[0]
+            replacements[(index, position)] = (variable, declaration)
+            for index, position, start in live[1:]:
+                replacements[(index, position)] = (variable, None)
+                dead[index].append((start, position))
+            self.eliminated += len(live) - 1
+        if not replacements:
+            return
+
+        for index in sorted({index for index, _ in replacements}):
+            # Temporanee nell'ordine di valutazione delle prime occorrenze
+            declarations = []
+            new = []
+            for position, (node, start, children) in enumerate(orders[index]):
+                rebuilt = [new[child] for child in children]
+                if isinstance(node, ast.BinaryExpr):
+                    node = self.exprs.rebuild_binary(node, rebuilt[0], rebuilt[1])
+                elif isinstance(node, ast.UnaryExpr):
+                    node = self.exprs.rebuild_unary(node, rebuilt[0])
+                elif isinstance(node, ast.CallExpr):
+                    node.args = rebuilt
+                elif isinstance(node, ast.AssignExpr):
+                    node.value = rebuilt[0]
+                replacement = replacements.get((index, position))
+                if replacement is not None:
+                    variable, declaration = replacement
+                    if declaration is not None:
+                        declaration.initializer = node
+                        declarations.append(declaration)
+                    node = variable
+                new.append(node)
+            set_statement_expression(region[index], new[-1])
+            if declarations:
+                inserted[id(region[index])] = declarations
@@ -0,0 +1,198 @@
+from src.ast_nodes import NodeVisitor, iterative, Effect
+import src.ast_nodes as ast
+from src.tokens import TokenType
+
+# Istruzioni e chiamate eseguibili per ogni chiamata valutata a compile time
+CTFE_BUDGET = 10000
+# Chiamate annidate oltre le quali la valutazione viene abbandonata
+CTFE_MAX_DEPTH = 256
+
+I64_MIN = -(1 << 63)
+
+def wrap(value):
+    # Aritmetica in complemento a due su 64 bit, come le istruzioni i64 emesse
+    return (value - I64_MIN) % (1 << 64) + I64_MIN
+
+def evaluate_binary(operator, left, right):
+    # Operazione tra costanti con la semantica del codice generato: wrap-around
+    # a 64 bit, divisione troncata verso zero, && e || bit a bit. None se il
+    # risultato non è definito (I64_MIN / -1) o l'operatore è sconosciuto.
+    if operator == TokenType.PLUS:
+        return wrap(left + right)
+    elif operator == TokenType.MINUS:
+        return wrap(left - right)
+    elif operator == TokenType.MUL:
+        return wrap(left * right)
+    elif operator == TokenType.DIV:
+        if right == 0:
+            raise ZeroDivisionError("Divisione per zero rilevata durante Constant Folding")
+        if left == I64_MIN and right == -1:
+            return None
+        quotient = abs(left) // abs(right)
+        return quotient if (left < 0) == (right < 0) else -quotient
+
+    elif operator == TokenType.EQ:
+        return 1 if left == right else 0
+    elif operator == TokenType.NE:
+        return 1 if left != right else 0
+    elif operator == TokenType.LT:
+        return 1 if left < right else 0
+    elif operator == TokenType.GT:
+        return 1 if left > right else 0
+    elif operator == TokenType.LE:
+        return 1 if left <= right else 0
+    elif operator == TokenType.GE:
+        return 1 if left >= right else 0
+    elif operator == TokenType.AND:
+        return left & right
+    elif operator == TokenType.OR:
+        return left | right
+    return None
+
+def evaluate_unary(operator, operand):
+    if operator == TokenType.MINUS:
+        return wrap(-operand)
+    elif operator == TokenType.NOT:
+        return 1 if operand == 0 else 0
+    return None
+
+class EvaluationAborted(Exception):
+    # Budget esaurito, chiamata a una extern o operazione non definita
+    pass
+
+class CompileTimeEvaluator(NodeVisitor):
+    # Interprete dell'AST analizzato per le chiamate a funzioni pure con
+    # argomenti letterali (CTFE). Ogni valutazione ha un budget di istruzioni e
+    # chiamate e un limite di profondità; i risultati sono memorizzati per
+    # (funzione, argomenti), anche quelli delle chiamate annidate, così una
+    # ricorsione come fib(n) costa un passo per argomento distinto.
+    def __init__(self, budget=CTFE_BUDGET, max_depth=CTFE_MAX_DEPTH):
+        self.budget = budget
+        self.max_depth = max_depth
+        # (funzione, argomenti) -> risultato; None se la valutazione è stata abbandonata
+        self.cache = {}
+        self.frames = []
+        self.steps = 0
+
+    def evaluable(self, decl):
+        return isinstance(decl, ast.FunctionDecl) and decl.effect == Effect.PURE
+
+    def evaluate(self, call):
+        # Valore della chiamata, o None se non è valutabile
+        if not self.evaluable(call.decl) or not all(isinstance(arg, ast.LiteralExpr) for arg in call.args):
+            return None
+        key = (call.decl.name, tuple(wrap(arg.value) for arg in call.args))
+        if key in self.cache:
+            return self.cache[key]
+        self.steps = self.budget
+        self.frames = []
+        try:
+            self.cache[key] = self.run(self.invoke(call.decl, key[1]))
+        except (EvaluationAborted, ZeroDivisionError):
+            self.cache[key] = None
+        return self.cache[key]
+
+    def tick(self):
+        self.steps -= 1
+        if self.steps < 0:
+            raise EvaluationAborted()
+
+    def invoke(self, decl, args):
+        if len(self.frames) >= self.max_depth:
+            raise EvaluationAborted()
+        self.frames.append(dict(zip(decl.params, args)))
+        result = yield decl.body
+        self.frames.pop()
+        result = 0 if result is None else result
+        self.cache[(decl.name, args)] = result
+        return result
+
+    def generic_visit(self, node):
+        # Pipe, lambda e repeat non esistono più dopo il desugaring
+        raise EvaluationAborted()
+
+    # Le istruzioni restituiscono il valore del return eseguito, altrimenti None
+    @iterative
+    def visit_Block(self, node):
+        for stmt in node.statements:
+            self.tick()
+            result = yield stmt
+            if result is not None:
+                return result
+        return None
+
+    @iterative
+    def visit_VarDecl(self, node):
+        self.frames[-1][node.name] = yield node.initializer
+        return None
+
+    @iterative
+    def visit_ExprStmt(self, node):
+        yield node.expr
+        return None
+
+    @iterative
+    def visit_ReturnStmt(self, node):
+        return (yield node.value)
+
+    @iterative
+    def visit_IfStmt(self, node):
+        branch = node.then_branch if (yield node.condition) != 0 else node.else_branch
+        if branch is None:
+            return None
+        return (yield branch)
+
+    @iterative
+    def visit_WhileStmt(self, node):
+        while True:
+            self.tick()
+            if (yield node.condition) == 0:
+                return None
+            result = yield node.body
+            if result is not None:
+                return result
+
+    def visit_LiteralExpr(self, node):
+        return wrap(node.value)
+
+    def visit_VariableExpr(self, node):
+        value = self.frames[-1].get(node.name)
+        if value is None:
+            raise EvaluationAborted()
+        return value
+
+    @iterative
+    def visit_AssignExpr(self, node):
+        value = self.frames[-1][node.name] = yield node.value
+        return value
+
+    @iterative
+    def visit_BinaryExpr(self, node):
+        left = yield node.left
+        right = yield node.right
+        value = evaluate_binary(node.operator, left, right)
+        if value is None:
+            raise EvaluationAborted()
+        return value
+
+    @iterative
+    def visit_UnaryExpr(self, node):
+        value = evaluate_unary(node.operator, (yield node.operand))
+        if value is None:
+            raise EvaluationAborted()
+        return value
+
+    @iterative
+    def visit_CallExpr(self, node):
+        args = []
+        for arg in node.args:
+            args.append((yield arg))
+        self.tick()
+        if not self.evaluable(node.decl):
+            raise EvaluationAborted()
+        key = (node.decl.name, tuple(args))
+        if key in self.cache:
+            if self.cache[key] is None:
+                raise EvaluationAborted()
+            return self.cache[key]
+        return (yield from self.invoke(node.decl, key[1]))
@@ -1,30 +1,51 @@
-from src.ast_nodes import NodeVisitor
+from src.ast_nodes import NodeVisitor, iterative
 import src.ast_nodes as ast
+from src.hashcons import ExprFactory
 from src.tokens import TokenType
 
+# Prefisso delle funzioni generate dalle lambda: nomi mai visibili dall'esterno
+LAMBDA_PREFIX = "__lambda_"
+
+def is_constant(node):
+    # Espressione di soli letterali: il valore non dipende dal momento della valutazione
+    return all(isinstance(child, (ast.LiteralExpr, ast.BinaryExpr, ast.UnaryExpr))
+               for child in ast.walk(node))
+
 class Desugarer(NodeVisitor):
-    def __init__(self):
+    def __init__(self, symbols=None, exprs=None):
         self.counter_id = 0
         self.generated_functions = [] #lambda
+        # SymbolTable condivisa: i nomi generati vengono internati subito
+        self.symbols = symbols
+        self.exprs = exprs or ExprFactory()
 
-    def _get_unique_var(self):
-        name = f"__repeat_counter_{self.counter_id}"
+    def _get_unique_var(self, kind="counter"):
+        name = f"__repeat_{kind}_{self.counter_id}"
         self.counter_id += 1
         return name
 
+    def _sym(self, name):
+        return self.symbols.intern(name) if self.symbols is not None else None
+
+    @iterative
     def visit_Program(self, node):
-        node.declarations = [self.visit(decl) for decl in node.declarations]
+        declarations = []
+        for decl in node.declarations:
+            declarations.append((yield decl))
+        node.declarations = declarations
         node.declarations.extend(self.generated_functions)
         return node
 
+    @iterative
     def visit_FunctionDecl(self, node):
-        node.body = self.visit(node.body)
+        node.body = yield node.body
         return node
 
+    @iterative
     def visit_Block(self, node):
         new_stmts = []
         for stmt in node.statements:
-            desugared = self.visit(stmt)
+            desugared = yield stmt
             if isinstance(desugared, list):
                 new_stmts.extend(desugared)
             else:
@@ -32,33 +53,50 @@ class Desugarer(NodeVisitor):
         node.statements = new_stmts
         return node
 
+    @iterative
     def visit_RepeatStmt(self, node):
-        counter_name = self._get_unique_var()
-
+        init_decl = self.counter_decl(self._get_unique_var())
+        constant = is_constant(node.count)
+        count = yield node.count
+        limit_decl, limit = self.hoist_count(count, constant)
+        visited_body = yield node.body
+        return self.build_repeat(init_decl, limit_decl, limit, visited_body)
+
+    def counter_decl(self, counter_name):
         # Inizializzazione
-        init_decl = ast.VarDecl(name=counter_name, initializer=ast.LiteralExpr(0))
+        return ast.VarDecl(name=counter_name, initializer=self.exprs.literal(0), sym=self._sym(counter_name))
+
+    def hoist_count(self, count, constant):
+        # Il conteggio è valutato una sola volta, prima del ciclo: se nel sorgente
+        # non è una costante viene salvato in una variabile nascosta usata come
+        # limite (la scelta non dipende dal folding, che il middle end fuso
+        # applica prima di arrivare qui)
+        if constant:
+            return None, count
+        limit_name = self._get_unique_var("limit")
+        limit_sym = self._sym(limit_name)
+        limit_decl = ast.VarDecl(name=limit_name, initializer=count, sym=limit_sym)
+        return limit_decl, self.exprs.variable(limit_name, limit_sym)
+
+    def build_repeat(self, init_decl, limit_decl, limit, visited_body):
+        counter_name = init_decl.name
+        counter_sym = init_decl.sym
+        exprs = self.exprs
 
         # Condizione
-        condition = ast.BinaryExpr(
-            left=ast.VariableExpr(counter_name),
-            operator=TokenType.LT,
-            right=self.visit(node.count)
-        )
+        condition = exprs.binary(exprs.variable(counter_name, counter_sym), TokenType.LT, limit)
 
         # Incremento
         increment = ast.ExprStmt(
             expr=ast.AssignExpr(
                 name=counter_name,
-                value=ast.BinaryExpr(
-                    left=ast.VariableExpr(counter_name),
-                    operator=TokenType.PLUS,
-                    right=ast.LiteralExpr(1)
-                )
+                value=exprs.binary(exprs.variable(counter_name, counter_sym), TokenType.PLUS,
+                                   exprs.literal(1)),
+                sym=counter_sym
             )
         )
 
         # Controllo di sicurezza
-        visited_body = self.visit(node.body)
         if isinstance(visited_body, ast.Block):
             new_body_stmts = visited_body.statements
         else:
@@ -67,13 +105,19 @@ class Desugarer(NodeVisitor):
         # While
         new_body_stmts.append(increment)
         while_node = ast.WhileStmt(condition=condition, body=ast.Block(new_body_stmts))
+        while_node.counted = True
 
-        return [init_decl, while_node]
+        if limit_decl is None:
+            return [init_decl, while_node]
+        return [init_decl, limit_decl, while_node]
 
+    @iterative
     def visit_PipeExpr(self, node):
-        left = self.visit(node.left)
-        right = self.visit(node.right)
+        left = yield node.left
+        right = yield node.right
+        return self.build_pipe(left, right)
 
+    def build_pipe(self, left, right):
         # Il figlio destro è una chiamata a funzione
         if isinstance(right, ast.CallExpr):
             right.args.insert(0, left)
@@ -81,66 +125,88 @@ class Desugarer(NodeVisitor):
 
         # Il figlio destro è una variabile
         if isinstance(right, ast.VariableExpr):
-            return ast.CallExpr(callee=right.name, args=[left])
+            return ast.CallExpr(callee=right.name, args=[left], sym=right.sym)
 
         raise ValueError(f"Lato destro del pipe '|>' invalido. Attesa funzione o chiamata, trovato: {type(right).__name__}")
 
+    @iterative
     def visit_VarDecl(self, node):
-        node.initializer = self.visit(node.initializer)
+        node.initializer = yield node.initializer
         return node
 
+    @iterative
     def visit_ReturnStmt(self, node):
-        node.value = self.visit(node.value)
+        node.value = yield node.value
         return node
 
+    @iterative
     def visit_IfStmt(self, node):
-        node.condition = self.visit(node.condition)
-        node.then_branch = self.visit(node.then_branch)
+        node.condition = yield node.condition
+        node.then_branch = yield node.then_branch
         if node.else_branch:
-            node.else_branch = self.visit(node.else_branch)
+            node.else_branch = yield node.else_branch
         return node
 
+    @iterative
     def visit_WhileStmt(self, node):
-        node.condition = self.visit(node.condition)
-        node.body = self.visit(node.body)
+        node.condition = yield node.condition
+        node.body = yield node.body
         return node
 
+    @iterative
     def visit_BinaryExpr(self, node):
-        node.left = self.visit(node.left)
-        node.right = self.visit(node.right)
-        return node
+        left = yield node.left
+        right = yield node.right
+        return self.exprs.rebuild_binary(node, left, right)
 
+    @iterative
     def visit_AssignExpr(self, node):
-        node.value = self.visit(node.value)
+        node.value = yield node.value
         return node
 
+    @iterative
     def visit_CallExpr(self, node):
-        node.args = [self.visit(arg) for arg in node.args]
+        args = []
+        for arg in node.args:
+            args.append((yield arg))
+        node.args = args
         return node
 
+    @iterative
     def visit_LambdaExpr(self, node):
         # Generiamo una nuova funzione
-        func_name = f"__lambda_{self.counter_id}"
+        func_name = self._get_lambda_name()
+        visited_body_expr = yield node.body
+        return self.build_lambda(func_name, node, visited_body_expr)
+
+    def _get_lambda_name(self):
+        name = f"{LAMBDA_PREFIX}{self.counter_id}"
         self.counter_id += 1
-        visited_body_expr = self.visit(node.body)
+        return name
+
+    def build_lambda(self, func_name, node, visited_body_expr):
         return_stmt = ast.ReturnStmt(value=visited_body_expr)
 
         func_body_block = ast.Block(statements=[return_stmt])
+        func_sym = self._sym(func_name)
         new_func = ast.FunctionDecl(
             name=func_name,
             params=node.params,
-            body=func_body_block
+            body=func_body_block,
+            sym=func_sym,
+            param_syms=node.param_syms
         )
         self.generated_functions.append(new_func)
-        return ast.VariableExpr(name=func_name)
+        return ast.VariableExpr(name=func_name, sym=func_sym)
 
 
     def visit_LiteralExpr(self, node): return node
     def visit_VariableExpr(self, node): return node
+    @iterative
     def visit_UnaryExpr(self, node):
-        node.operand = self.visit(node.operand)
-        return node
+        return self.exprs.rebuild_unary(node, (yield node.operand))
+    @iterative
     def visit_ExprStmt(self, node):
-        node.expr = self.visit(node.expr)
+        node.expr = yield node.expr
         return node
     def visit_ExternDecl(self, node): return node
@@ -0,0 +1,83 @@
+from collections import defaultdict
+import src.ast_nodes as ast
+from src.ast_nodes import Effect
+
+# Cicli che potrebbero non terminare: una funzione che li contiene non è 'willreturn'
+LOOPS = (ast.WhileStmt, ast.RepeatStmt)
+
+def scan_body(body):
+    # Funzioni chiamate dal corpo e presenza di cicli. Vale anche prima del
+    # desugaring: il bersaglio di un pipe è una chiamata e il corpo di una
+    # lambda è attribuito alla funzione che la contiene.
+    # Gli assegnamenti riguardano solo variabili locali e non sono effetti.
+    callees = set()
+    loops = False
+    for node in ast.walk(body):
+        if isinstance(node, ast.CallExpr):
+            callees.add(node.callee)
+        elif isinstance(node, ast.PipeExpr) and isinstance(node.right, ast.VariableExpr):
+            callees.add(node.right.name)
+        elif isinstance(node, LOOPS):
+            loops = True
+    return callees, loops
+
+def summarize(callees, loops, lookup):
+    # Effetto e terminazione di un corpo dati quelli delle funzioni chiamate;
+    # una funzione sconosciuta è trattata come impura
+    effect = Effect.PURE
+    willreturn = not loops
+    for name in callees:
+        decl = lookup(name)
+        if decl is None or decl.effect is None:
+            return Effect.IMPURE, False
+        effect = max(effect, decl.effect)
+        willreturn = willreturn and bool(decl.willreturn)
+    return effect, willreturn
+
+def infer_effects(program):
+    # Punto fisso minimo sul grafo delle chiamate: le funzioni partono pure e
+    # non terminanti, l'effetto sale al massimo di quelli dei chiamati e la
+    # terminazione vale solo senza cicli e con chiamati che terminano
+    # (la ricorsione resta quindi non 'willreturn')
+    functions = {}
+    for decl in program.declarations:
+        if isinstance(decl, ast.ExternDecl):
+            # Una extern pure/readonly è considerata anche terminante
+            decl.willreturn = decl.effect != Effect.IMPURE
+            functions[decl.name] = decl
+        elif isinstance(decl, ast.FunctionDecl):
+            decl.effect = Effect.PURE
+            decl.willreturn = False
+            functions[decl.name] = decl
+
+    facts = {}
+    callers = defaultdict(list)
+    for decl in functions.values():
+        if isinstance(decl, ast.FunctionDecl):
+            callees, loops = facts[decl.name] = scan_body(decl.body)
+            for callee in callees:
+                callers[callee].append(decl.name)
+
+    worklist = list(facts)
+    while worklist:
+        name = worklist.pop()
+        decl = functions[name]
+        effect, willreturn = summarize(*facts[name], functions.get)
+        if effect != decl.effect or willreturn != decl.willreturn:
+            decl.effect, decl.willreturn = effect, willreturn
+            worklist.extend(callers[name])
+
+    return [decl.name for decl in functions.values()
+            if isinstance(decl, ast.FunctionDecl) and decl.effect == Effect.PURE]
+
+def removable_call(node):
+    # Chiamata il cui risultato, se inutilizzato, può essere scartato: la funzione
+    # e gli argomenti non scrivono memoria né assegnano variabili, e terminano
+    for child in ast.walk(node):
+        if isinstance(child, ast.AssignExpr):
+            return False
+        if isinstance(child, ast.CallExpr):
+            decl = child.decl
+            if decl is None or decl.effect is None or decl.effect == Effect.IMPURE or not decl.willreturn:
+                return False
+    return True
@@ -0,0 +1,140 @@
+import src.ast_nodes as ast
+
+class ExprFactory:
+    # Costruzione delle espressioni pure usata da parser e fasi successive:
+    # questa versione alloca un nodo nuovo a ogni chiamata
+    def literal(self, value):
+        return ast.LiteralExpr(value)
+
+    def variable(self, name, sym=None):
+        return ast.VariableExpr(name, sym)
+
+    def binary(self, left, operator, right):
+        return ast.BinaryExpr(left, operator, right)
+
+    def unary(self, operator, operand):
+        return ast.UnaryExpr(operator, operand)
+
+    def enter_scope(self):
+        # Il parser apre uno scope per ogni corpo di funzione o lambda e lo
+        # chiude con leave_scope(valore restituito)
+        return None
+
+    def leave_scope(self, previous):
+        pass
+
+    # Le fasi non modificano sul posto gli operatori: se un figlio cambia
+    # il padre viene ricostruito, così un nodo condiviso resta valido
+    def rebuild_binary(self, node, left, right):
+        if left is node.left and right is node.right:
+            return node
+        return self.binary(left, node.operator, right)
+
+    def rebuild_unary(self, node, operand):
+        if operand is node.operand:
+            return node
+        return self.unary(node.operator, operand)
+
+    def intern_tree(self, root):
+        # Espressioni di un AST costruito senza questa factory (parsing
+        # parallelo nei processi worker): senza hash-consing restano quelle
+        return root
+
+class HashConsFactory(ExprFactory):
+    # Hash-consing: letterali, variabili e operatori su figli già condivisi
+    # vengono costruiti una sola volta. La chiave contiene i figli per identità,
+    # quindi il suo hash non richiede di visitare il sottoalbero; il confronto
+    # tra due nodi condivisi si ferma subito perché le tuple confrontano prima
+    # l'identità degli elementi.
+    # Le variabili sono condivise solo all'interno di uno stesso corpo: lo slot
+    # del frame annotato dalla semantica dipende dalla funzione.
+    def __init__(self):
+        self.table = {}
+        self.shared = set()
+        self.hits = 0
+        self.scope = 0
+        self.scopes = 0
+
+    def intern(self, key, build):
+        node = self.table.get(key)
+        if node is not None:
+            self.hits += 1
+            return node
+        node = self.table[key] = build()
+        self.shared.add(id(node))
+        return node
+
+    def is_shared(self, node):
+        return id(node) in self.shared
+
+    def enter_scope(self):
+        previous = self.scope
+        self.scopes += 1
+        self.scope = self.scopes
+        return previous
+
+    def leave_scope(self, previous):
+        self.scope = previous
+
+    def literal(self, value):
+        return self.intern((ast.LiteralExpr, value), lambda: ast.LiteralExpr(value))
+
+    def variable(self, name, sym=None):
+        node = self.intern((ast.VariableExpr, self.scope, name), lambda: ast.VariableExpr(name, sym))
+        if node.sym is None:
+            node.sym = sym
+        return node
+
+    def binary(self, left, operator, right):
+        # Un operando non condiviso (chiamata, assegnamento, pipe...) rende
+        # il nodo unico
+        if id(left) not in self.shared or id(right) not in self.shared:
+            return ast.BinaryExpr(left, operator, right)
+        return self.intern((ast.BinaryExpr, id(left), operator, id(right)),
+                           lambda: ast.BinaryExpr(left, operator, right))
+
+    def unary(self, operator, operand):
+        if id(operand) not in self.shared:
+            return ast.UnaryExpr(operator, operand)
+        return self.intern((ast.UnaryExpr, operator, id(operand)),
+                           lambda: ast.UnaryExpr(operator, operand))
+
+    def intern_tree(self, root):
+        # Ricostruisce in postordine le espressioni pure con la tabella, con gli
+        # stessi scope del parser (uno per corpo di funzione e di lambda); gli
+        # altri nodi ricevono sul posto i figli ricostruiti
+        values = []
+        stack = [(root, None)]
+        while stack:
+            node, state = stack.pop()
+            body = isinstance(node, (ast.FunctionDecl, ast.LambdaExpr))
+            if state is None:
+                children = list(ast.iter_child_nodes(node))
+                stack.append((node, (len(children), self.enter_scope() if body else None)))
+                stack.extend((child, None) for child in reversed(children))
+                continue
+            count, previous = state
+            children = values[len(values) - count:]
+            del values[len(values) - count:]
+            if body:
+                self.leave_scope(previous)
+            values.append(self.intern_node(node, children))
+        return values[0]
+
+    def intern_node(self, node, children):
+        if isinstance(node, ast.LiteralExpr):
+            return self.literal(node.value)
+        if isinstance(node, ast.VariableExpr):
+            return self.variable(node.name, node.sym)
+        if isinstance(node, ast.BinaryExpr):
+            return self.binary(children[0], node.operator, children[1])
+        if isinstance(node, ast.UnaryExpr):
+            return self.unary(node.operator, children[0])
+        children = iter(children)
+        for name in ast.child_field_names(type(node)):
+            value = getattr(node, name)
+            if isinstance(value, ast.ASTNode):
+                setattr(node, name, next(children))
+            elif isinstance(value, list):
+                setattr(node, name, [next(children) if isinstance(item, ast.ASTNode) else item for item in value])
+        return node
@@ -0,0 +1,109 @@
+import src.ast_nodes as ast
+from src.desugaring import LAMBDA_PREFIX
+
+# Chiamata ricorsiva nella forma canonica: f e g che richiamano sé stesse con
+# lo stesso corpo sono identiche
+SELF = object()
+
+def canonical_body(decl, resolve):
+    # Forma canonica del corpo in preordine: per ogni nodo tipo, campo scalare e
+    # numero di figli. Parametri e variabili locali sono rinominati per ordine di
+    # apparizione, le funzioni chiamate sostituite dal loro rappresentante.
+    variables = {param: index for index, param in enumerate(decl.params)}
+    own_name = resolve(decl.name)
+    key = []
+    stack = [decl.body]
+    while stack:
+        node = stack.pop()
+        children = list(ast.iter_child_nodes(node))
+        if isinstance(node, (ast.VariableExpr, ast.AssignExpr, ast.VarDecl)):
+            scalar = variables.setdefault(node.name, len(variables))
+        elif isinstance(node, ast.CallExpr):
+            callee = resolve(node.callee)
+            scalar = SELF if callee == own_name else callee
+        elif isinstance(node, ast.LiteralExpr):
+            scalar = node.value
+        elif isinstance(node, (ast.BinaryExpr, ast.UnaryExpr)):
+            scalar = node.operator
+        else:
+            scalar = None
+        # Un blocco pigro è un Block
+        node_type = ast.Block if isinstance(node, ast.Block) else type(node)
+        key.append((node_type, scalar, len(children)))
+        children.reverse()
+        stack.extend(children)
+    return len(decl.params), tuple(key)
+
+def find_identical(functions):
+    # Classi di funzioni identiche, fino al punto fisso: unire due funzioni può
+    # rendere identici i loro chiamanti. Il rappresentante è la prima dichiarata.
+    # Restituisce nome della funzione doppia -> dichiarazione del rappresentante.
+    replaced = {}
+
+    def resolve(name):
+        while name in replaced:
+            name = replaced[name].name
+        return name
+
+    remaining = functions
+    while True:
+        representatives = {}
+        merged = False
+        for decl in remaining:
+            representative = representatives.setdefault(canonical_body(decl, resolve), decl)
+            if representative is not decl:
+                replaced[decl.name] = representative
+                merged = True
+        if not merged:
+            break
+        remaining = [decl for decl in remaining if decl.name not in replaced]
+    return replaced
+
+def thunk_body(decl, target):
+    # Corpo di una funzione doppia visibile dall'esterno: inoltra i parametri
+    args = []
+    for slot, (param, sym) in enumerate(zip(decl.params, decl.param_syms or [None] * len(decl.params))):
+        arg = ast.VariableExpr(param, sym)
+        arg.slot = slot
+        args.append(arg)
+    call = ast.CallExpr(target.name, args, sym=target.sym)
+    call.decl = target
+    return ast.Block([ast.ReturnStmt(call)])
+
+def fold_identical_functions(program):
+    # Identical code folding dopo l'analisi semantica: le lambda doppie vengono
+    # eliminate, le funzioni del sorgente (che il codice C può chiamare per nome)
+    # diventano un inoltro al rappresentante. Le chiamate sono reindirizzate.
+    functions = [decl for decl in program.declarations if isinstance(decl, ast.FunctionDecl)]
+    replaced = find_identical(functions)
+    if not replaced:
+        return []
+
+    def representative(name):
+        decl = replaced[name]
+        while decl.name in replaced:
+            decl = replaced[decl.name]
+        return decl
+
+    declarations = []
+    for decl in program.declarations:
+        if isinstance(decl, ast.FunctionDecl) and decl.name in replaced:
+            if decl.name.startswith(LAMBDA_PREFIX):
+                continue
+            target = representative(decl.name)
+            decl.body = thunk_body(decl, target)
+            decl.frame_size = len(decl.params)
+            decl.effect, decl.willreturn = target.effect, target.willreturn
+        declarations.append(decl)
+    program.declarations = declarations
+
+    for node in ast.walk(program):
+        if isinstance(node, ast.CallExpr) and node.callee in replaced:
+            target = representative(node.callee)
+            node.callee, node.sym, node.decl = target.name, target.sym, target
+        elif (isinstance(node, ast.VariableExpr) and node.name.startswith(LAMBDA_PREFIX)
+              and node.name in replaced):
+            # Lambda usata come valore (es. in un 'let' globale)
+            target = representative(node.name)
+            node.name, node.sym = target.name, target.sym
+    return list(replaced)
@@ -0,0 +1,255 @@
+import src.ast_nodes as ast
+from src.hashcons import ExprFactory
+from src.callgraph import call_graph, strongly_connected, recursive_functions
+from src.unroll import tree_size
+
+# Nodi dell'AST oltre i quali il corpo di una funzione non viene copiato nei chiamanti
+INLINE_BUDGET = 40
+# Una funzione chiamata in un solo punto può essere più grande: la copia non si moltiplica
+SINGLE_CALL_FACTOR = 4
+INLINE_PREFIX = "__inline"
+
+def lower_returns(statements, result):
+    # Riscrive i return come assegnamenti al risultato. Dopo un if in cui un ramo
+    # termina sempre con un return, il resto del blocco passa nell'altro ramo:
+    # nessuna istruzione viene duplicata. None se servirebbe una copia del resto
+    # (entrambi i rami possono proseguire) o se un return sta dentro un ciclo.
+    lowered = []
+    for index, stmt in enumerate(statements):
+        if isinstance(stmt, ast.ReturnStmt):
+            lowered.append(ast.ExprStmt(assign(result, stmt.value)))
+            return lowered
+        if isinstance(stmt, ast.WhileStmt) and contains_return(stmt):
+            return None
+        if not (isinstance(stmt, ast.IfStmt) and contains_return(stmt)):
+            lowered.append(stmt)
+            continue
+        then_statements = stmt.then_branch.statements
+        else_statements = stmt.else_branch.statements if stmt.else_branch else []
+        rest = statements[index + 1:]
+        if rest:
+            if always_returns(then_statements):
+                else_statements = else_statements + rest
+            elif always_returns(else_statements):
+                then_statements = then_statements + rest
+            else:
+                return None
+        then_statements = lower_returns(then_statements, result)
+        else_statements = lower_returns(else_statements, result)
+        if then_statements is None or else_statements is None:
+            return None
+        lowered.append(ast.IfStmt(stmt.condition, ast.Block(then_statements),
+                                  ast.Block(else_statements) if else_statements else None))
+        return lowered
+    return lowered
+
+def always_returns(statements):
+    for stmt in statements:
+        if isinstance(stmt, ast.ReturnStmt):
+            return True
+        if isinstance(stmt, ast.IfStmt) and stmt.else_branch is not None \
+                and always_returns(stmt.then_branch.statements) and always_returns(stmt.else_branch.statements):
+            return True
+    return False
+
+def contains_return(node):
+    return any(isinstance(child, ast.ReturnStmt) for child in ast.walk(node))
+
+def assign(variable, value):
+    node = ast.AssignExpr(variable.name, value)
+    node.slot = variable.slot
+    return node
+
+def local_variable(name, slot):
+    node = ast.VariableExpr(name)
+    node.slot = slot
+    return node
+
+def call_sites(program):
+    counts = {}
+    for node in ast.walk(program):
+        if isinstance(node, ast.CallExpr):
+            counts[node.callee] = counts.get(node.callee, 0) + 1
+    return counts
+
+class Inliner:
+    # Inlining sull'AST: le funzioni sono trattate partendo da quelle chiamate
+    # (componenti fortemente connesse del grafo delle chiamate), così il corpo
+    # copiato contiene già le proprie chiamate espanse. Una chiamata viene
+    # sostituita dal corpo della funzione se questa non è ricorsiva e rientra nel
+    # budget; il corpo è posto prima dell'istruzione che contiene la chiamata,
+    # con parametri e variabili rinominati e spostati in nuovi slot del frame del
+    # chiamante, e la chiamata diventa la lettura della variabile del risultato.
+    def __init__(self, exprs=None, budget=INLINE_BUDGET):
+        self.exprs = exprs or ExprFactory()
+        self.budget = budget
+        self.counter = 0
+        self.inlined = 0
+
+    def run(self, program):
+        graph = call_graph(program)
+        components = strongly_connected(graph)
+        self.recursive = recursive_functions(graph, components)
+        self.functions = {decl.name: decl for decl in program.declarations if isinstance(decl, ast.FunctionDecl)}
+        self.calls = call_sites(program)
+        self.candidates = {}
+        for component in components:
+            for name in component:
+                self.inline_calls(self.functions[name])
+        return self.inlined
+
+    def inlinable(self, name):
+        return self.candidate(name) is not None
+
+    def candidate(self, name):
+        # Per le funzioni espandibili: nomi locali da rinominare e se l'unico
+        # return è l'ultima istruzione. Calcolato una volta, quando il corpo è
+        # già definitivo (le funzioni chiamate sono trattate prima)
+        if name in self.candidates:
+            return self.candidates[name]
+        decl = self.functions.get(name)
+        candidate = None
+        if decl is not None and name not in self.recursive and decl.frame_size is not None:
+            statements = decl.body.statements
+            limit = self.budget * (SINGLE_CALL_FACTOR if self.calls.get(name) == 1 else 1)
+            if tree_size(statements) <= limit and lower_returns(statements, local_variable("", 0)) is not None:
+                names = set(decl.params)
+                returns = 0
+                for node in ast.walk(decl.body):
+                    if isinstance(node, ast.VarDecl):
+                        names.add(node.name)
+                    elif isinstance(node, ast.ReturnStmt):
+                        returns += 1
+                tail = returns == 1 and isinstance(statements[-1], ast.ReturnStmt)
+                candidate = (names, tail)
+        self.candidates[name] = candidate
+        return candidate
+
+    def inline_calls(self, decl):
+        blocks = [node for node in ast.walk(decl.body) if isinstance(node, ast.Block)]
+        for block in blocks:
+            statements = []
+            for stmt in block.statements:
+                while True:
+                    path = self.find_site(stmt)
+                    if path is None:
+                        break
+                    expanded, result = self.expand(decl, path[0])
+                    statements.extend(expanded)
+                    self.replace(stmt, path, result)
+                statements.append(stmt)
+            block.statements = statements
+
+    def find_site(self, stmt):
+        # Prima chiamata espandibile nell'ordine di valutazione tale che prima di
+        # lei (fuori dai suoi argomenti) non si valuti nulla con effetti: il suo
+        # corpo anticipato non cambia l'ordine osservabile. La condizione di un
+        # while è valutata a ogni iterazione e resta esclusa.
+        if isinstance(stmt, ast.VarDecl):
+            expr = stmt.initializer
+        elif isinstance(stmt, ast.ExprStmt):
+            expr = stmt.expr
+        elif isinstance(stmt, ast.ReturnStmt):
+            expr = stmt.value
+        elif isinstance(stmt, ast.IfStmt):
+            expr = stmt.condition
+        else:
+            return None
+        if expr is None:
+            return None
+
+        # Visita in postordine: ogni nodo con il padre e la posizione in cui
+        # inizia il suo sottoalbero
+        order = []
+        parents = {}
+        stack = [(expr, False, 0)]
+        while stack:
+            node, expanded, start = stack.pop()
+            if expanded:
+                order.append((node, start))
+                continue
+            stack.append((node, True, len(order)))
+            children = list(ast.iter_child_nodes(node))
+            for child in children:
+                parents[id(child)] = node
+            stack.extend((child, False, 0) for child in reversed(children))
+
+        dirty = reads = None
+        for position, (node, start) in enumerate(order):
+            if isinstance(node, ast.CallExpr) and self.inlinable(node.callee):
+                # Un assegnamento negli argomenti non può precedere letture già valutate
+                assigns = any(isinstance(child, ast.AssignExpr) for child, _ in order[start:position])
+                if (dirty is None or dirty >= start) and not (assigns and reads is not None and reads < start):
+                    path = [node]
+                    while path[-1] is not expr:
+                        path.append(parents[id(path[-1])])
+                    return path
+            if isinstance(node, (ast.CallExpr, ast.AssignExpr)):
+                dirty = position if dirty is None else dirty
+            elif isinstance(node, ast.VariableExpr):
+                reads = position if reads is None else reads
+        return None
+
+    def expand(self, caller, call):
+        callee = self.functions[call.callee]
+        self.counter += 1
+        prefix = f"{INLINE_PREFIX}{self.counter}_"
+        offset = caller.frame_size
+        caller.frame_size += callee.frame_size + 1
+        result = local_variable(prefix + "result", offset + callee.frame_size)
+
+        statements = []
+        for index, (param, arg) in enumerate(zip(callee.params, call.args)):
+            decl = ast.VarDecl(prefix + param, arg)
+            decl.slot = offset + index
+            statements.append(decl)
+
+        names, tail = self.candidate(call.callee)
+        body = [ast.copy_tree(stmt) for stmt in callee.body.statements]
+        for stmt in body:
+            for node in ast.walk(stmt):
+                if isinstance(node, (ast.VariableExpr, ast.AssignExpr, ast.VarDecl)) and node.name in names:
+                    node.name = prefix + node.name
+                    node.sym = None
+                    node.slot = None if node.slot is None else node.slot + offset
+
+        if tail:
+            # Un solo return in coda: il risultato è dichiarato direttamente
+            declaration = ast.VarDecl(result.name, body.pop().value)
+            lowered = body + [declaration]
+        else:
+            declaration = ast.VarDecl(result.name, self.exprs.literal(0))
+            lowered = [declaration] + lower_returns(body, result)
+        declaration.slot = result.slot
+        statements.extend(lowered)
+        self.inlined += 1
+        return statements, result
+
+    def replace(self, stmt, path, result):
+        # La chiamata diventa la lettura del risultato; gli antenati contengono la
+        # chiamata, quindi non sono condivisi, e vengono ricostruiti dal basso
+        exprs = self.exprs
+        child, replacement = path[0], result
+        for node in path[1:]:
+            if isinstance(node, ast.BinaryExpr):
+                left = replacement if node.left is child else node.left
+                right = replacement if node.right is child else node.right
+                replacement = exprs.rebuild_binary(node, left, right)
+            elif isinstance(node, ast.UnaryExpr):
+                replacement = exprs.rebuild_unary(node, replacement)
+            elif isinstance(node, ast.CallExpr):
+                node.args = [replacement if arg is child else arg for arg in node.args]
+                replacement = node
+            else:
+                node.value = replacement
+                replacement = node
+            child = node
+
+        if isinstance(stmt, ast.VarDecl):
+            stmt.initializer = replacement
+        elif isinstance(stmt, ast.ExprStmt):
+            stmt.expr = replacement
+        elif isinstance(stmt, ast.ReturnStmt):
+            stmt.value = replacement
+        else:
+            stmt.condition = replacement
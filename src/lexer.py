@@ -1,3 +1,6 @@
+import mmap
+import os
+import re
 from src.tokens import TokenType, Token
 
 KEYWORDS = {
@@ -12,8 +15,9 @@ KEYWORDS = {
 }
 
 class Lexer:
-    def __init__(self, text):
+    def __init__(self, text, symbols=None):
         self.text = text
+        self.symbols = symbols
         self.pos = 0
         self.current_char = self.text[self.pos] if self.text else None
 
@@ -52,9 +56,26 @@ class Lexer:
             self.advance()
 
         token_type = KEYWORDS.get(result, TokenType.ID)
+        if token_type == TokenType.ID and self.symbols is not None:
+            return Token(token_type, result, sym=self.symbols.intern(result))
         return Token(token_type, result)
 
+    def tokenize(self):
+        while True:
+            token = self.get_next_token()
+            yield token
+            if token.type == TokenType.EOF:
+                return
+
     def get_next_token(self):
+        self.skip_whitespace()
+        start = self.pos
+        token = self._scan_token()
+        token.start = start
+        token.end = min(self.pos, len(self.text))
+        return token
+
+    def _scan_token(self):
         while self.current_char is not None:
 
             if self.current_char.isspace():
@@ -144,4 +165,189 @@ class Lexer:
                 self.advance(); return Token(TokenType.SEMI, ';')
             self.error()
 
-        return Token(TokenType.EOF, None)
\ No newline at end of file
+        return Token(TokenType.EOF, None)
+
+
+OPERATORS = {
+    '==': TokenType.EQ, '=>': TokenType.ARROW, '=': TokenType.ASSIGN,
+    '!=': TokenType.NE, '!': TokenType.NOT,
+    '<=': TokenType.LE, '<': TokenType.LT,
+    '>=': TokenType.GE, '>': TokenType.GT,
+    '|>': TokenType.PIPE, '||': TokenType.OR, '&&': TokenType.AND,
+    '+': TokenType.PLUS, '-': TokenType.MINUS,
+    '*': TokenType.MUL, '/': TokenType.DIV,
+    '(': TokenType.LPAREN, ')': TokenType.RPAREN,
+    '{': TokenType.LBRACE, '}': TokenType.RBRACE,
+    ',': TokenType.COMMA, ';': TokenType.SEMI,
+}
+
+# Pattern unico: l'ordine delle alternative riproduce le priorità del Lexer manuale
+# (operatori doppi prima dei singoli, identificatori che non iniziano con cifra o '_').
+# Gli spazi iniziali sono assorbiti nello stesso match del token.
+MASTER_PATTERN = re.compile(r"""
+    \s*
+    (?:
+        (?P<INTEGER>\d+)
+      | (?P<ID>[^\W\d_]\w*)
+      | (?P<OP>==|=>|!=|<=|>=|\|>|\|\||&&|[=!<>+\-*/(){},;])
+    )
+""", re.VERBOSE)
+
+# Variante su bytes per sorgenti mappati in memoria (solo identificatori ASCII)
+MASTER_PATTERN_BYTES = re.compile(MASTER_PATTERN.pattern.encode('ascii'), re.VERBOSE)
+OPERATORS_BYTES = {op.encode('ascii'): (tok_type, op) for op, tok_type in OPERATORS.items()}
+
+INTEGER_GROUP = MASTER_PATTERN.groupindex['INTEGER']
+ID_GROUP = MASTER_PATTERN.groupindex['ID']
+
+
+class RegexLexer:
+    # Lexer table-driven: un solo match per token sul pattern compilato,
+    # stesso flusso di Token del Lexer manuale.
+    # Accetta str oppure un oggetto bytes-like (bytes, mmap) senza copiarlo.
+    # Con una SymbolTable gli identificatori vengono internati durante il lexing.
+    def __init__(self, text, symbols=None):
+        self.text = text
+        self.symbols = symbols
+        self.pos = 0
+        self._stream = None
+
+    def error(self, pos):
+        text = self.text
+        while pos < len(text) and text[pos:pos + 1].isspace():
+            pos += 1
+        char = text[pos:pos + 1]
+        if not isinstance(char, str):
+            char = char.decode('latin-1')
+        raise Exception(f"Carattere non valido: '{char}' alla posizione {pos}")
+
+    def tokenize(self):
+        if isinstance(self.text, str):
+            return self._tokenize_str()
+        return self._tokenize_bytes()
+
+    def _tokenize_str(self):
+        text = self.text
+        keywords = KEYWORDS
+        operators = OPERATORS
+        id_type = TokenType.ID
+        int_type = TokenType.INTEGER
+        intern = self.symbols.intern if self.symbols is not None else None
+        pos = self.pos
+
+        for m in MASTER_PATTERN.finditer(text, pos):
+            # finditer salta i caratteri non riconosciuti: un buco tra i match è un errore
+            if m.start() != pos:
+                self.error(pos)
+            group = m.lastindex
+            start = m.start(group)
+            pos = self.pos = m.end()
+            value = m[group]
+            if group == ID_GROUP:
+                token_type = keywords.get(value, id_type)
+                if intern is not None and token_type is id_type:
+                    yield Token(id_type, value, start, pos, intern(value))
+                else:
+                    yield Token(token_type, value, start, pos)
+            elif group == INTEGER_GROUP:
+                yield Token(int_type, int(value), start, pos)
+            else:
+                yield Token(operators[value], value, start, pos)
+
+        if text[pos:].strip():
+            self.error(pos)
+        self.pos = len(text)
+        yield Token(TokenType.EOF, None, self.pos, self.pos)
+
+    def _tokenize_bytes(self):
+        text = self.text
+        keywords = KEYWORDS
+        operators = OPERATORS_BYTES
+        id_type = TokenType.ID
+        int_type = TokenType.INTEGER
+        intern = self.symbols.intern if self.symbols is not None else None
+        pos = self.pos
+
+        for m in MASTER_PATTERN_BYTES.finditer(text, pos):
+            if m.start() != pos:
+                self.error(pos)
+            group = m.lastindex
+            start = m.start(group)
+            pos = self.pos = m.end()
+            value = m[group]
+            if group == ID_GROUP:
+                value = value.decode('ascii')
+                token_type = keywords.get(value, id_type)
+                if intern is not None and token_type is id_type:
+                    yield Token(id_type, value, start, pos, intern(value))
+                else:
+                    yield Token(token_type, value, start, pos)
+            elif group == INTEGER_GROUP:
+                yield Token(int_type, int(value), start, pos)
+            else:
+                token_type, value = operators[value]
+                yield Token(token_type, value, start, pos)
+        # rilascia il buffer prima della chiusura della mappa
+        m = None
+
+        if text[pos:].strip():
+            self.error(pos)
+        self.pos = len(text)
+        yield Token(TokenType.EOF, None, self.pos, self.pos)
+
+    def get_next_token(self):
+        if self._stream is None:
+            self._stream = self.tokenize()
+        return next(self._stream, Token(TokenType.EOF, None))
+
+
+def tokenize_file(path, symbols=None):
+    # Generatore di token direttamente sul file mappato in memoria:
+    # né il sorgente né la lista dei token vengono materializzati
+    with open(path, 'rb') as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield Token(TokenType.EOF, None)
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as source:
+            yield from RegexLexer(source, symbols).tokenize()
+
+
+def relex(store, offset, deleted, inserted):
+    # Rianalisi incrementale di un TokenStore dopo l'edit
+    # text[offset:offset + deleted] -> inserted. Si riparte dall'ultimo token che
+    # può fondersi con il testo modificato e ci si ferma appena un nuovo token
+    # coincide (tipo, valore, span traslato) con uno vecchio oltre la regione modificata.
+    text = store.text
+    new_text = text[:offset] + inserted + text[offset + deleted:]
+    delta = len(inserted) - deleted
+    edit_end = offset + len(inserted)
+    count = len(store)
+
+    lo = store.first_ending_at_or_after(offset)
+    restart = min(store.start(lo), offset) if lo < count else offset
+
+    lexer = RegexLexer(new_text, store.symbols)
+    lexer.pos = restart
+    new_tokens = []
+    hi = lo
+    for token in lexer.tokenize():
+        if token.type == TokenType.EOF:
+            hi = count
+            break
+        old_start = token.start - delta
+        while hi < count and store.start(hi) < old_start:
+            hi += 1
+        if (token.start >= edit_end and hi < count and store.start(hi) == old_start
+                and store.end(hi) == token.end - delta
+                and store.type_at(hi) == token.type and store.value_at(hi) == token.value):
+            break
+        new_tokens.append(token)
+
+    store.splice(lo, hi, new_tokens, delta, new_text)
+    return store
+
+
+LEXERS = {
+    'manual': Lexer,
+    'regex': RegexLexer,
+}
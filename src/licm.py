@@ -0,0 +1,200 @@
+import src.ast_nodes as ast
+from src.ast_nodes import Effect
+from src.tokens import TokenType
+from src.hashcons import ExprFactory
+from src.constprop import assigned_names
+from src.inliner import local_variable
+from src.unroll import counter_declaration
+
+LICM_PREFIX = "__licm"
+
+def safe_division(node):
+    # Divisione che non può fallire: divisore costante diverso da 0 e da -1
+    return isinstance(node.right, ast.LiteralExpr) and node.right.value not in (0, -1)
+
+def structure(expr):
+    # Chiave hashable del sottoalbero (tipo, campi non strutturali e numero di
+    # figli in preordine): uguale per espressioni uguali, condivise o no
+    key = []
+    for node in ast.walk(expr):
+        values = tuple(getattr(node, name) for name in ast.child_field_names(type(node))
+                       if not isinstance(getattr(node, name), (ast.ASTNode, list)))
+        key.append((type(node), values, sum(1 for _ in ast.iter_child_nodes(node))))
+    return tuple(key)
+
+def statement_blocks(body):
+    # Blocchi della funzione in preordine, senza visitare le espressioni
+    blocks = []
+    stack = [body]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, ast.Block):
+            blocks.append(node)
+            stack.extend(reversed(node.statements))
+        elif isinstance(node, ast.IfStmt):
+            if node.else_branch is not None:
+                stack.append(node.else_branch)
+            stack.append(node.then_branch)
+        elif isinstance(node, ast.WhileStmt):
+            stack.append(node.body)
+    return blocks
+
+def loop_expressions(loop):
+    # Espressioni del ciclo (condizione e istruzioni, anche annidate) con la
+    # funzione che sostituisce ciascuna nel nodo che la contiene
+    positions = [(loop.condition, lambda value: setattr(loop, 'condition', value))]
+    for node in ast.walk(loop.body):
+        if isinstance(node, ast.VarDecl):
+            positions.append((node.initializer, lambda value, node=node: setattr(node, 'initializer', value)))
+        elif isinstance(node, ast.ExprStmt):
+            positions.append((node.expr, lambda value, node=node: setattr(node, 'expr', value)))
+        elif isinstance(node, ast.ReturnStmt) and node.value is not None:
+            positions.append((node.value, lambda value, node=node: setattr(node, 'value', value)))
+        elif isinstance(node, (ast.IfStmt, ast.WhileStmt)):
+            positions.append((node.condition, lambda value, node=node: setattr(node, 'condition', value)))
+    return positions
+
+class LoopInvariantMotion:
+    # Loop-invariant code motion sull'AST. In un while (anche quelli generati
+    # dai repeat) le sottoespressioni che leggono solo variabili non assegnate
+    # nel ciclo vengono calcolate una volta in variabili temporanee dichiarate
+    # prima del ciclo. Il calcolo anticipato avviene anche se il ciclo non
+    # esegue alcuna iterazione o se l'espressione sta in un ramo non preso:
+    # vengono spostate solo espressioni che non possono fallire né avere
+    # effetti (niente divisioni per un valore non costante, solo chiamate a
+    # funzioni pure e terminanti che a loro volta non possono fallire).
+    # I cicli interni sono trattati prima di quelli che li contengono.
+    def __init__(self, exprs=None):
+        self.exprs = exprs or ExprFactory()
+        self.counter = 0
+        self.hoisted = 0
+        # nome della funzione -> chiamata anticipabile (valido per una visita)
+        self.speculatable = {}
+
+    def run(self, decl):
+        self.speculatable = {}
+        hoisted = self.hoisted
+        for block in reversed(statement_blocks(decl.body)):
+            statements = []
+            changed = False
+            for stmt in block.statements:
+                if isinstance(stmt, ast.WhileStmt):
+                    temporaries = self.hoist(decl, stmt)
+                    if temporaries:
+                        changed = True
+                        # Il contatore di un repeat resta subito prima del ciclo (src/unroll.py)
+                        counter = statements.pop() if counter_declaration(stmt, statements) else None
+                        statements.extend(temporaries)
+                        if counter is not None:
+                            statements.append(counter)
+                statements.append(stmt)
+            if changed:
+                block.statements = statements
+        return self.hoisted - hoisted
+
+    def hoist(self, decl, loop):
+        assigned = assigned_names(loop)
+        # struttura dell'espressione -> (dichiarazione, variabile), in ordine di creazione
+        temporaries = {}
+        for expr, replace in loop_expressions(loop):
+            rewritten = self.rewrite(expr, assigned, decl, temporaries)
+            if rewritten is not expr:
+                replace(rewritten)
+        return [declaration for declaration, _ in temporaries.values()]
+
+    def temporary(self, expr, decl, temporaries):
+        # Stessa espressione invariante nel ciclo: stessa variabile temporanea
+        key = structure(expr)
+        if key in temporaries:
+            return temporaries[key][1]
+        self.counter += 1
+        self.hoisted += 1
+        variable = local_variable(f"{LICM_PREFIX}{self.counter}", decl.frame_size)
+        decl.frame_size += 1
+        declaration = ast.VarDecl(variable.name, expr)
+        declaration.slot = variable.slot
+        temporaries[key] = (declaration, variable)
+        return variable
+
+    def rewrite(self, expr, assigned, decl, temporaries):
+        # Visita in postordine: per ogni nodo la versione ricostruita e se è
+        # invariante. Le sottoespressioni invarianti massimali (operatori e
+        # chiamate) diventano la lettura di una temporanea.
+        exprs = self.exprs
+        results = {}
+        stack = [(expr, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if id(node) in results:
+                continue
+            original = node
+            children = list(ast.iter_child_nodes(node))
+            if not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child in children)
+                continue
+
+            invariant = all(results[id(child)][1] for child in children)
+            if isinstance(node, ast.VariableExpr):
+                invariant = node.name not in assigned
+            elif isinstance(node, ast.AssignExpr):
+                invariant = False
+            elif isinstance(node, ast.CallExpr):
+                invariant = invariant and self.speculatable_call(node.decl)
+            elif isinstance(node, ast.BinaryExpr) and node.operator == TokenType.DIV:
+                invariant = invariant and safe_division(node)
+
+            if invariant:
+                replaced = [results[id(child)][0] for child in children]
+            else:
+                replaced = [self.temporary(new, decl, temporaries) if hoistable and self.worth(new) else new
+                            for new, hoistable in (results[id(child)] for child in children)]
+
+            if isinstance(node, ast.BinaryExpr):
+                node = exprs.rebuild_binary(node, replaced[0], replaced[1])
+            elif isinstance(node, ast.UnaryExpr):
+                node = exprs.rebuild_unary(node, replaced[0])
+            elif isinstance(node, ast.CallExpr):
+                node.args = replaced
+            elif isinstance(node, ast.AssignExpr):
+                node.value = replaced[0]
+            results[id(original)] = (node, invariant)
+        rewritten, invariant = results[id(expr)]
+        if invariant and self.worth(rewritten):
+            return self.temporary(rewritten, decl, temporaries)
+        return rewritten
+
+    def worth(self, node):
+        return isinstance(node, (ast.BinaryExpr, ast.UnaryExpr, ast.CallExpr))
+
+    def speculatable_call(self, callee):
+        # Funzione pura e terminante le cui divisioni (anche nelle funzioni
+        # chiamate) non possono fallire. Le extern dichiarate pure sono
+        # considerate prive di errori. Senza cicli di chiamate tra funzioni
+        # terminanti la visita in profondità si conclude sempre.
+        known = self.speculatable
+        stack = [callee]
+        while stack:
+            decl = stack[-1]
+            if decl is None or decl.name in known:
+                stack.pop()
+                continue
+            if decl.effect != Effect.PURE or not decl.willreturn:
+                known[decl.name] = False
+                stack.pop()
+                continue
+            if isinstance(decl, ast.ExternDecl):
+                known[decl.name] = True
+                stack.pop()
+                continue
+            nodes = list(ast.walk(decl.body))
+            callees = [node.decl for node in nodes if isinstance(node, ast.CallExpr)]
+            pending = [callee for callee in callees if callee is not None and callee.name not in known]
+            if pending:
+                stack.extend(pending)
+                continue
+            known[decl.name] = all(callee is not None and known[callee.name] for callee in callees) and \
+                all(safe_division(node) for node in nodes
+                    if isinstance(node, ast.BinaryExpr) and node.operator == TokenType.DIV)
+            stack.pop()
+        return callee is not None and known[callee.name]
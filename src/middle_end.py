@@ -0,0 +1,222 @@
+from src.ast_nodes import NodeVisitor, iterative
+from src.symbols import ScopeMap
+from src.desugaring import Desugarer, is_constant
+from src.semantic_analysis import SemanticAnalyzer, SemanticError
+from src.optimizer import Optimizer
+from src.effects import infer_effects, scan_body, summarize
+import src.ast_nodes as ast
+
+class FusedMiddleEnd(NodeVisitor):
+    # Desugaring, analisi semantica e constant folding in un'unica visita post-ordine.
+    # Le trasformazioni e i controlli sono quelli delle tre fasi separate, invocati
+    # nodo per nodo: su programmi validi il risultato è identico.
+    def __init__(self, symbols=None, exprs=None):
+        self.desugarer = Desugarer(symbols, exprs)
+        self.analyzer = SemanticAnalyzer(symbols)
+        self.optimizer = Optimizer(exprs)
+        # La semantica controlla solo i corpi di funzione, non i 'let' globali
+        self.checking = False
+        # Figlio destro del pipe in visita: diventerà (o riceverà) una chiamata,
+        # quindi i suoi controlli vanno fatti dopo la trasformazione
+        self.pipe_right = None
+        # Le fasi separate controllano le lambda dopo tutte le funzioni del sorgente:
+        # il primo errore di ciascuna lambda viene conservato e segnalato alla fine
+        self.current_lambda = None
+        self.lambda_errors = {}
+
+    def check(self, check, node):
+        if self.current_lambda is None:
+            return check(node)
+        try:
+            return check(node)
+        except SemanticError as error:
+            self.lambda_errors.setdefault(self.current_lambda, error)
+
+    @iterative
+    def visit_Program(self, node):
+        # Effetti inferiti prima del desugaring (pipe e lambda contano come chiamate),
+        # così l'ottimizzazione può già scartare le chiamate pure inutilizzate
+        infer_effects(node)
+        for decl in node.declarations:
+            if isinstance(decl, (ast.FunctionDecl, ast.ExternDecl)):
+                self.analyzer.declare_function(decl)
+
+        declarations = []
+        for decl in node.declarations:
+            declarations.append((yield decl))
+        declarations.extend(self.desugarer.generated_functions)
+        node.declarations = declarations
+
+        for func in self.desugarer.generated_functions:
+            if func.name in self.lambda_errors:
+                raise self.lambda_errors[func.name]
+        return node
+
+    @iterative
+    def visit_FunctionDecl(self, node):
+        analyzer = self.analyzer
+        previous_generation = analyzer.enter_function(node.name, node.params, analyzer.param_syms(node))
+        self.checking = True
+        node.body = yield node.body
+        self.checking = False
+        node.frame_size = analyzer.frame_size
+        analyzer.current_scope.generation = previous_generation
+        return node
+
+    def visit_ExternDecl(self, node):
+        return node
+
+    @iterative
+    def visit_Block(self, node):
+        new_stmts = []
+        # Le istruzioni dopo un return vanno comunque controllate, poi scartate
+        returned = False
+        for stmt in node.statements:
+            visited = yield stmt
+            if returned:
+                continue
+            if isinstance(visited, list):
+                new_stmts.extend(visited)
+            else:
+                returned = self.optimizer.append_statement(new_stmts, visited, stmt)
+        node.statements = new_stmts
+        return node
+
+    @iterative
+    def visit_VarDecl(self, node):
+        node.initializer = yield node.initializer
+        if self.checking:
+            self.check(self.analyzer.define_variable, node)
+        return node
+
+    @iterative
+    def visit_RepeatStmt(self, node):
+        # Il contatore è definito prima di visitare conteggio e corpo,
+        # come nel while generato dal Desugarer
+        init_decl = self.desugarer.counter_decl(self.desugarer._get_unique_var())
+        if self.checking:
+            self.check(self.analyzer.define_variable, init_decl)
+        constant = is_constant(node.count)
+        count = yield node.count
+        limit_decl, limit = self.desugarer.hoist_count(count, constant)
+        if self.checking and limit_decl is not None:
+            self.check(self.analyzer.define_variable, limit_decl)
+            self.check(self.analyzer.visit_VariableExpr, limit)
+        visited_body = yield node.body
+        statements = self.desugarer.build_repeat(init_decl, limit_decl, limit, visited_body)
+        while_node = statements[-1]
+        if self.checking:
+            # Riferimenti al contatore creati dopo la visita: ricevono qui lo slot
+            increment = while_node.body.statements[-1].expr
+            self.check(self.analyzer.visit_VariableExpr, while_node.condition.left)
+            self.check(self.analyzer.check_assign, increment)
+            self.check(self.analyzer.visit_VariableExpr, increment.value.left)
+        return statements
+
+    @iterative
+    def visit_IfStmt(self, node):
+        node.condition = yield node.condition
+        node.then_branch = yield node.then_branch
+        if node.else_branch:
+            node.else_branch = yield node.else_branch
+        if isinstance(node.condition, ast.LiteralExpr):
+            return self.optimizer.taken_branch(node)
+        return node
+
+    @iterative
+    def visit_WhileStmt(self, node):
+        node.condition = yield node.condition
+        node.body = yield node.body
+        if isinstance(node.condition, ast.LiteralExpr) and node.condition.value == 0:
+            return None
+        return node
+
+    @iterative
+    def visit_ReturnStmt(self, node):
+        node.value = yield node.value
+        return node
+
+    @iterative
+    def visit_ExprStmt(self, node):
+        node.expr = yield node.expr
+        return self.optimizer.unused_call(node)
+
+    @iterative
+    def visit_BinaryExpr(self, node):
+        left = yield node.left
+        right = yield node.right
+        optimizer = self.optimizer
+        return optimizer.fold_binary(optimizer.exprs.rebuild_binary(node, left, right))
+
+    @iterative
+    def visit_UnaryExpr(self, node):
+        operand = yield node.operand
+        optimizer = self.optimizer
+        return optimizer.fold_unary(optimizer.exprs.rebuild_unary(node, operand))
+
+    @iterative
+    def visit_AssignExpr(self, node):
+        node.value = yield node.value
+        if self.checking:
+            self.check(self.analyzer.check_assign, node)
+        return node
+
+    @iterative
+    def visit_CallExpr(self, node):
+        deferred = node is self.pipe_right
+        args = []
+        for arg in node.args:
+            args.append((yield arg))
+        node.args = args
+        if self.checking and not deferred:
+            self.check(self.analyzer.check_call, node)
+        return node
+
+    @iterative
+    def visit_PipeExpr(self, node):
+        deferred = node is self.pipe_right
+        left = yield node.left
+        self.pipe_right = node.right
+        right = yield node.right
+        # Le espressioni condivise possono ricomparire altrove nel sorgente:
+        # il rinvio dei controlli vale solo per questa occorrenza
+        self.pipe_right = None
+        call = self.desugarer.build_pipe(left, right)
+        if self.checking and not deferred:
+            self.check(self.analyzer.check_call, call)
+        return call
+
+    @iterative
+    def visit_LambdaExpr(self, node):
+        deferred = node is self.pipe_right
+        func_name = self.desugarer._get_lambda_name()
+
+        # Il corpo della lambda è controllato nello scope della funzione generata
+        analyzer = self.analyzer
+        outer = analyzer.current_scope, analyzer.frame_size, self.checking, self.current_lambda
+        analyzer.current_scope = ScopeMap()
+        self.checking, self.current_lambda = True, func_name
+        self.check(lambda params: analyzer.enter_function(func_name, params, analyzer.param_syms(node)),
+                   node.params)
+        body = yield node.body
+        frame_size = analyzer.frame_size
+        analyzer.current_scope, analyzer.frame_size, self.checking, self.current_lambda = outer
+
+        reference = self.desugarer.build_lambda(func_name, node, body)
+        generated = self.desugarer.generated_functions[-1]
+        generated.frame_size = frame_size
+        generated.effect, generated.willreturn = summarize(
+            *scan_body(generated.body),
+            lambda name: analyzer.lookup_function(analyzer.symbols.intern(name)))
+        analyzer.declare_function(generated)
+        if self.checking and not deferred:
+            self.check(analyzer.visit_VariableExpr, reference)
+        return reference
+
+    def visit_VariableExpr(self, node):
+        if self.checking and node is not self.pipe_right:
+            self.check(self.analyzer.visit_VariableExpr, node)
+        return node
+
+    def visit_LiteralExpr(self, node):
+        return node
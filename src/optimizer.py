@@ -1,113 +1,144 @@
-from src.ast_nodes import NodeVisitor
+from src.ast_nodes import NodeVisitor, iterative
 import src.ast_nodes as ast
 from src.tokens import TokenType
+from src.hashcons import ExprFactory
+from src.effects import removable_call
+from src.ctfe import evaluate_binary, evaluate_unary
+from src.unroll import counter_name
 
 class Optimizer(NodeVisitor):
-
+    def __init__(self, exprs=None, evaluator=None):
+        self.exprs = exprs or ExprFactory()
+        # Valutatore delle chiamate pure con argomenti costanti (src/ctfe.py)
+        self.evaluator = evaluator
+        # Contatori per le statistiche del pass manager
+        self.folded = 0
+        self.removed = 0
+        self.evaluated = 0
+
+    @iterative
     def visit_Program(self, node):
-        node.declarations = [self.visit(decl) for decl in node.declarations]
+        declarations = []
+        for decl in node.declarations:
+            declarations.append((yield decl))
+        node.declarations = declarations
         return node
 
+    @iterative
     def visit_FunctionDecl(self, node):
-        node.body = self.visit(node.body)
+        node.body = yield node.body
         return node
 
     def visit_ExternDecl(self, node):
         return node
 
+    @iterative
     def visit_Block(self, node):
         new_stmts = []
-        for stmt in node.statements:
-            visited = self.visit(stmt)
-            if visited is not None:
-                new_stmts.append(visited)
+        statements = node.statements
+        for index, stmt in enumerate(statements):
+            if self.append_statement(new_stmts, (yield stmt), stmt):
+                # Codice irraggiungibile dopo il return
+                self.removed += len(statements) - index - 1
+                break
         node.statements = new_stmts
         return node
 
+    def append_statement(self, statements, visited, stmt):
+        # Aggiunge l'istruzione ottimizzata al blocco; il ramo di un if eliminato
+        # vi confluisce (lo scope è piatto). True se il blocco termina con un return.
+        if isinstance(visited, ast.Block) and visited is not stmt:
+            statements.extend(visited.statements)
+        elif visited is not None:
+            statements.append(visited)
+        return bool(statements) and isinstance(statements[-1], ast.ReturnStmt)
+
+    @iterative
     def visit_ReturnStmt(self, node):
-        node.value = self.visit(node.value)
+        node.value = yield node.value
         return node
 
+    @iterative
     def visit_ExprStmt(self, node):
-        node.expr = self.visit(node.expr)
+        node.expr = yield node.expr
+        return self.unused_call(node)
+
+    def unused_call(self, node):
+        # Chiamata pura o di sola lettura il cui valore viene scartato
+        # (richiede le annotazioni di src/effects.py), o costante già valutata
+        if isinstance(node.expr, ast.LiteralExpr) or \
+                isinstance(node.expr, ast.CallExpr) and removable_call(node.expr):
+            self.removed += 1
+            return None
         return node
 
+    @iterative
     def visit_VarDecl(self, node):
-        node.initializer = self.visit(node.initializer)
+        node.initializer = yield node.initializer
         return node
 
+    @iterative
     def visit_IfStmt(self, node):
-        node.condition = self.visit(node.condition)
+        node.condition = yield node.condition
 
         if isinstance(node.condition, ast.LiteralExpr):
-            if node.condition.value != 0:
-                return self.visit(node.then_branch)
-            else:
-                if node.else_branch:
-                    return self.visit(node.else_branch)
-                else:
-                    return None
-
-        node.then_branch = self.visit(node.then_branch)
+            self.removed += 1
+            branch = self.taken_branch(node)
+            return (yield branch) if branch else None
+
+        node.then_branch = yield node.then_branch
         if node.else_branch:
-            node.else_branch = self.visit(node.else_branch)
+            node.else_branch = yield node.else_branch
         return node
 
+    def taken_branch(self, node):
+        # Ramo eseguito quando la condizione dell'if è costante (None se nessuno)
+        return node.then_branch if node.condition.value != 0 else node.else_branch
+
+    @iterative
     def visit_WhileStmt(self, node):
-        node.condition = self.visit(node.condition)
+        node.condition = yield node.condition
 
         if isinstance(node.condition, ast.LiteralExpr):
             if node.condition.value == 0:
+                self.removed += 1
                 return None
 
-        node.body = self.visit(node.body)
+        node.body = yield node.body
+        if node.counted and counter_name(node) is None:
+            # Incremento del contatore eliminato come codice dopo un return: il
+            # ciclo non è più contato (src/unroll.py, src/licm.py)
+            node.counted = False
         return node
 
+    @iterative
     def visit_RepeatStmt(self, node):
-        node.count = self.visit(node.count)
-        node.body = self.visit(node.body)
+        node.count = yield node.count
+        node.body = yield node.body
         return node
 
+    @iterative
     def visit_BinaryExpr(self, node):
-        node.left = self.visit(node.left)
-        node.right = self.visit(node.right)
+        left = yield node.left
+        right = yield node.right
+        return self.fold_binary(self.exprs.rebuild_binary(node, left, right))
+
+    def fold_binary(self, node):
+        folded = self.simplify_binary(node)
+        if folded is not node:
+            self.folded += 1
+        return folded
 
+    def simplify_binary(self, node):
         is_left_lit = isinstance(node.left, ast.LiteralExpr)
         is_right_lit = isinstance(node.right, ast.LiteralExpr)
 
         if is_left_lit and is_right_lit:
-            val_left = node.left.value
-            val_right = node.right.value
-
-            # Aritmetica
-            if node.operator == TokenType.PLUS:
-                return ast.LiteralExpr(val_left + val_right)
-            elif node.operator == TokenType.MINUS:
-                return ast.LiteralExpr(val_left - val_right)
-            elif node.operator == TokenType.MUL:
-                return ast.LiteralExpr(val_left * val_right)
-            elif node.operator == TokenType.DIV:
-                if val_right == 0:
-                    raise ZeroDivisionError("Divisione per zero rilevata durante Constant Folding")
-                return ast.LiteralExpr(int(val_left / val_right))
-
-            # Confronti
-            elif node.operator == TokenType.EQ:
-                return ast.LiteralExpr(1 if val_left == val_right else 0)
-            elif node.operator == TokenType.NE:
-                return ast.LiteralExpr(1 if val_left != val_right else 0)
-            elif node.operator == TokenType.LT:
-                return ast.LiteralExpr(1 if val_left < val_right else 0)
-            elif node.operator == TokenType.GT:
-                return ast.LiteralExpr(1 if val_left > val_right else 0)
-            elif node.operator == TokenType.LE:
-                return ast.LiteralExpr(1 if val_left <= val_right else 0)
-            elif node.operator == TokenType.GE:
-                return ast.LiteralExpr(1 if val_left >= val_right else 0)
-            elif node.operator == TokenType.AND:
-                return ast.LiteralExpr(1 if (val_left and val_right) else 0)
-            elif node.operator == TokenType.OR:
-                return ast.LiteralExpr(1 if (val_left or val_right) else 0)
+            # Stessa semantica del codice generato (src/ctfe.py)
+            value = evaluate_binary(node.operator, node.left.value, node.right.value)
+            if value is not None:
+                return self.exprs.literal(value)
+            return node
 
         # x + 0 -> x
         if node.operator == TokenType.PLUS:
@@ -122,9 +153,11 @@ class Optimizer(NodeVisitor):
         if node.operator == TokenType.MUL:
             if is_right_lit and node.right.value == 1: return node.left
             if is_left_lit and node.left.value == 1: return node.right
-            # x * 0 -> 0
-            if is_right_lit and node.right.value == 0: return ast.LiteralExpr(0)
-            if is_left_lit and node.left.value == 0: return ast.LiteralExpr(0)
+            # x * 0 -> 0, se il calcolo di x si può scartare (niente assegnamenti né effetti)
+            if is_right_lit and node.right.value == 0 and removable_call(node.left):
+                return self.exprs.literal(0)
+            if is_left_lit and node.left.value == 0 and removable_call(node.right):
+                return self.exprs.literal(0)
 
         # x / 1 -> x
         if node.operator == TokenType.DIV:
@@ -132,26 +165,50 @@ class Optimizer(NodeVisitor):
 
         return node
 
+    @iterative
     def visit_UnaryExpr(self, node):
-        node.operand = self.visit(node.operand)
+        operand = yield node.operand
+        return self.fold_unary(self.exprs.rebuild_unary(node, operand))
+
+    def fold_unary(self, node):
+        folded = self.simplify_unary(node)
+        if folded is not node:
+            self.folded += 1
+        return folded
 
+    def simplify_unary(self, node):
         if isinstance(node.operand, ast.LiteralExpr):
-            if node.operator == TokenType.MINUS:
-                return ast.LiteralExpr(-node.operand.value)
-            elif node.operator == TokenType.NOT:
-                return ast.LiteralExpr(1 if node.operand.value == 0 else 0)
+            value = evaluate_unary(node.operator, node.operand.value)
+            if value is not None:
+                return self.exprs.literal(value)
 
         return node
 
     def visit_LiteralExpr(self, node): return node
     def visit_VariableExpr(self, node): return node
+    @iterative
     def visit_AssignExpr(self, node):
-        node.value = self.visit(node.value)
+        node.value = yield node.value
         return node
+    @iterative
     def visit_CallExpr(self, node):
-        node.args = [self.visit(arg) for arg in node.args]
+        args = []
+        for arg in node.args:
+            args.append((yield arg))
+        node.args = args
+        return self.evaluate_call(node)
+
+    def evaluate_call(self, node):
+        # Chiamata a funzione pura con argomenti costanti: il risultato calcolato
+        # a compile time la sostituisce
+        if self.evaluator is not None:
+            value = self.evaluator.evaluate(node)
+            if value is not None:
+                self.evaluated += 1
+                return self.exprs.literal(value)
         return node
+    @iterative
     def visit_PipeExpr(self, node):
-        node.left = self.visit(node.left)
-        node.right = self.visit(node.right)
+        node.left = yield node.left
+        node.right = yield node.right
         return node
\ No newline at end of file
@@ -0,0 +1,64 @@
+from dataclasses import dataclass, replace
+from typing import Optional, Sequence
+from src.unroll import UNROLL_BUDGET
+from src.inliner import INLINE_BUDGET
+from src.ctfe import CTFE_BUDGET
+
+DEFAULT_LEXER = 'regex'
+# Opzioni dei passi eseguiti solo da -O2, con il flag della riga di comando
+O2_OPTIONS = {'unroll_budget': '--unroll-budget', 'inline_budget': '--inline-budget',
+              'ctfe_budget': '--ctfe-budget', 'licm': '--no-licm', 'cse': '--no-cse'}
+
+@dataclass(frozen=True)
+class CompileOptions:
+    # Opzioni della compilazione, dalla riga di comando (o dagli argomenti di
+    # compile_source) fino alla pipeline di ottimizzazione: ogni fase legge
+    # solo i campi che la riguardano
+    debug: bool = False
+    stats: bool = False
+    # Front end
+    lexer_kind: str = DEFAULT_LEXER
+    lazy: bool = False
+    exports: Sequence[str] = ()
+    jobs: int = 1
+    ast_cache: Optional[str] = None
+    hash_cons: bool = False
+    # Middle end e ottimizzazioni
+    fused: bool = False
+    prune: bool = False
+    icf: bool = False
+    opt_level: int = 1
+    unroll_budget: int = UNROLL_BUDGET
+    inline_budget: int = INLINE_BUDGET
+    ctfe_budget: int = CTFE_BUDGET
+    licm: bool = True
+    cse: bool = True
+
+    @property
+    def roots(self):
+        # Radici del pruning dopo la semantica: main e le funzioni esportate
+        return ['main', *self.exports] if self.prune else None
+
+    def ignored(self, pretokenized=False, streaming=False):
+        # Opzioni che non hanno effetto insieme alle altre: pretokenized se i
+        # token arrivano già prodotti (compile_tokens), streaming se arrivano da
+        # un generatore invece che da un TokenStore
+        messages = []
+        if pretokenized and self.lexer_kind != DEFAULT_LEXER:
+            messages.append("--lexer ignorato: i token in streaming sono prodotti dal lexer regex")
+        if pretokenized and self.ast_cache:
+            messages.append("--ast-cache ignorato: la cache richiede il testo del sorgente (non con --stream)")
+        elif self.lazy and self.ast_cache:
+            messages.append("--ast-cache ignorato: l'AST del parsing pigro è parziale (non con --lazy)")
+        if self.jobs != 1 and (self.lazy or streaming):
+            messages.append("-j ignorato: il parsing parallelo richiede tutti i token (non con --lazy né con --stream)")
+        if self.opt_level < 2:
+            defaults = CompileOptions()
+            messages.extend(f"{flag} ignorato: il passo viene eseguito solo con -O2"
+                            for name, flag in O2_OPTIONS.items() if getattr(self, name) != getattr(defaults, name))
+        return messages
+
+def resolve_options(options, overrides):
+    # Opzioni esplicite, eventualmente modificate da argomenti con lo stesso nome
+    options = options or CompileOptions()
+    return replace(options, **overrides) if overrides else options
@@ -0,0 +1,85 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+from src.tokens import TokenType, TOKEN_CODES
+from src.lexer import RegexLexer
+from src.parser import Parser
+import src.ast_nodes as ast
+
+# Numero di blocchi per processo: blocchi più piccoli bilanciano meglio il carico
+CHUNKS_PER_JOB = 4
+
+def declaration_starts(types):
+    # Indici dei token che aprono una dichiarazione globale (func, extern func, let)
+    # a profondità di graffe zero
+    lbrace = TOKEN_CODES[TokenType.LBRACE]
+    rbrace = TOKEN_CODES[TokenType.RBRACE]
+    extern = TOKEN_CODES[TokenType.EXTERN]
+    func = TOKEN_CODES[TokenType.FUNC]
+    openers = {func, extern, TOKEN_CODES[TokenType.LET]}
+
+    starts = []
+    depth = 0
+    # Il 'func' di una extern (anche 'extern pure func') non apre una dichiarazione
+    in_extern = False
+    for index, code in enumerate(types):
+        if code == lbrace:
+            depth += 1
+        elif code == rbrace:
+            depth -= 1
+        elif depth == 0 and code in openers:
+            if code == func and in_extern:
+                in_extern = False
+                continue
+            starts.append(index)
+            in_extern = code == extern
+    return starts
+
+def split_declarations(store, n_chunks):
+    # Intervalli [lo, hi) di token, tagliati solo ai confini tra dichiarazioni
+    # e di dimensione simile
+    starts = declaration_starts(store.types)
+    if not starts:
+        return []
+    starts[0] = 0
+    target = max(1, len(store) // n_chunks)
+    ranges = []
+    lo = 0
+    for start in starts[1:]:
+        if start - lo >= target:
+            ranges.append((lo, start))
+            lo = start
+    ranges.append((lo, len(store)))
+    return ranges
+
+def parse_chunk(source):
+    # Eseguita nei processi worker: il blocco viene rilexato dal testo,
+    # più economico da trasferire di una lista di Token
+    try:
+        return Parser(list(RegexLexer(source).tokenize())).parse().declarations
+    except SyntaxError:
+        return None
+
+def parse_parallel(store, jobs=None, line_index=None, symbols=None, exprs=None):
+    jobs = jobs or os.cpu_count() or 1
+    ranges = split_declarations(store, jobs * CHUNKS_PER_JOB)
+    if jobs == 1 or len(ranges) < 2 or store.text is None:
+        return Parser(store, line_index=line_index, symbols=symbols, exprs=exprs).parse()
+
+    store.normalize()
+    text = store.text
+    sources = [text[store.starts[lo]:store.ends[hi - 1]] for lo, hi in ranges]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        results = list(pool.map(parse_chunk, sources))
+
+    declarations = []
+    for (lo, hi), chunk in zip(ranges, results):
+        if chunk is None:
+            # Il blocco contiene un errore: lo si rianalizza qui con il TokenStore
+            # originale per riportare lo stesso messaggio del parsing sequenziale
+            parser = Parser(list(store.iter_range(lo, hi)), line_index=line_index, symbols=symbols)
+            chunk = parser.parse().declarations
+        declarations.extend(chunk)
+    program = ast.Program(declarations)
+    # I worker non condividono la factory: con l'hash-consing le espressioni
+    # vengono internate qui, dopo l'unione dei blocchi
+    return exprs.intern_tree(program) if exprs is not None else program
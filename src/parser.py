@@ -1,12 +1,82 @@
-from src.tokens import TokenType
+from collections import deque
+from src.tokens import TokenType, TOKEN_CODES
 import src.ast_nodes as ast
+from src.hashcons import ExprFactory
+
+# Precedenza degli operatori binari, tutti associativi a sinistra
+BINARY_PRECEDENCE = {
+    TokenType.AND: 1, TokenType.OR: 1,
+    TokenType.EQ: 2, TokenType.NE: 2,
+    TokenType.LT: 3, TokenType.GT: 3, TokenType.LE: 3, TokenType.GE: 3,
+    TokenType.PLUS: 4, TokenType.MINUS: 4,
+    TokenType.MUL: 5, TokenType.DIV: 5,
+}
+
+# Parole chiave contestuali tra 'extern' e 'func': restano identificatori altrove
+EFFECT_KEYWORDS = {'pure': ast.Effect.PURE, 'readonly': ast.Effect.READONLY}
+
+class TokenBuffer:
+    # Finestra di lookahead su un flusso di token: trattiene solo i token
+    # osservati con peek e non ancora consumati
+    def __init__(self, source):
+        self.source = iter(source)
+        self.buffer = deque()
+        self.max_depth = 0
+
+    def peek(self, offset=0):
+        buffer = self.buffer
+        while len(buffer) <= offset:
+            token = next(self.source, None)
+            if token is None:
+                return None
+            buffer.append(token)
+            if len(buffer) > self.max_depth:
+                self.max_depth = len(buffer)
+        return buffer[offset]
+
+    def advance(self):
+        self.buffer.popleft()
 
 class Parser:
-    def __init__(self, tokens):
-        self.tokens = tokens
+    def __init__(self, tokens, line_index=None, symbols=None, lazy=False, exprs=None):
+        # Una lista viene indicizzata direttamente, qualsiasi altro iterabile
+        # (es. il generatore del lexer) viene consumato tramite TokenBuffer
+        # Un TokenStore in modalità pigra resta ad accesso diretto: i corpi saltati
+        # non vengono mai convertiti in Token
+        if isinstance(tokens, list) or (lazy and hasattr(tokens, 'iter_range')):
+            self.tokens = tokens
+            self.lookahead = None
+        else:
+            self.tokens = None
+            self.lookahead = TokenBuffer(tokens)
         self.pos = 0
+        # LineIndex del sorgente: se presente gli errori riportano riga e colonna
+        self.line_index = line_index
+        # SymbolTable condivisa: gli identificatori non internati dal lexer lo sono qui
+        self.symbols = symbols
+        # Parsing pigro: i corpi delle funzioni vengono analizzati al primo accesso
+        self.lazy = lazy
+        self.bodies_parsed = 0
+        # Costruzione delle espressioni pure (HashConsFactory per condividerle)
+        self.exprs = exprs or ExprFactory()
+
+    def sym(self, token):
+        if token.sym is not None or self.symbols is None:
+            return token.sym
+        return self.symbols.intern(token.value)
+
+    def param_syms(self, tokens):
+        syms = [self.sym(tok) for tok in tokens]
+        return syms if None not in syms else None
+
+    def location(self, token=None):
+        if token is not None and token.start is not None and self.line_index is not None:
+            return self.line_index.describe(token.start)
+        return f"position {self.pos}"
 
     def peek(self, offset=0):
+        if self.lookahead is not None:
+            return self.lookahead.peek(offset)
         if self.pos + offset < len(self.tokens):
             return self.tokens[self.pos + offset]
         return None
@@ -16,9 +86,11 @@ class Parser:
         if not token or token.type == TokenType.EOF:
             raise SyntaxError("Unexpected end of input")
         if expected_type and token.type != expected_type:
-            raise SyntaxError(f"Expected {expected_type}, found {token.type} at position {self.pos}")
+            raise SyntaxError(f"Expected {expected_type}, found {token.type} at {self.location(token)}")
 
         self.pos += 1
+        if self.lookahead is not None:
+            self.lookahead.advance()
         return token
 
     def check(self, token_type):
@@ -46,43 +118,119 @@ class Parser:
         elif self.check(TokenType.LET):
             return self.parse_var_decl()
         else:
-            raise SyntaxError(f"Unexpected token at global scope: {self.peek()}")
+            raise SyntaxError(f"Unexpected token at global scope: {self.peek()} at {self.location(self.peek())}")
 
     def parse_extern_decl(self):
         self.consume(TokenType.EXTERN)
+        effect = ast.Effect.IMPURE
+        if self.check(TokenType.ID) and self.peek().value in EFFECT_KEYWORDS:
+            effect = EFFECT_KEYWORDS[self.consume().value]
         self.consume(TokenType.FUNC)
-        name = self.consume(TokenType.ID).value
+        name_tok = self.consume(TokenType.ID)
         self.consume(TokenType.LPAREN)
-        params = self.parse_params()
+        param_toks = self.parse_param_tokens()
         self.consume(TokenType.RPAREN)
         self.consume(TokenType.SEMI)
-        return ast.ExternDecl(name, params)
+        return ast.ExternDecl(name_tok.value, [tok.value for tok in param_toks], effect,
+                              sym=self.sym(name_tok), param_syms=self.param_syms(param_toks))
 
     def parse_func_decl(self):
         self.consume(TokenType.FUNC)
-        name = self.consume(TokenType.ID).value
+        name_tok = self.consume(TokenType.ID)
         self.consume(TokenType.LPAREN)
-        params = self.parse_params()
+        param_toks = self.parse_param_tokens()
         self.consume(TokenType.RPAREN)
         self.consume(TokenType.LBRACE)
-        body = self.parse_stmts()
+        if self.lazy:
+            body = self.skip_body()
+        else:
+            scope = self.exprs.enter_scope()
+            body = ast.Block(self.parse_stmts())
+            self.exprs.leave_scope(scope)
         self.consume(TokenType.RBRACE)
-        return ast.FunctionDecl(name, params, ast.Block(body))
+        return ast.FunctionDecl(name_tok.value, [tok.value for tok in param_toks], body,
+                                sym=self.sym(name_tok), param_syms=self.param_syms(param_toks))
+
+    def skip_body(self):
+        # Avanza fino alla '}' corrispondente senza costruire nodi e restituisce
+        # un LazyBlock che analizzerà l'intervallo di token solo se richiesto
+        if self.lookahead is not None:
+            # In streaming i token del corpo vanno trattenuti per il parsing differito
+            body_tokens = self.skip_balanced(collect=True)
+            body_tokens.append(self.peek())
+            return ast.LazyBlock(lambda: self.parse_body(body_tokens, 0, len(body_tokens) - 1))
+
+        start = self.pos
+        if hasattr(self.tokens, 'iter_range'):
+            self.pos = end = self.skip_balanced_codes(self.tokens.types, start)
+            store = self.tokens
+            return ast.LazyBlock(lambda: self.parse_body(list(store.iter_range(start, end + 1)),
+                                                         0, end - start))
+        self.skip_balanced(collect=False)
+        end = self.pos
+        return ast.LazyBlock(lambda: self.parse_body(self.tokens, start, end))
+
+    def skip_balanced(self, collect):
+        collected = [] if collect else None
+        depth = 0
+        while True:
+            token = self.peek()
+            if not token or token.type == TokenType.EOF:
+                raise SyntaxError("Unexpected end of input")
+            if token.type == TokenType.LBRACE:
+                depth += 1
+            elif token.type == TokenType.RBRACE:
+                if depth == 0:
+                    return collected
+                depth -= 1
+            self.consume()
+            if collect:
+                collected.append(token)
+
+    def skip_balanced_codes(self, types, pos):
+        # Variante per TokenStore: scorre direttamente l'array dei codici
+        lbrace = TOKEN_CODES[TokenType.LBRACE]
+        rbrace = TOKEN_CODES[TokenType.RBRACE]
+        depth = 0
+        for pos in range(pos, len(types)):
+            code = types[pos]
+            if code == lbrace:
+                depth += 1
+            elif code == rbrace:
+                if depth == 0:
+                    return pos
+                depth -= 1
+        raise SyntaxError("Unexpected end of input")
+
+    def parse_body(self, tokens, start, end):
+        body_parser = Parser(tokens, line_index=self.line_index, symbols=self.symbols, exprs=self.exprs)
+        body_parser.pos = start
+        scope = self.exprs.enter_scope()
+        statements = body_parser.parse_stmts()
+        self.exprs.leave_scope(scope)
+        if body_parser.pos != end:
+            token = body_parser.peek()
+            raise SyntaxError(f"Unexpected token {token} at {body_parser.location(token)}")
+        self.bodies_parsed += 1
+        return statements
 
     def parse_var_decl(self):
         self.consume(TokenType.LET)
-        name = self.consume(TokenType.ID).value
+        name_tok = self.consume(TokenType.ID)
         self.consume(TokenType.ASSIGN)
         expr = self.parse_expr()
         self.consume(TokenType.SEMI)
-        return ast.VarDecl(name, expr)
+        return ast.VarDecl(name_tok.value, expr, sym=self.sym(name_tok))
 
     def parse_params(self):
+        return [tok.value for tok in self.parse_param_tokens()]
+
+    def parse_param_tokens(self):
         params = []
         if self.check(TokenType.ID):
-            params.append(self.consume(TokenType.ID).value)
+            params.append(self.consume(TokenType.ID))
             while self.match(TokenType.COMMA):
-                params.append(self.consume(TokenType.ID).value)
+                params.append(self.consume(TokenType.ID))
         return params
 
     def parse_stmts(self):
@@ -152,120 +300,104 @@ class Parser:
         return self.parse_pipe_expr()
 
     def parse_pipe_expr(self):
-        left = self.parse_assign_expr()
-        if self.match(TokenType.PIPE):
-            right = self.parse_pipe_expr()
-            return ast.PipeExpr(left, right)
-        return left
+        # La catena 'a |> b |> c' viene letta iterativamente e ripiegata da destra,
+        # ottenendo lo stesso albero della grammatica ricorsiva: Pipe(a, Pipe(b, c))
+        operands = [self.parse_assign_expr()]
+        while self.match(TokenType.PIPE):
+            operands.append(self.parse_assign_expr())
+        expr = operands.pop()
+        while operands:
+            expr = ast.PipeExpr(operands.pop(), expr)
+        return expr
 
     def parse_assign_expr(self):
         if self.check(TokenType.ID) and self.peek(1) and self.peek(1).type == TokenType.ASSIGN:
-            name = self.consume(TokenType.ID).value
+            name_tok = self.consume(TokenType.ID)
             self.consume(TokenType.ASSIGN)
-            value = self.parse_logic_expr()
-            return ast.AssignExpr(name, value)
-        return self.parse_logic_expr()
-
-    def parse_logic_expr(self):
-        left = self.parse_equality_expr()
-        while self.check(TokenType.AND) or self.check(TokenType.OR):
-            op = self.consume().type
-            right = self.parse_equality_expr()
-            left = ast.BinaryExpr(left, op, right)
-        return left
-
-    def parse_equality_expr(self):
-        left = self.parse_rel_expr()
-        while self.check(TokenType.EQ) or self.check(TokenType.NE):
-            op = self.consume().type
-            right = self.parse_rel_expr()
-            left = ast.BinaryExpr(left, op, right)
-        return left
-
-    def parse_rel_expr(self):
-        left = self.parse_add_expr()
-        while self.check(TokenType.LT) or self.check(TokenType.GT) or \
-                self.check(TokenType.LE) or self.check(TokenType.GE):
-            op = self.consume().type
-            right = self.parse_add_expr()
-            left = ast.BinaryExpr(left, op, right)
-        return left
-
-    def parse_add_expr(self):
-        left = self.parse_mul_expr()
-        while self.check(TokenType.PLUS) or self.check(TokenType.MINUS):
-            op = self.consume().type
-            right = self.parse_mul_expr()
-            left = ast.BinaryExpr(left, op, right)
-        return left
-
-    def parse_mul_expr(self):
+            value = self.parse_binary_expr()
+            return ast.AssignExpr(name_tok.value, value, sym=self.sym(name_tok))
+        return self.parse_binary_expr()
+
+    def parse_binary_expr(self, min_precedence=1):
+        # Precedence climbing: un solo livello di chiamata per operando
+        # invece di una funzione per livello di precedenza
         left = self.parse_unary_expr()
-        while self.check(TokenType.MUL) or self.check(TokenType.DIV):
-            op = self.consume().type
-            right = self.parse_unary_expr()
-            left = ast.BinaryExpr(left, op, right)
-        return left
+        binary = self.exprs.binary
+        while True:
+            token = self.peek()
+            precedence = BINARY_PRECEDENCE.get(token.type) if token else None
+            if precedence is None or precedence < min_precedence:
+                return left
+            self.consume()
+            right = self.parse_binary_expr(precedence + 1)
+            left = binary(left, token.type, right)
 
     def parse_unary_expr(self):
-        if self.check(TokenType.MINUS) or self.check(TokenType.NOT):
-            op = self.consume().type
-            operand = self.parse_unary_expr()
-            return ast.UnaryExpr(op, operand)
-        return self.parse_primary()
-
-    # Lambda Lookahead
+        # Operatori prefissi accumulati e applicati dal più interno
+        operators = []
+        while self.check(TokenType.MINUS) or self.check(TokenType.NOT):
+            operators.append(self.consume().type)
+        expr = self.parse_primary()
+        while operators:
+            expr = self.exprs.unary(operators.pop(), expr)
+        return expr
+
+    # Lambda Lookahead: bastano al più tre token dopo '('
+    #   '(' ')'          -> lambda senza parametri
+    #   '(' ID ','       -> lista di parametri (un gruppo non può contenere virgole)
+    #   '(' ID ')' '=>'  -> lambda con un parametro
     def is_lambda_lookahead(self):
-        offset = 1
-        if self.peek(offset) and self.peek(offset).type == TokenType.RPAREN:
-            return self.peek(offset + 1) and self.peek(offset + 1).type == TokenType.ARROW
-
-        if self.peek(offset) and self.peek(offset).type == TokenType.ID:
-            offset += 1
-            while True:
-                token = self.peek(offset)
-                if not token: return False
-
-                if token.type == TokenType.RPAREN:
-                    return self.peek(offset + 1) and self.peek(offset + 1).type == TokenType.ARROW
-
-                elif token.type == TokenType.COMMA:
-                    offset += 1
-                    if not (self.peek(offset) and self.peek(offset).type == TokenType.ID):
-                        return False
-                    offset += 1
-                else:
-                    return False
+        first = self.peek(1)
+        if not first:
+            return False
+        if first.type == TokenType.RPAREN:
+            return True
+        if first.type != TokenType.ID:
+            return False
+
+        second = self.peek(2)
+        if not second:
+            return False
+        if second.type == TokenType.COMMA:
+            return True
+        if second.type == TokenType.RPAREN:
+            third = self.peek(3)
+            return bool(third) and third.type == TokenType.ARROW
         return False
 
     def parse_primary(self):
         if self.check(TokenType.INTEGER):
-            return ast.LiteralExpr(self.consume().value)
+            return self.exprs.literal(self.consume().value)
 
         elif self.check(TokenType.ID):
             if self.peek(1) and self.peek(1).type == TokenType.LPAREN:
                 return self.parse_call()
             else:
-                return ast.VariableExpr(self.consume(TokenType.ID).value)
+                name_tok = self.consume(TokenType.ID)
+                return self.exprs.variable(name_tok.value, self.sym(name_tok))
 
         elif self.check(TokenType.LPAREN):
             if self.is_lambda_lookahead():
                 self.consume(TokenType.LPAREN)
-                params = self.parse_params()
+                param_toks = self.parse_param_tokens()
                 self.consume(TokenType.RPAREN)
                 self.consume(TokenType.ARROW)
+                # Il corpo diventa una funzione a sé con il proprio frame
+                scope = self.exprs.enter_scope()
                 body = self.parse_expr()
-                return ast.LambdaExpr(params, body)
+                self.exprs.leave_scope(scope)
+                return ast.LambdaExpr([tok.value for tok in param_toks], body,
+                                      param_syms=self.param_syms(param_toks))
             else:
                 self.consume(TokenType.LPAREN)
                 expr = self.parse_expr()
                 self.consume(TokenType.RPAREN)
                 return expr
 
-        raise SyntaxError(f"Unexpected token in expression: {self.peek()}")
+        raise SyntaxError(f"Unexpected token in expression: {self.peek()} at {self.location(self.peek())}")
 
     def parse_call(self):
-        name = self.consume(TokenType.ID).value
+        name_tok = self.consume(TokenType.ID)
         self.consume(TokenType.LPAREN)
         args = []
         if not self.check(TokenType.RPAREN):
@@ -273,4 +405,4 @@ class Parser:
             while self.match(TokenType.COMMA):
                 args.append(self.parse_expr())
         self.consume(TokenType.RPAREN)
-        return ast.CallExpr(name, args)
\ No newline at end of file
+        return ast.CallExpr(name_tok.value, args, sym=self.sym(name_tok))
\ No newline at end of file
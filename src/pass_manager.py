@@ -0,0 +1,278 @@
+import time
+from collections import Counter, defaultdict
+import src.ast_nodes as ast
+from src.optimizer import Optimizer
+from src.effects import infer_effects
+from src.callgraph import prune_unreachable
+from src.icf import fold_identical_functions
+from src.unroll import UNROLL_BUDGET, unroll_loops
+from src.inliner import INLINE_BUDGET, Inliner
+from src.ctfe import CTFE_BUDGET, CompileTimeEvaluator
+from src.licm import LoopInvariantMotion
+from src.cse import ValueNumbering
+from src.constprop import ConstantPropagator, remove_dead_variables, merge_overwritten_declarations
+from src.options import CompileOptions
+
+# Giri massimi del punto fisso sui passi di funzione
+MAX_ROUNDS = 10
+
+class Pass:
+    # Passo sull'AST dopo l'analisi semantica. Un passo di funzione riceve una
+    # dichiarazione globale (funzione o 'let') alla volta, un passo di modulo
+    # (module = True) l'intero programma; entrambi restituiscono True se hanno
+    # modificato l'AST e registrano i propri contatori in stats.
+    name = None
+    module = False
+
+    def run(self, target, stats):
+        raise NotImplementedError
+
+class PrunePass(Pass):
+    name = "prune"
+    module = True
+
+    def __init__(self, roots):
+        self.roots = roots
+
+    def run(self, program, stats):
+        removed = prune_unreachable(program, self.roots)
+        stats.count("funzioni irraggiungibili rimosse", len(removed))
+        return bool(removed)
+
+class EffectsPass(Pass):
+    # Analisi: annota effetto e terminazione usati da codegen e ottimizzazioni
+    name = "effects"
+    module = True
+
+    def run(self, program, stats):
+        stats.count("funzioni pure", len(infer_effects(program)))
+        return False
+
+class InlinePass(Pass):
+    # Espansione delle chiamate a funzioni piccole e non ricorsive (src/inliner.py)
+    name = "inline"
+    module = True
+
+    def __init__(self, exprs=None, budget=INLINE_BUDGET):
+        self.exprs = exprs
+        self.budget = budget
+
+    def run(self, program, stats):
+        inlined = Inliner(self.exprs, self.budget).run(program)
+        stats.count("chiamate espanse", inlined)
+        return bool(inlined)
+
+class FoldPass(Pass):
+    # Constant folding, semplificazioni algebriche ed eliminazione del codice
+    # morto (src/optimizer.py); con un valutatore anche le chiamate pure con
+    # argomenti costanti (src/ctfe.py)
+    name = "fold"
+
+    def __init__(self, exprs=None, evaluator=None):
+        self.optimizer = Optimizer(exprs, evaluator)
+
+    def run(self, decl, stats):
+        optimizer = self.optimizer
+        folded, removed, evaluated = optimizer.folded, optimizer.removed, optimizer.evaluated
+        optimizer.visit(decl)
+        stats.count("nodi semplificati", optimizer.folded - folded)
+        stats.count("istruzioni rimosse", optimizer.removed - removed)
+        stats.count("chiamate valutate", optimizer.evaluated - evaluated)
+        return (optimizer.folded != folded or optimizer.removed != removed
+                or optimizer.evaluated != evaluated)
+
+class ConstPropPass(Pass):
+    # Propagazione di costanti e copie, eliminazione delle variabili mai lette e
+    # delle dichiarazioni subito sovrascritte (src/constprop.py); il folding del
+    # giro successivo sfrutta i valori sostituiti
+    name = "constprop"
+
+    def __init__(self, exprs=None):
+        self.propagator = ConstantPropagator(exprs)
+
+    def run(self, decl, stats):
+        if not isinstance(decl, ast.FunctionDecl):
+            return False
+        propagator = self.propagator
+        replaced = propagator.replaced
+        propagator.visit(decl)
+        removed = remove_dead_variables(decl)
+        merged = merge_overwritten_declarations(decl)
+        stats.count("variabili sostituite", propagator.replaced - replaced)
+        stats.count("variabili eliminate", removed)
+        stats.count("dichiarazioni sovrascritte", merged)
+        return propagator.replaced != replaced or bool(removed or merged)
+
+class LicmPass(Pass):
+    # Calcolo delle espressioni invarianti prima dei cicli (src/licm.py)
+    name = "licm"
+
+    def __init__(self, exprs=None):
+        self.motion = LoopInvariantMotion(exprs)
+
+    def run(self, decl, stats):
+        if not isinstance(decl, ast.FunctionDecl):
+            return False
+        hoisted = self.motion.run(decl)
+        stats.count("espressioni invarianti spostate", hoisted)
+        return bool(hoisted)
+
+class CsePass(Pass):
+    # Eliminazione delle sottoespressioni comuni nelle regioni lineari (src/cse.py)
+    name = "cse"
+
+    def __init__(self, exprs=None):
+        self.numbering = ValueNumbering(exprs)
+
+    def run(self, decl, stats):
+        if not isinstance(decl, ast.FunctionDecl):
+            return False
+        eliminated = self.numbering.run(decl)
+        stats.count("espressioni comuni eliminate", eliminated)
+        return bool(eliminated)
+
+class IcfPass(Pass):
+    name = "icf"
+    module = True
+
+    def run(self, program, stats):
+        folded = fold_identical_functions(program)
+        stats.count("funzioni identiche unite", len(folded))
+        return bool(folded)
+
+class UnrollPass(Pass):
+    name = "unroll"
+    module = True
+
+    def __init__(self, budget=UNROLL_BUDGET):
+        self.budget = budget
+
+    def run(self, program, stats):
+        full, partial = unroll_loops(program, self.budget)
+        stats.count("cicli srotolati", full)
+        stats.count("cicli srotolati in parte", partial)
+        return bool(full or partial)
+
+class PassStats:
+    # Per ciascun passo: esecuzioni, modifiche, tempo totale e contatori propri
+    def __init__(self):
+        self.runs = Counter()
+        self.changes = Counter()
+        self.times = defaultdict(float)
+        self.counters = defaultdict(Counter)
+        self.current = None
+        self.rounds = 0
+
+    def count(self, counter, amount=1):
+        if amount:
+            self.counters[self.current][counter] += amount
+
+    def report(self):
+        lines = [f"{'passo':<10}{'esecuzioni':>12}{'modifiche':>11}{'tempo':>11}"]
+        for name in self.runs:
+            lines.append(f"{name:<10}{self.runs[name]:>12}{self.changes[name]:>11}"
+                         f"{self.times[name] * 1000:>9.2f}ms")
+            for counter, value in self.counters[name].items():
+                lines.append(f"    {counter}: {value}")
+        lines.append(f"giri del punto fisso: {self.rounds}")
+        return lines
+
+class PassManager:
+    # Esegue i passi nell'ordine dato. I passi di funzione consecutivi formano un
+    # gruppo iterato fino al punto fisso con una worklist di dichiarazioni
+    # modificate: dopo ogni giro gli effetti vengono ricalcolati e, se l'effetto
+    # di una funzione cambia, anche i suoi chiamanti tornano nella worklist.
+    def __init__(self, passes, max_rounds=MAX_ROUNDS):
+        self.passes = passes
+        self.max_rounds = max_rounds
+        self.stats = PassStats()
+
+    def run(self, program):
+        group = []
+        for pass_ in self.passes:
+            if pass_.module:
+                self.run_group(program, group)
+                group = []
+                self.run_pass(pass_, program)
+            else:
+                group.append(pass_)
+        self.run_group(program, group)
+        return self.stats
+
+    def run_pass(self, pass_, target):
+        stats = self.stats
+        stats.current = pass_.name
+        start = time.perf_counter()
+        changed = pass_.run(target, stats)
+        stats.times[pass_.name] += time.perf_counter() - start
+        stats.runs[pass_.name] += 1
+        if changed:
+            stats.changes[pass_.name] += 1
+        return changed
+
+    def run_group(self, program, group):
+        if not group:
+            return
+        worklist = [decl for decl in program.declarations if not isinstance(decl, ast.ExternDecl)]
+        rounds = 0
+        while worklist and rounds < self.max_rounds:
+            rounds += 1
+            changed = []
+            for decl in worklist:
+                if any([self.run_pass(pass_, decl) for pass_ in group]):
+                    changed.append(decl)
+            if not changed:
+                break
+            worklist = changed + [decl for decl in self.callers_to_revisit(program)
+                                  if decl not in changed]
+        self.stats.rounds += rounds
+
+    def callers_to_revisit(self, program):
+        # Il codice rimosso può rendere pura una funzione: le chiamate inutilizzate
+        # verso di essa diventano eliminabili nei chiamanti
+        functions = [decl for decl in program.declarations if isinstance(decl, ast.FunctionDecl)]
+        before = {decl.name: (decl.effect, decl.willreturn) for decl in functions}
+        if all(effect is None for effect, _ in before.values()):
+            # Effetti mai calcolati (pipeline senza EffectsPass)
+            return []
+        infer_effects(program)
+        moved = {decl.name for decl in functions if before[decl.name] != (decl.effect, decl.willreturn)}
+        if not moved:
+            return []
+        return [decl for decl in functions
+                if any(isinstance(node, ast.CallExpr) and node.callee in moved
+                       for node in ast.walk(decl.body))]
+
+def build_pipeline(options=None, exprs=None):
+    # -O0: nessuna ottimizzazione; -O1 (default): effetti, folding e
+    # propagazione delle costanti al punto fisso; -O2: anche la valutazione a
+    # compile time delle chiamate pure, l'inlining seguito da un nuovo punto
+    # fisso in cui le espressioni invarianti escono dai cicli e le
+    # sottoespressioni comuni vengono calcolate una volta sola, lo
+    # srotolamento dei repeat e l'identical code folding. L'inlining vede il
+    # codice già semplificato (come dopo il middle end fuso) e le funzioni
+    # espanse ovunque vengono poi eliminate dal pruning, se richiesto.
+    options = options or CompileOptions()
+    prune = [PrunePass(options.roots)] if options.roots is not None else []
+    icf = [IcfPass()] if options.icf or options.opt_level >= 2 else []
+    if options.opt_level < 1:
+        return prune + icf
+    if options.opt_level < 2:
+        return [EffectsPass(), FoldPass(exprs), ConstPropPass(exprs)] + prune + icf
+    # Un solo valutatore: la cache dei risultati vale per tutta la pipeline
+    ctfe_budget, inline_budget = options.ctfe_budget, options.inline_budget
+    evaluator = CompileTimeEvaluator(ctfe_budget) if ctfe_budget else None
+    passes = [EffectsPass(), FoldPass(exprs, evaluator), ConstPropPass(exprs)]
+    if inline_budget:
+        passes += [InlinePass(exprs, inline_budget)] + prune + [FoldPass(exprs, evaluator), ConstPropPass(exprs)]
+    if options.licm:
+        # Nell'ultimo gruppo di passi di funzione, sul codice già espanso
+        passes.append(LicmPass(exprs))
+    if options.cse:
+        passes.append(CsePass(exprs))
+    if not inline_budget:
+        passes += prune
+    passes += icf
+    if options.unroll_budget:
+        passes.append(UnrollPass(options.unroll_budget))
+    return passes
@@ -1,104 +1,173 @@
-from src.ast_nodes import NodeVisitor
+from src.ast_nodes import NodeVisitor, iterative
+from src.symbols import SymbolTable, ScopeMap
 import src.ast_nodes as ast
 
 class SemanticError(Exception):
     pass
 
 class SemanticAnalyzer(NodeVisitor):
-    def __init__(self):
-        # mappa nome_funzione -> numero_argomenti
-        self.functions_arity = {}
-        # set di variabili definite nella funzione corrente
-        self.current_scope = set()
-
+    def __init__(self, symbols=None):
+        # Con una SymbolTable condivisa si usano gli id già presenti sui nodi,
+        # altrimenti i nomi vengono internati in una tabella locale
+        self.shared_symbols = symbols is not None
+        self.symbols = symbols if symbols is not None else SymbolTable()
+        # id_funzione -> dichiarazione (None se non definita)
+        self.function_decls = []
+        # variabili definite nella funzione corrente: id -> slot nel frame
+        self.current_scope = ScopeMap()
+        # slot assegnati finora nella funzione corrente
+        self.frame_size = 0
+
+    def sym(self, node, name):
+        if self.shared_symbols and node.sym is not None:
+            return node.sym
+        return self.symbols.intern(name)
+
+    def param_syms(self, node):
+        if self.shared_symbols and node.param_syms is not None:
+            return node.param_syms
+        return [self.symbols.intern(param) for param in node.params]
+
+    def lookup_function(self, sym):
+        if sym < len(self.function_decls):
+            return self.function_decls[sym]
+        return None
+
+    def declare_function(self, node):
+        sym = self.sym(node, node.name)
+        if sym >= len(self.function_decls):
+            self.function_decls.extend([None] * (sym + 1 - len(self.function_decls)))
+        self.function_decls[sym] = node
+
+    @iterative
     def visit_Program(self, node):
         for decl in node.declarations:
-            if isinstance(decl, ast.FunctionDecl):
-                self.functions_arity[decl.name] = len(decl.params)
-            elif isinstance(decl, ast.ExternDecl):
-                self.functions_arity[decl.name] = len(decl.params)
+            if isinstance(decl, (ast.FunctionDecl, ast.ExternDecl)):
+                self.declare_function(decl)
 
         for decl in node.declarations:
             if isinstance(decl, ast.FunctionDecl):
-                self.visit(decl)
+                yield decl
         return node
 
+    @iterative
     def visit_FunctionDecl(self, node):
-        previous_scope = self.current_scope
-        self.current_scope = set()
-
-        for param in node.params:
-            if param in self.current_scope:
-                raise SemanticError(f"Parametro duplicato '{param}' nella funzione '{node.name}'")
-            self.current_scope.add(param)
-
-        self.visit(node.body)
-        self.current_scope = previous_scope
-
+        previous_generation = self.enter_function(node.name, node.params, self.param_syms(node))
+        yield node.body
+        node.frame_size = self.frame_size
+        self.current_scope.generation = previous_generation
+
+    def enter_function(self, name, params, param_syms):
+        previous_generation = self.current_scope.generation
+        self.current_scope.reset()
+
+        # I parametri occupano i primi slot del frame, nell'ordine di dichiarazione
+        self.frame_size = 0
+        for param, sym in zip(params, param_syms):
+            if sym in self.current_scope:
+                raise SemanticError(f"Parametro duplicato '{param}' nella funzione '{name}'")
+            self.current_scope.set(sym, self.frame_size)
+            self.frame_size += 1
+        return previous_generation
+
+    @iterative
     def visit_Block(self, node):
         # Flat Scope
         for stmt in node.statements:
-            self.visit(stmt)
+            yield stmt
 
+    @iterative
     def visit_VarDecl(self, node):
-        self.visit(node.initializer)
-        self.current_scope.add(node.name)
+        yield node.initializer
+        self.define_variable(node)
+
+    def define_variable(self, node):
+        # Scope piatto: una nuova 'let' con un nome già definito nella funzione
+        # riusa il suo slot, come il codegen che ne ricollega il nome
+        sym = self.sym(node, node.name)
+        slot = self.current_scope.get(sym)
+        if slot is None:
+            slot = self.frame_size
+            self.frame_size += 1
+            self.current_scope.set(sym, slot)
+        node.slot = slot
 
     def visit_VariableExpr(self, node):
-        if node.name not in self.current_scope:
+        slot = self.current_scope.get(self.sym(node, node.name))
+        if slot is None:
             raise SemanticError(f"Variabile non definita: '{node.name}'")
+        node.slot = slot
 
+    @iterative
     def visit_CallExpr(self, node):
-        if node.callee not in self.functions_arity:
+        self.check_call(node)
+        for arg in node.args:
+            yield arg
+
+    def check_call(self, node):
+        decl = self.lookup_function(self.sym(node, node.callee))
+        if decl is None:
             raise SemanticError(f"Funzione non definita: '{node.callee}'")
 
-        expected_arity = self.functions_arity[node.callee]
+        expected_arity = len(decl.params)
         actual_arity = len(node.args)
 
         if expected_arity != actual_arity:
             raise SemanticError(
                 f"Errore di Arity per '{node.callee}': attesi {expected_arity} argomenti, ricevuti {actual_arity}"
             )
+        node.decl = decl
 
-        for arg in node.args:
-            self.visit(arg)
-
+    @iterative
     def visit_AssignExpr(self, node):
-        if node.name not in self.current_scope:
+        self.check_assign(node)
+        yield node.value
+
+    def check_assign(self, node):
+        slot = self.current_scope.get(self.sym(node, node.name))
+        if slot is None:
             raise SemanticError(f"Impossibile assegnare a variabile non definita: '{node.name}'")
-        self.visit(node.value)
+        node.slot = slot
 
     # Metodi di visita per propagare l'analisi nei figli
+    @iterative
     def visit_IfStmt(self, node):
-        self.visit(node.condition)
-        self.visit(node.then_branch)
+        yield node.condition
+        yield node.then_branch
         if node.else_branch:
-            self.visit(node.else_branch)
+            yield node.else_branch
 
+    @iterative
     def visit_WhileStmt(self, node):
-        self.visit(node.condition)
-        self.visit(node.body)
+        yield node.condition
+        yield node.body
 
+    @iterative
     def visit_RepeatStmt(self, node):
-        self.visit(node.count)
-        self.visit(node.body)
+        yield node.count
+        yield node.body
 
+    @iterative
     def visit_ReturnStmt(self, node):
-        self.visit(node.value)
+        yield node.value
 
+    @iterative
     def visit_ExprStmt(self, node):
-        self.visit(node.expr)
+        yield node.expr
 
+    @iterative
     def visit_BinaryExpr(self, node):
-        self.visit(node.left)
-        self.visit(node.right)
+        yield node.left
+        yield node.right
 
+    @iterative
     def visit_UnaryExpr(self, node):
-        self.visit(node.operand)
+        yield node.operand
 
+    @iterative
     def visit_PipeExpr(self, node):
-        self.visit(node.left)
-        self.visit(node.right)
+        yield node.left
+        yield node.right
 
     def visit_LiteralExpr(self, node):
-        pass
\ No newline at end of file
+        pass
@@ -0,0 +1,383 @@
+import gc
+import hashlib
+import os
+import re
+import tempfile
+from collections import Counter
+import src.ast_nodes as ast
+from src.tokens import TOKEN_TYPES, TOKEN_CODES
+
+# Formato binario dell'AST:
+#   MAGIC, versione (varint)
+#   tabella dei nomi: numero di nomi, poi per ciascuno lunghezza + UTF-8
+#   numero di varint che seguono (un troncamento tra due nodi resta rilevabile)
+#   sequenza di varint con i nodi in postordine: prima i figli, poi il tag del
+#   tipo (0 = None) seguito dai campi scalari e dalle lunghezze delle liste
+# Interi con segno in zigzag, nomi come indice nella tabella (ordinata per
+# frequenza, così i nomi più usati occupano un byte), operatori come codice del
+# TokenType. Gli id di simbolo non vengono salvati: sono ricalcolati al
+# caricamento se si passa una SymbolTable.
+MAGIC = b'AEAST'
+FORMAT_VERSION = 3
+
+INT, NAME, NAMES, OP, NODE, NODES = range(6)
+
+# Campi di ciascun nodo nell'ordine della dataclass (annotazioni escluse).
+# L'ordine dei tipi definisce i tag: modificarlo richiede una nuova versione.
+SCHEMA = (
+    (ast.Program, (NODES,)),
+    (ast.FunctionDecl, (NAME, NAMES, NODE)),
+    (ast.ExternDecl, (NAME, NAMES, INT)),
+    (ast.VarDecl, (NAME, NODE)),
+    (ast.Block, (NODES,)),
+    (ast.ReturnStmt, (NODE,)),
+    (ast.ExprStmt, (NODE,)),
+    (ast.IfStmt, (NODE, NODE, NODE)),
+    (ast.WhileStmt, (NODE, NODE)),
+    (ast.RepeatStmt, (NODE, NODE)),
+    (ast.LiteralExpr, (INT,)),
+    (ast.VariableExpr, (NAME,)),
+    (ast.BinaryExpr, (NODE, OP, NODE)),
+    (ast.UnaryExpr, (OP, NODE)),
+    (ast.PipeExpr, (NODE, NODE)),
+    (ast.AssignExpr, (NAME, NODE)),
+    (ast.CallExpr, (NAME, NODES)),
+    (ast.LambdaExpr, (NAMES, NODE)),
+)
+
+TAGS = {cls: tag for tag, (cls, _) in enumerate(SCHEMA, start=1)}
+TAGS[ast.LazyBlock] = TAGS[ast.Block]
+FIELDS = [None] + [fields for _, fields in SCHEMA]
+CLASSES = [None] + [cls for cls, _ in SCHEMA]
+
+# Varint su più byte: zero o più byte di continuazione seguiti dal byte finale
+MULTIBYTE_VARINT = re.compile(rb'[\x80-\xff]+[\x00-\x7f]')
+
+class SerializationError(Exception):
+    pass
+
+def write_varint(out, value):
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+
+def zigzag(value):
+    # Interi con segno: 0, -1, 1, -2, ... -> 0, 1, 2, 3, ...
+    return (value << 1) if value >= 0 else ((-value << 1) - 1)
+
+def unzigzag(value):
+    return -((value + 1) >> 1) if value & 1 else value >> 1
+
+def encode_nodes(node):
+    # Postordine iterativo; restituisce gli interi da scrivere, i nomi in ordine
+    # di prima occorrenza e le posizioni degli indici di nome
+    ints = []
+    names = {}
+    name_positions = []
+
+    def name_index(name):
+        index = names.get(name)
+        if index is None:
+            index = names[name] = len(names)
+        name_positions.append(len(ints))
+        return index
+
+    stack = [(node, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if node is None:
+            ints.append(0)
+            continue
+        tag = TAGS.get(type(node))
+        if tag is None:
+            raise SerializationError(f"Nodo non serializzabile: {type(node).__name__}")
+        kinds = FIELDS[tag]
+        values = [getattr(node, name) for name in ast.field_names(CLASSES[tag])[:len(kinds)]]
+
+        if not expanded:
+            stack.append((node, True))
+            children = []
+            for kind, value in zip(kinds, values):
+                if kind == NODE:
+                    children.append(value)
+                elif kind == NODES:
+                    children.extend(value)
+            stack.extend((child, False) for child in reversed(children))
+            continue
+
+        ints.append(tag)
+        for kind, value in zip(kinds, values):
+            if kind == NAME:
+                ints.append(name_index(value))
+            elif kind == INT:
+                ints.append(zigzag(value))
+            elif kind == OP:
+                ints.append(TOKEN_CODES[value])
+            elif kind == NODES:
+                ints.append(len(value))
+            elif kind == NAMES:
+                ints.append(len(value))
+                for name in value:
+                    ints.append(name_index(name))
+    return ints, list(names), name_positions
+
+def dumps(node):
+    ints, names, name_positions = encode_nodes(node)
+
+    # Indici riassegnati per frequenza d'uso
+    frequency = Counter(ints[position] for position in name_positions)
+    order = sorted(range(len(names)), key=lambda index: -frequency[index])
+    rank = [0] * len(names)
+    for new_index, old_index in enumerate(order):
+        rank[old_index] = new_index
+    for position in name_positions:
+        ints[position] = rank[ints[position]]
+
+    out = bytearray(MAGIC)
+    write_varint(out, FORMAT_VERSION)
+    write_varint(out, len(names))
+    for index in order:
+        encoded = names[index].encode('utf-8')
+        write_varint(out, len(encoded))
+        out += encoded
+    write_varint(out, len(ints))
+    for value in ints:
+        if value < 0x80:
+            out.append(value)
+        else:
+            write_varint(out, value)
+    return bytes(out)
+
+def decode_varints(body):
+    # I varint di un byte sono copiati in blocco; solo quelli lunghi sono
+    # decodificati in Python
+    ints = []
+    last = 0
+    for match in MULTIBYTE_VARINT.finditer(body):
+        ints.extend(body[last:match.start()])
+        value = shift = 0
+        for byte in match.group():
+            value |= (byte & 0x7F) << shift
+            shift += 7
+        ints.append(value)
+        last = match.end()
+    if body and body[-1] >= 0x80:
+        raise SerializationError("Dati AST troncati: varint incompleto")
+    ints.extend(body[last:])
+    return ints
+
+# Costruttori specializzati per forma dei campi: ciascuno legge i propri scalari,
+# preleva i figli dalla pila e vi deposita il nodo. syms è None se i simboli
+# non vanno ricalcolati.
+def build_nodes(cls):
+    def build(read, values, names, syms):
+        start = len(values) - read()
+        children = values[start:]
+        del values[start:]
+        values.append(cls(children))
+    return build
+
+def build_node(cls):
+    def build(read, values, names, syms):
+        values.append(cls(values.pop()))
+    return build
+
+def build_node_node(cls):
+    def build(read, values, names, syms):
+        second = values.pop()
+        values.append(cls(values.pop(), second))
+    return build
+
+def build_node_node_node(cls):
+    def build(read, values, names, syms):
+        third = values.pop()
+        second = values.pop()
+        values.append(cls(values.pop(), second, third))
+    return build
+
+def build_int(cls):
+    def build(read, values, names, syms):
+        values.append(cls(unzigzag(read())))
+    return build
+
+def build_name(cls):
+    def build(read, values, names, syms):
+        index = read()
+        node = cls(names[index])
+        if syms is not None:
+            node.sym = syms[index]
+        values.append(node)
+    return build
+
+def build_name_node(cls):
+    def build(read, values, names, syms):
+        index = read()
+        node = cls(names[index], values.pop())
+        if syms is not None:
+            node.sym = syms[index]
+        values.append(node)
+    return build
+
+def build_name_nodes(cls):
+    def build(read, values, names, syms):
+        index = read()
+        start = len(values) - read()
+        children = values[start:]
+        del values[start:]
+        node = cls(names[index], children)
+        if syms is not None:
+            node.sym = syms[index]
+        values.append(node)
+    return build
+
+def build_node_op_node(cls):
+    def build(read, values, names, syms):
+        right = values.pop()
+        values.append(cls(values.pop(), TOKEN_TYPES[read()], right))
+    return build
+
+def build_op_node(cls):
+    def build(read, values, names, syms):
+        values.append(cls(TOKEN_TYPES[read()], values.pop()))
+    return build
+
+def read_params(read, names, syms):
+    indices = [read() for _ in range(read())]
+    params = [names[index] for index in indices]
+    return params, [syms[index] for index in indices] if syms is not None else None
+
+def build_names_node(cls):
+    def build(read, values, names, syms):
+        params, param_syms = read_params(read, names, syms)
+        node = cls(params, values.pop())
+        node.param_syms = param_syms
+        values.append(node)
+    return build
+
+def build_name_names_int(cls):
+    # ExternDecl: il campo intero è l'effetto dichiarato
+    def build(read, values, names, syms):
+        index = read()
+        params, param_syms = read_params(read, names, syms)
+        node = cls(names[index], params, ast.Effect(unzigzag(read())))
+        if syms is not None:
+            node.sym = syms[index]
+        node.param_syms = param_syms
+        values.append(node)
+    return build
+
+def build_name_names_node(cls):
+    def build(read, values, names, syms):
+        index = read()
+        params, param_syms = read_params(read, names, syms)
+        node = cls(names[index], params, values.pop())
+        if syms is not None:
+            node.sym = syms[index]
+        node.param_syms = param_syms
+        values.append(node)
+    return build
+
+BUILDER_FACTORIES = {
+    (NODES,): build_nodes,
+    (NODE,): build_node,
+    (NODE, NODE): build_node_node,
+    (NODE, NODE, NODE): build_node_node_node,
+    (INT,): build_int,
+    (NAME,): build_name,
+    (NAME, NODE): build_name_node,
+    (NAME, NODES): build_name_nodes,
+    (NODE, OP, NODE): build_node_op_node,
+    (OP, NODE): build_op_node,
+    (NAMES, NODE): build_names_node,
+    (NAME, NAMES, INT): build_name_names_int,
+    (NAME, NAMES, NODE): build_name_names_node,
+}
+BUILDERS = [None] + [BUILDER_FACTORIES[fields](cls) for cls, fields in SCHEMA]
+
+def loads(data, symbols=None):
+    if not data.startswith(MAGIC):
+        raise SerializationError("Formato non riconosciuto")
+    pos = len(MAGIC)
+
+    def read_varint():
+        nonlocal pos
+        result = shift = 0
+        while True:
+            if pos >= len(data):
+                raise SerializationError("Dati AST troncati: varint incompleto")
+            byte = data[pos]
+            pos += 1
+            result |= (byte & 0x7F) << shift
+            if byte < 0x80:
+                return result
+            shift += 7
+
+    version = read_varint()
+    if version != FORMAT_VERSION:
+        raise SerializationError(f"Versione {version} non supportata (attesa {FORMAT_VERSION})")
+
+    names = []
+    for _ in range(read_varint()):
+        length = read_varint()
+        if pos + length > len(data):
+            raise SerializationError("Dati AST troncati nella tabella dei nomi")
+        try:
+            names.append(data[pos:pos + length].decode('utf-8'))
+        except UnicodeDecodeError as e:
+            raise SerializationError(f"Nome non valido nella tabella dei nomi: {e}")
+        pos += length
+    syms = [symbols.intern(name) for name in names] if symbols is not None else None
+
+    count = read_varint()
+    ints = decode_varints(data[pos:])
+    if len(ints) != count:
+        raise SerializationError(f"Dati AST troncati o corrotti: {len(ints)} valori, attesi {count}")
+
+    # Macchina a pila: i figli precedono il tag del nodo che li raccoglie
+    ints = iter(ints)
+    read = ints.__next__
+    values = []
+    # L'albero è aciclico: le raccolte del garbage collector durante la
+    # costruzione di migliaia di nodi non libererebbero nulla
+    gc_enabled = gc.isenabled()
+    gc.disable()
+    try:
+        for tag in ints:
+            if tag:
+                BUILDERS[tag](read, values, names, syms)
+            else:
+                values.append(None)
+    except (IndexError, KeyError, StopIteration, TypeError, ValueError) as e:
+        raise SerializationError(f"Dati AST troncati o corrotti: {e!r}")
+    finally:
+        if gc_enabled:
+            gc.enable()
+
+    if len(values) != 1:
+        raise SerializationError("Dati AST troncati o corrotti")
+    return values[0]
+
+def save(node, path):
+    # Scrittura atomica: un file temporaneo nella stessa cartella sostituisce la
+    # destinazione solo se completo, così una scrittura interrotta non lascia
+    # una voce di cache a metà
+    data = dumps(node)
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path) or '.', suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+def load(path, symbols=None):
+    with open(path, 'rb') as f:
+        return loads(f.read(), symbols)
+
+def cache_path(cache_dir, source):
+    # La chiave dipende dal testo e dalla versione del formato: un cambio di
+    # formato invalida le voci precedenti
+    digest = hashlib.sha256(f"{FORMAT_VERSION}\0{source}".encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir, digest + '.ast')
@@ -0,0 +1,54 @@
+class SymbolTable:
+    # Interning degli identificatori per una singola compilazione:
+    # ogni nome riceve un id intero piccolo e stabile
+    def __init__(self):
+        self.names = []
+        self.ids = {}
+
+    def intern(self, name):
+        sym = self.ids.get(name)
+        if sym is None:
+            sym = len(self.names)
+            self.ids[name] = sym
+            self.names.append(name)
+        return sym
+
+    def name(self, sym):
+        return self.names[sym]
+
+    def __len__(self):
+        return len(self.names)
+
+    def __contains__(self, name):
+        return name in self.ids
+
+
+class ScopeMap:
+    # Mappa id -> valore indicizzata per posizione. Il reset è O(1):
+    # ogni voce è valida solo se marcata con la generazione corrente.
+    def __init__(self):
+        self.values = []
+        self.stamps = []
+        self.generation = 1
+        self._last_generation = 1
+
+    def reset(self):
+        # le generazioni non vengono mai riutilizzate, anche dopo un ripristino
+        self._last_generation += 1
+        self.generation = self._last_generation
+
+    def get(self, sym, default=None):
+        if sym < len(self.stamps) and self.stamps[sym] == self.generation:
+            return self.values[sym]
+        return default
+
+    def __contains__(self, sym):
+        return sym < len(self.stamps) and self.stamps[sym] == self.generation
+
+    def set(self, sym, value):
+        if sym >= len(self.stamps):
+            grow = sym + 1 - len(self.stamps)
+            self.stamps.extend([0] * grow)
+            self.values.extend([None] * grow)
+        self.stamps[sym] = self.generation
+        self.values[sym] = value
@@ -1,3 +1,5 @@
+from array import array
+from bisect import bisect_right
 from enum import Enum, auto
 
 class TokenType(Enum):
@@ -51,10 +53,185 @@ class TokenType(Enum):
 
 
 class Token:
-    def __init__(self, type, value=None):
+    __slots__ = ('type', 'value', 'start', 'end', 'sym')
+
+    def __init__(self, type, value=None, start=None, end=None, sym=None):
         self.type = type
         self.value = value
+        # span [start, end) nel sorgente, se noto
+        self.start = start
+        self.end = end
+        # id del simbolo (SymbolTable) per gli identificatori
+        self.sym = sym
 
     def __repr__(self):
         val_str = f", {repr(self.value)}" if self.value is not None else ""
-        return f"Token({self.type.name}{val_str})"
\ No newline at end of file
+        return f"Token({self.type.name}{val_str})"
+
+
+TOKEN_TYPES = list(TokenType)
+TOKEN_CODES = {token_type: code for code, token_type in enumerate(TOKEN_TYPES)}
+
+
+class LineIndex:
+    # Offset di inizio di ogni riga: offset -> (riga, colonna) in O(log n)
+    def __init__(self, text):
+        newline = '\n' if isinstance(text, str) else b'\n'
+        starts = array('I', [0])
+        pos = text.find(newline)
+        while pos != -1:
+            starts.append(pos + 1)
+            pos = text.find(newline, pos + 1)
+        self.line_starts = starts
+
+    def location(self, offset):
+        line = bisect_right(self.line_starts, offset) - 1
+        return line + 1, offset - self.line_starts[line] + 1
+
+    def describe(self, offset):
+        line, column = self.location(offset)
+        return f"line {line}, column {column}"
+
+
+class TokenStore:
+    # Flusso di token compatto: colonne parallele (tipo, inizio, fine, id del valore)
+    # al posto di un oggetto Token per elemento. I valori sono internati in value_table.
+    def __init__(self, text=None, symbols=None):
+        self.text = text
+        self.symbols = symbols
+        self.types = array('B')
+        self.starts = array('i')
+        self.ends = array('i')
+        self.values = array('i')
+        self.value_table = []
+        # id del simbolo associato a ciascun valore (None se non è un identificatore)
+        self.value_syms = []
+        self._value_ids = {}
+        self._line_index = None
+        # Spostamento pendente degli offset dopo un'edit (vedi splice):
+        # i token da shift_from in poi sono memorizzati 'shift' posizioni indietro
+        self.shift_from = 0
+        self.shift = 0
+
+    @classmethod
+    def from_tokens(cls, tokens, text=None, symbols=None):
+        store = cls(text, symbols)
+        for token in tokens:
+            if token.type == TokenType.EOF:
+                break
+            store.append(token.type, token.value, token.start, token.end, token.sym)
+        return store
+
+    def intern_value(self, value, sym=None):
+        if value is None:
+            return -1
+        # la chiave include il tipo per non confondere 1 e '1'
+        key = (type(value), value)
+        value_id = self._value_ids.get(key)
+        if value_id is None:
+            value_id = len(self.value_table)
+            self._value_ids[key] = value_id
+            self.value_table.append(value)
+            self.value_syms.append(sym)
+        elif sym is not None and self.value_syms[value_id] is None:
+            self.value_syms[value_id] = sym
+        return value_id
+
+    def append(self, token_type, value, start, end, sym=None):
+        self.types.append(TOKEN_CODES[token_type])
+        self.starts.append(start)
+        self.ends.append(end)
+        self.values.append(self.intern_value(value, sym))
+
+    def __len__(self):
+        return len(self.types)
+
+    def start(self, index):
+        return self.starts[index] + (self.shift if index >= self.shift_from else 0)
+
+    def end(self, index):
+        return self.ends[index] + (self.shift if index >= self.shift_from else 0)
+
+    def normalize(self):
+        # Applica fisicamente lo spostamento pendente (O(n))
+        if self.shift:
+            self._add_offset(self.shift_from, len(self), self.shift)
+            self.shift = 0
+        self.shift_from = 0
+
+    def _add_offset(self, lo, hi, delta):
+        starts = self.starts
+        ends = self.ends
+        for index in range(lo, hi):
+            starts[index] += delta
+            ends[index] += delta
+
+    def first_ending_at_or_after(self, offset):
+        lo, hi = 0, len(self)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if self.end(mid) < offset:
+                lo = mid + 1
+            else:
+                hi = mid
+        return lo
+
+    def splice(self, lo, hi, tokens, delta, text):
+        # Sostituisce i token [lo, hi) con 'tokens' e sposta di 'delta' quelli successivi.
+        # Lo spostamento della coda resta pendente: si correggono fisicamente solo
+        # i token tra la vecchia e la nuova frontiera, quindi edit vicine costano poco.
+        if self.shift:
+            if self.shift_from < lo:
+                self._add_offset(self.shift_from, lo, self.shift)
+            elif self.shift_from > hi:
+                self._add_offset(hi, self.shift_from, -self.shift)
+
+        self.types[lo:hi] = array('B', [TOKEN_CODES[tok.type] for tok in tokens])
+        self.starts[lo:hi] = array('i', [tok.start for tok in tokens])
+        self.ends[lo:hi] = array('i', [tok.end for tok in tokens])
+        self.values[lo:hi] = array('i', [self.intern_value(tok.value, tok.sym) for tok in tokens])
+
+        self.shift_from = lo + len(tokens)
+        self.shift += delta
+        self.text = text
+        self._line_index = None
+
+    def type_at(self, index):
+        return TOKEN_TYPES[self.types[index]]
+
+    def value_at(self, index):
+        value_id = self.values[index]
+        return self.value_table[value_id] if value_id >= 0 else None
+
+    def sym_at(self, index):
+        value_id = self.values[index]
+        return self.value_syms[value_id] if value_id >= 0 else None
+
+    def __getitem__(self, index):
+        return Token(self.type_at(index), self.value_at(index), self.start(index), self.end(index),
+                     self.sym_at(index))
+
+    def __iter__(self):
+        return self.iter_range(0, len(self))
+
+    def iter_range(self, lo, hi):
+        # Token materializzati solo per l'intervallo [lo, hi)
+        self.normalize()
+        types = TOKEN_TYPES
+        table = self.value_table
+        syms = self.value_syms
+        for code, start, end, value_id in zip(self.types[lo:hi], self.starts[lo:hi],
+                                              self.ends[lo:hi], self.values[lo:hi]):
+            if value_id >= 0:
+                yield Token(types[code], table[value_id], start, end, syms[value_id])
+            else:
+                yield Token(types[code], None, start, end)
+
+    @property
+    def line_index(self):
+        if self._line_index is None and self.text is not None:
+            self._line_index = LineIndex(self.text)
+        return self._line_index
+
+    def location(self, index):
+        return self.line_index.location(self.start(index))
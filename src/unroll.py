@@ -0,0 +1,115 @@
+import copy
+import src.ast_nodes as ast
+from src.tokens import TokenType
+
+# Nodi dell'AST che un ciclo può occupare una volta srotolato
+UNROLL_BUDGET = 64
+# Copie del corpo per iterazione quando il ciclo è srotolato solo in parte
+UNROLL_FACTOR = 4
+
+def counter_name(loop):
+    # Contatore di un ciclo che ha ancora la forma generata per i repeat
+    # (src/desugaring.py): condizione 'contatore < limite' e corpo che termina
+    # con 'contatore = contatore + passo'. I passi che riscrivono condizione o
+    # corpo possono averla cambiata senza togliere l'annotazione counted:
+    # in quel caso None, e il ciclo va trattato come un while qualsiasi.
+    if not loop.counted:
+        return None
+    condition = loop.condition
+    if not isinstance(condition, ast.BinaryExpr) or condition.operator != TokenType.LT \
+            or not isinstance(condition.left, ast.VariableExpr):
+        return None
+    name = condition.left.name
+    statements = loop.body.statements
+    increment = statements[-1].expr if statements and isinstance(statements[-1], ast.ExprStmt) else None
+    if not isinstance(increment, ast.AssignExpr) or increment.name != name:
+        return None
+    step = increment.value
+    if not isinstance(step, ast.BinaryExpr) or step.operator != TokenType.PLUS \
+            or not isinstance(step.left, ast.VariableExpr) or step.left.name != name \
+            or not isinstance(step.right, ast.LiteralExpr) or step.right.value < 1:
+        return None
+    return name
+
+def counter_declaration(loop, statements):
+    # 'let contatore = 0' subito prima del ciclo, nelle istruzioni che lo precedono
+    name = counter_name(loop)
+    if name is None or not statements:
+        return None
+    decl = statements[-1]
+    if isinstance(decl, ast.VarDecl) and decl.name == name and decl.initializer == ast.LiteralExpr(0):
+        return decl
+    return None
+
+def trip_count(loop, statements):
+    # Iterazioni di un ciclo contato (repeat) con limite costante dopo il folding,
+    # se il contatore parte da 0 e avanza di 1
+    if counter_declaration(loop, statements) is None:
+        return None
+    if not isinstance(loop.condition.right, ast.LiteralExpr) or loop.body.statements[-1].expr.value.right.value != 1:
+        return None
+    return max(loop.condition.right.value, 0)
+
+def tree_size(nodes):
+    return sum(1 for node in nodes for _ in ast.walk(node))
+
+def repeated(body, times):
+    # Il corpo originale è usato per la prima copia
+    statements = []
+    for index in range(times):
+        statements.extend(body if index == 0 else [ast.copy_tree(stmt) for stmt in body])
+    return statements
+
+def unroll_partially(loop, count, factor):
+    # Ciclo principale con 'factor' copie del corpo e incremento di 'factor',
+    # poi le iterazioni rimanenti in sequenza (il loro numero è noto)
+    body, increment = loop.body.statements[:-1], loop.body.statements[-1]
+    remainder = count % factor
+
+    condition = ast.BinaryExpr(loop.condition.left, TokenType.LT, ast.LiteralExpr(count - remainder))
+    step = copy.copy(increment.expr)
+    step.value = ast.BinaryExpr(increment.expr.value.left, TokenType.PLUS, ast.LiteralExpr(factor))
+    main_body = repeated(body, factor) + [ast.ExprStmt(step)]
+    main_loop = ast.WhileStmt(condition, ast.Block(main_body))
+    main_loop.counted = True
+    return [main_loop] + repeated([ast.copy_tree(stmt) for stmt in body], remainder)
+
+def unroll_loops(program, budget=UNROLL_BUDGET, factor=UNROLL_FACTOR):
+    # Sui cicli contati con numero di iterazioni costante, dopo l'ottimizzazione:
+    # srotolamento completo se il corpo ripetuto resta nel budget, altrimenti
+    # parziale se almeno due copie del corpo vi rientrano. Le copie create sono
+    # limitate dal budget anche per corpi minuscoli. I blocchi interni sono
+    # trattati prima di quelli che li contengono.
+    blocks = [node for node in ast.walk(program) if isinstance(node, ast.Block)]
+    full = partial = 0
+    for block in reversed(blocks):
+        statements = []
+        changed = False
+        for stmt in block.statements:
+            count = trip_count(stmt, statements) if isinstance(stmt, ast.WhileStmt) else None
+            if count is None:
+                statements.append(stmt)
+                continue
+            body = stmt.body.statements[:-1]
+            size = tree_size(body)
+            copies = min(factor, budget // size) if size else factor
+            if not size:
+                # Corpo vuoto (anche dopo l'eliminazione delle variabili morte):
+                # ciclo e contatore spariscono, qualunque sia il conteggio
+                statements.pop()
+                full += 1
+            elif count <= budget and count * size <= budget:
+                # Il contatore, dichiarato subito prima del ciclo, non serve più
+                statements.pop()
+                statements.extend(repeated(body, count))
+                full += 1
+            elif copies >= 2:
+                statements.extend(unroll_partially(stmt, count, copies))
+                partial += 1
+            else:
+                statements.append(stmt)
+                continue
+            changed = True
+        if changed:
+            block.statements = statements
+    return full, partial
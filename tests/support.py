@@ -0,0 +1,43 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+from src.lexer import RegexLexer
+from src.parser import Parser
+from src.symbols import SymbolTable
+from src.desugaring import Desugarer
+from src.semantic_analysis import SemanticAnalyzer
+from src.effects import infer_effects
+import aether
+
+# Front end comune ai test dei passi di ottimizzazione
+
+def analyze(source, exprs=None):
+    # Programma come lo riceve la pipeline: desugaring, semantica ed effetti
+    symbols = SymbolTable()
+    program = Parser(list(RegexLexer(source, symbols).tokenize()), symbols=symbols, exprs=exprs).parse()
+    program = Desugarer(symbols, exprs).visit(program)
+    SemanticAnalyzer(symbols).visit(program)
+    infer_effects(program)
+    return program
+
+def analyze_body(body, declarations="extern func print(n);", exprs=None):
+    # Corpo di una funzione f(a, b, n) chiamata da main, dopo le dichiarazioni date
+    source = declarations + " func f(a, b, n) { " + body + " } func main() { return f(1, 2, 3); }"
+    return analyze(source, exprs)
+
+def function(program, name="f"):
+    return next(decl for decl in program.declarations if decl.name == name)
+
+def compile_quietly(source, **options):
+    with redirect_stdout(io.StringIO()):
+        return aether.compile_source(source, **options)
+
+class PipelineTestCase(unittest.TestCase):
+    # Compilazione completa: il middle end fuso con hash-consing deve produrre
+    # lo stesso IR; l'output della compilazione resta in self.output
+    def compile(self, source, **options):
+        with redirect_stdout(io.StringIO()) as output:
+            llvm_ir = aether.compile_source(source, **options)
+            self.assertEqual(aether.compile_source(source, fused=True, hash_cons=True, **options), llvm_ir)
+        self.output = output.getvalue()
+        return llvm_ir
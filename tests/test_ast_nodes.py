@@ -0,0 +1,34 @@
+import sys
+import unittest
+from src.tokens import TokenType
+import src.ast_nodes as ast
+
+class TestASTNodes(unittest.TestCase):
+
+    @unittest.skipIf(sys.version_info < (3, 10), "dataclass(slots=True) richiede Python 3.10")
+    def test_nodi_senza_dict(self):
+        nodes = [ast.LiteralExpr(1), ast.VariableExpr("x", sym=0),
+                 ast.BinaryExpr(ast.LiteralExpr(1), TokenType.PLUS, ast.LiteralExpr(2)),
+                 ast.Block([]), ast.LazyBlock(lambda: [])]
+        for node in nodes:
+            self.assertFalse(hasattr(node, '__dict__'), type(node).__name__)
+
+    def test_annotazioni_escluse_dal_confronto(self):
+        self.assertEqual(ast.VariableExpr("x", sym=1), ast.VariableExpr("x", sym=2))
+
+    def test_walk_in_preordine(self):
+        tree = ast.BinaryExpr(ast.UnaryExpr(TokenType.MINUS, ast.LiteralExpr(1)), TokenType.PLUS,
+                              ast.CallExpr("f", [ast.VariableExpr("a"), ast.LiteralExpr(2)]))
+        kinds = [type(node).__name__ for node in ast.walk(tree)]
+        self.assertEqual(kinds, ["BinaryExpr", "UnaryExpr", "LiteralExpr", "CallExpr",
+                                 "VariableExpr", "LiteralExpr"])
+
+    def test_lazy_block_come_block(self):
+        lazy = ast.LazyBlock(lambda: [ast.ReturnStmt(ast.LiteralExpr(0))])
+        self.assertFalse(lazy.materialized)
+        self.assertEqual(lazy, ast.Block([ast.ReturnStmt(ast.LiteralExpr(0))]))
+        self.assertEqual(ast.Block([ast.ReturnStmt(ast.LiteralExpr(0))]), lazy)
+        self.assertTrue(lazy.materialized)
+
+if __name__ == '__main__':
+    unittest.main()
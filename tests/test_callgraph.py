@@ -0,0 +1,99 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+from src.lexer import RegexLexer
+from src.tokens import TokenStore
+from src.parser import Parser
+from src.callgraph import reachable_functions, prune_unreachable
+import src.ast_nodes as ast
+import aether
+
+class TestCallGraph(unittest.TestCase):
+    SOURCE = """
+        extern func print(n);
+        func add(a, b) { return a + b; }
+        func double(x) { return x * 2; }
+        func apply(v) { return v |> double; }
+        func helper(y) { return add(y, 1); }
+        func unused(z) { return unused(z - 1); }
+        func main() {
+            let f = (q) => helper(q);
+            print(apply(3));
+            return 0;
+        }
+    """
+
+    def parse(self, source, lazy=False):
+        store = TokenStore.from_tokens(RegexLexer(source).tokenize(), source)
+        parser = Parser(store, lazy=lazy)
+        return parser, parser.parse()
+
+    def test_raggiungibili_da_main(self):
+        _, program = self.parse(self.SOURCE)
+        reached = reachable_functions(program)
+        self.assertEqual(reached, {"main", "print", "apply", "double", "helper", "add"})
+
+    def test_radici_esportate(self):
+        _, program = self.parse(self.SOURCE)
+        self.assertIn("unused", reachable_functions(program, ["main", "unused"]))
+
+    def test_corpi_non_raggiunti_mai_analizzati(self):
+        parser, program = self.parse(self.SOURCE, lazy=True)
+        removed = prune_unreachable(program)
+
+        self.assertEqual(removed, ["unused"])
+        self.assertEqual(parser.bodies_parsed, 5)
+        names = [decl.name for decl in program.declarations]
+        self.assertEqual(names, ["print", "add", "double", "apply", "helper", "main"])
+        self.assertTrue(all(decl.body.materialized for decl in program.declarations
+                            if isinstance(decl, ast.FunctionDecl)))
+
+class TestEliminazioneFunzioni(unittest.TestCase):
+    # Dopo il desugaring: lambda sollevate e pipe diventati chiamate
+    SOURCE = """
+        extern func print(n);
+        func add(a, b) { return a + b; }
+        func double(x) { return x * 2; }
+        func unused(z) { return z |> (w) => w + 1; }
+        func exported(k) { return k |> double; }
+        func main() {
+            print(3 |> (q) => add(q, 1));
+            return 0;
+        }
+    """
+
+    def compile(self, source, **kwargs):
+        with redirect_stdout(io.StringIO()):
+            return aether.compile_source(source, **kwargs)
+
+    def defined(self, llvm_ir):
+        return {line.split('@"')[1].split('"')[0]
+                for line in llvm_ir.splitlines() if line.startswith("define")}
+
+    def test_funzioni_e_lambda_rimosse(self):
+        self.assertEqual(self.defined(self.compile(self.SOURCE)),
+                         {"add", "double", "unused", "exported", "main", "__lambda_0", "__lambda_1"})
+        # La lambda di 'unused' è sollevata per prima
+        self.assertEqual(self.defined(self.compile(self.SOURCE, prune=True)),
+                         {"add", "main", "__lambda_1"})
+        # Con l'inlining lambda e funzioni espanse non sono più raggiungibili
+        self.assertEqual(self.defined(self.compile(self.SOURCE, prune=True, opt_level=2)), {"main"})
+
+    def test_export(self):
+        pruned = self.compile(self.SOURCE, prune=True, exports=["exported"])
+        self.assertEqual(self.defined(pruned), {"add", "double", "exported", "main", "__lambda_1"})
+        self.assertEqual(self.defined(self.compile(self.SOURCE, prune=True, exports=["exported"], opt_level=2)),
+                         {"exported", "main"})
+        self.assertIn('declare i64 @"print"', pruned)
+
+    def test_stesso_risultato_con_middle_end_fuso(self):
+        self.assertEqual(self.compile(self.SOURCE, prune=True, fused=True),
+                         self.compile(self.SOURCE, prune=True))
+
+    def test_errori_nelle_funzioni_rimosse(self):
+        # La semantica precede l'eliminazione: gli errori restano segnalati
+        source = "func unused() { return y; } func main() { return 0; }"
+        self.assertIsNone(self.compile(source, prune=True))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -108,5 +108,29 @@ class TestLLVMCodeGen(unittest.TestCase):
         # loop back
         self.assertIRContains(ir_code, 'br label %"while_cond"')
 
+    def test_ciclo_contato(self):
+        # repeat(n) { let y = 1; } con il limite già calcolato
+        counter = ast.VarDecl("i", ast.LiteralExpr(0))
+        cond = ast.BinaryExpr(ast.VariableExpr("i"), TokenType.LT, ast.VariableExpr("n"))
+        increment = ast.AssignExpr("i", ast.BinaryExpr(ast.VariableExpr("i"), TokenType.PLUS, ast.LiteralExpr(1)))
+        body = ast.Block([ast.VarDecl("y", ast.LiteralExpr(1)), ast.ExprStmt(increment)])
+        loop = ast.WhileStmt(cond, body)
+        loop.counted = True
+        func = ast.FunctionDecl("count_test", ["n"], ast.Block([counter, loop, loop]))
+        program = ast.Program([func])
+
+        ir_code = self.codegen.generate_code(program)
+
+        # Test in fondo al corpo, senza blocco di condizione separato
+        self.assertNotIn("while_cond", ir_code)
+        self.assertIRContains(ir_code, 'label %"repeat_body", label %"repeat_after", !llvm.loop !3')
+        self.assertIRContains(ir_code, '!3 = !{ !3, !0, !1, !2 }')
+        # Ogni ciclo ha il proprio identificatore
+        self.assertIRContains(ir_code, '!4 = !{ !4, !0, !1, !2 }')
+        self.assertIRContains(ir_code, '!{ !"llvm.loop.unroll.enable" }')
+        # Le alloca dei 'let' nel corpo stanno nel blocco d'ingresso
+        entry = ir_code.split("entry:")[1].split("repeat_body:")[0]
+        self.assertIn('%"y" = alloca i64', entry)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,115 @@
+import unittest
+from src.hashcons import HashConsFactory
+from src.constprop import ConstantPropagator, remove_dead_variables, merge_overwritten_declarations
+from src.pass_manager import PassManager, EffectsPass, FoldPass, ConstPropPass
+import src.ast_nodes as ast
+from support import analyze_body, function, compile_quietly, PipelineTestCase
+
+def printed(program):
+    # Argomenti delle chiamate a print, nell'ordine del sorgente
+    return [node.args[0] for node in ast.walk(function(program)) if isinstance(node, ast.CallExpr)]
+
+class TestPropagazione(unittest.TestCase):
+    def test_costanti_in_sequenza(self):
+        program = analyze_body("let x = 10; let y = x * 2; print(y); return y;")
+        ConstantPropagator().visit(function(program))
+        # y vale x * 2 con x noto: il folding successivo ne calcola il valore
+        value = function(program).body.statements[1].initializer
+        self.assertEqual(value, ast.BinaryExpr(ast.LiteralExpr(10), value.operator, ast.LiteralExpr(2)))
+
+    def test_copie(self):
+        program = analyze_body("let b = a; let c = b; print(c); a = 3; print(c); return c;")
+        ConstantPropagator().visit(function(program))
+        first, second = printed(program)
+        self.assertEqual(first, ast.VariableExpr("a"))
+        self.assertEqual(first.slot, 0)
+        # Dopo l'assegnamento di a la copia non vale più
+        self.assertEqual(second, ast.VariableExpr("c"))
+
+    def test_if(self):
+        program = analyze_body("let x = 1; let y = 2; if (a) { x = 3; y = 2; } else { y = 2; } print(x); print(y); return 0;")
+        ConstantPropagator().visit(function(program))
+        # Sopravvivono solo i fatti veri in entrambi i rami
+        self.assertEqual(printed(program), [ast.VariableExpr("x"), ast.LiteralExpr(2)])
+
+    def test_while(self):
+        program = analyze_body("let i = 0; let k = 5; while (i < k) { print(i); i = i + 1; } print(i); return k;")
+        ConstantPropagator().visit(function(program))
+        loop = function(program).body.statements[2]
+        # k non è assegnato nel ciclo, i sì: anche dopo il ciclo resta ignoto
+        self.assertEqual(loop.condition.right, ast.LiteralExpr(5))
+        self.assertEqual(loop.condition.left, ast.VariableExpr("i"))
+        self.assertEqual(printed(program), [ast.VariableExpr("i"), ast.VariableExpr("i")])
+        self.assertEqual(function(program).body.statements[-1].value, ast.LiteralExpr(5))
+
+    def test_assegnamento_in_espressione(self):
+        program = analyze_body("let x = 1; print((x = 4) + x); return x;")
+        ConstantPropagator().visit(function(program))
+        self.assertEqual(printed(program)[0].right, ast.LiteralExpr(4))
+
+    def test_espressioni_condivise(self):
+        # Con l'hash-consing le due 'x + 1' sono lo stesso nodo: va ricostruito
+        exprs = HashConsFactory()
+        program = analyze_body("let x = 1; print(x + 1); x = a; print(x + 1); return 0;", exprs=exprs)
+        first, second = printed(program)
+        self.assertIs(first, second)
+        ConstantPropagator(exprs).visit(function(program))
+        first, second = printed(program)
+        self.assertEqual(first.left, ast.LiteralExpr(1))
+        self.assertEqual(second.left, ast.VariableExpr("a"))
+
+    def test_variabili_morte(self):
+        program = analyze_body("let x = 1; let y = print(2); let z = 3; z = 4; print(x); return 0;")
+        self.assertEqual(remove_dead_variables(function(program)), 2)
+        # y resta per la chiamata, x perché letta
+        names = [stmt.name for stmt in function(program).body.statements if isinstance(stmt, ast.VarDecl)]
+        self.assertEqual(names, ["x", "y"])
+
+    def test_assegnamento_annidato_mantiene_la_variabile(self):
+        program = analyze_body("let z = 3; print(z = 4); return 0;")
+        self.assertEqual(remove_dead_variables(function(program)), 0)
+
+    def test_dichiarazione_sovrascritta(self):
+        program = analyze_body("let x = 0; x = a + 1; let y = 0; y = y + a; print(x + y); return 0;")
+        # y = y + a legge il valore iniziale: resta separato
+        self.assertEqual(merge_overwritten_declarations(function(program)), 1)
+        first = function(program).body.statements[0]
+        self.assertEqual(first.name, "x")
+        self.assertIsInstance(first.initializer, ast.BinaryExpr)
+        self.assertEqual(len(function(program).body.statements), 5)
+
+    def test_dichiarazione_sovrascritta_con_assegnamento_annidato(self):
+        program = analyze_body("let x = 0; x = (x = a); print(x); return 0;")
+        self.assertEqual(merge_overwritten_declarations(function(program)), 0)
+
+class TestPipeline(PipelineTestCase):
+    SOURCE = """
+        extern func print(n);
+        func main() {
+            let x = 10;
+            let y = x * 2;
+            if (y > 5) { print(y); } else { print(0); }
+            return y;
+        }
+    """
+
+    def test_folding_ed_eliminazione_dei_rami(self):
+        program = analyze_body("let x = 10; let y = x * 2; if (y > 5) { print(y); } else { print(0); } return y;")
+        stats = PassManager([EffectsPass(), FoldPass(), ConstPropPass()]).run(program)
+        statements = function(program).body.statements
+        self.assertEqual(len(statements), 2)
+        self.assertEqual(statements[0].expr.args, [ast.LiteralExpr(20)])
+        self.assertEqual(statements[1].value, ast.LiteralExpr(20))
+        self.assertEqual(stats.counters["constprop"]["variabili eliminate"], 2)
+
+    def test_load_store(self):
+        # A -O0 il middle end fuso esegue comunque il folding
+        unoptimized = compile_quietly(self.SOURCE, opt_level=0)
+        optimized = self.compile(self.SOURCE)
+        self.assertGreater(unoptimized.count("store"), 0)
+        self.assertEqual(optimized.count(" load "), 0)
+        self.assertEqual(optimized.count("store"), 0)
+        self.assertIn('call i64 @"print"(i64 20)', optimized)
+
+if __name__ == '__main__':
+    unittest.main()
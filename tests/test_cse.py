@@ -0,0 +1,122 @@
+import unittest
+from src.hashcons import HashConsFactory
+from src.tokens import TokenType
+from src.cse import ValueNumbering
+import src.ast_nodes as ast
+from support import analyze_body, function, PipelineTestCase
+
+HELPERS = """
+    extern func print(n);
+    func sq(x) { return x * x; }
+"""
+
+def analyze(body, exprs=None):
+    return analyze_body(body, HELPERS, exprs)
+
+def temporaries(decl):
+    return [node for node in ast.walk(decl.body) if isinstance(node, ast.VarDecl) and node.name.startswith("__cse")]
+
+def a_plus_b():
+    return ast.BinaryExpr(ast.VariableExpr("a"), TokenType.PLUS, ast.VariableExpr("b"))
+
+class TestCse(unittest.TestCase):
+    def test_stessa_espressione(self):
+        program = analyze("let x = (a + b) * (a + b); return x + (a + b);")
+        decl = function(program)
+        frame_size = decl.frame_size
+        self.assertEqual(ValueNumbering().run(decl), 2)
+        # Temporanea prima dell'istruzione, in un nuovo slot del frame
+        first, declaration, ret = decl.body.statements
+        self.assertIs(first, temporaries(decl)[0])
+        self.assertEqual(first.initializer, a_plus_b())
+        self.assertEqual(first.slot, frame_size)
+        product = declaration.initializer
+        self.assertEqual([product.left.name, product.right.name], [first.name, first.name])
+        self.assertEqual(ret.value.right.slot, frame_size)
+
+    def test_assegnamento_intermedio(self):
+        program = analyze("let x = a * b; a = a + 1; let y = a * b; b = (a * b) + (b = 1) + a * b; return x + y + b;")
+        decl = function(program)
+        # Dopo ogni assegnamento di a o b il valore di a * b cambia
+        self.assertEqual(ValueNumbering().run(decl), 1)
+        self.assertEqual(len(temporaries(decl)), 1)
+        self.assertIs(decl.body.statements[2], temporaries(decl)[0])
+
+    def test_chiamate(self):
+        program = analyze("let x = a * b + sq(a); print(a); let y = a * b + print(a) + print(a); return sq(a) + x + y;")
+        decl = function(program)
+        # Le chiamate impure non cambiano le variabili locali ma non sono riutilizzate
+        self.assertEqual(ValueNumbering().run(decl), 2)
+        first, second = temporaries(decl)
+        self.assertEqual(first.initializer.operator, TokenType.MUL)
+        self.assertEqual(second.initializer.callee, "sq")
+        callees = [node.callee for node in ast.walk(decl.body) if isinstance(node, ast.CallExpr)]
+        self.assertEqual(callees, ["sq", "print", "print", "print"])
+
+    def test_effetti_prima_della_prima_occorrenza(self):
+        program = analyze("let x = print(1) + a * b; let y = a * b; return x + y;")
+        decl = function(program)
+        # a * b non può essere calcolata prima della print
+        self.assertEqual(ValueNumbering().run(decl), 0)
+
+    def test_espressioni_annidate(self):
+        program = analyze("let x = (a + b) * n; let y = (a + b) * n; return x + y;")
+        decl = function(program)
+        self.assertEqual(ValueNumbering().run(decl), 1)
+        # La seconda a + b sparisce con il prodotto che la contiene
+        self.assertEqual(len(temporaries(decl)), 1)
+        self.assertEqual(sum(1 for node in ast.walk(decl.body) if node == a_plus_b()), 1)
+
+    def test_regioni_lineari(self):
+        program = analyze("""
+            let x = a * b;
+            if (n) { x = a * b + a * b; }
+            while (n > 0) { n = n - a * b; }
+            return x + a * b;
+        """)
+        decl = function(program)
+        # Le regioni finiscono ai rami e ai cicli
+        self.assertEqual(ValueNumbering().run(decl), 1)
+        then_branch = decl.body.statements[1].then_branch
+        self.assertIs(then_branch.statements[0], temporaries(decl)[0])
+
+    def test_espressioni_condivise(self):
+        exprs = HashConsFactory()
+        program = analyze("let x = (a + b) * (a + b); a = 1; let y = (a + b) * (a + b); return x + y;", exprs)
+        decl = function(program)
+        shared = decl.body.statements[0].initializer.left
+        self.assertIs(decl.body.statements[2].initializer.left, shared)
+        # Stesso nodo, valori diversi prima e dopo l'assegnamento di a
+        self.assertEqual(ValueNumbering(exprs).run(decl), 2)
+        first, second = temporaries(decl)
+        self.assertEqual(first.initializer, second.initializer)
+        self.assertNotEqual(first.name, second.name)
+
+class TestPipeline(PipelineTestCase):
+    SOURCE = """
+        extern func print(n);
+        func main() {
+            let a = print(3);
+            let b = print(4);
+            let s = 0;
+            let i = 0;
+            while (i < 1000) {
+                let k = (a * i + b) * (a * i + b);
+                s = s + k - (a * i + b) * 2;
+                i = i + 1;
+            }
+            return s;
+        }
+    """
+
+    def test_ciclo_con_sottoespressioni_comuni(self):
+        eliminated = self.compile(self.SOURCE, opt_level=2, stats=True)
+        self.assertIn("espressioni comuni eliminate", self.output)
+        kept = self.compile(self.SOURCE, opt_level=2, cse=False)
+        loop = lambda llvm_ir: llvm_ir.split("while_cond:")[1].split("while_after:")[0]
+        self.assertEqual(loop(kept).count(" mul "), 5)
+        # a * i + b calcolata una volta sola
+        self.assertEqual(loop(eliminated).count(" mul "), 3)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+from src.tokens import TokenType
+from src.optimizer import Optimizer
+from src.ctfe import CompileTimeEvaluator, evaluate_binary, evaluate_unary, wrap, I64_MIN
+import src.ast_nodes as ast
+from support import analyze, PipelineTestCase
+
+I64_MAX = (1 << 63) - 1
+
+SOURCE = """
+    extern func print(n);
+    func add(a, b) { return a + b; }
+    func fib(n) { if (n < 2) { return n; } return fib(n - 1) + fib(n - 2); }
+    func sum(n) { let s = 0; let i = 0; while (i < n) { i = i + 1; s = s + i; } return s; }
+    func forever(n) { while (1) { n = n + 1; } return n; }
+    func deep(n) { return deep(n + 1); }
+    func noisy(n) { print(n); return n; }
+    func main() { return add(2, 3) * fib(10) + sum(3) + forever(0) + deep(0) + noisy(1); }
+"""
+
+def call(program, name, *args):
+    node = ast.CallExpr(name, [ast.LiteralExpr(arg) for arg in args])
+    node.decl = next(decl for decl in program.declarations if decl.name == name)
+    return node
+
+class TestAritmetica(unittest.TestCase):
+    def test_wrap_around(self):
+        self.assertEqual(wrap(I64_MAX + 1), I64_MIN)
+        self.assertEqual(evaluate_binary(TokenType.MUL, I64_MAX, 2), -2)
+        self.assertEqual(evaluate_unary(TokenType.MINUS, I64_MIN), I64_MIN)
+
+    def test_divisione(self):
+        # Troncata verso zero come sdiv; I64_MIN / -1 non è definita
+        self.assertEqual(evaluate_binary(TokenType.DIV, -7, 2), -3)
+        self.assertEqual(evaluate_binary(TokenType.DIV, 7, -2), -3)
+        self.assertEqual(evaluate_binary(TokenType.DIV, I64_MAX, 3), I64_MAX // 3)
+        self.assertIsNone(evaluate_binary(TokenType.DIV, I64_MIN, -1))
+        with self.assertRaises(ZeroDivisionError):
+            evaluate_binary(TokenType.DIV, 1, 0)
+
+    def test_operatori_logici_bit_a_bit(self):
+        self.assertEqual(evaluate_binary(TokenType.AND, 2, 1), 0)
+        self.assertEqual(evaluate_binary(TokenType.OR, 2, 1), 3)
+
+class TestValutazione(unittest.TestCase):
+    def setUp(self):
+        self.program = analyze(SOURCE)
+        self.evaluator = CompileTimeEvaluator()
+
+    def test_funzioni_pure(self):
+        self.assertEqual(self.evaluator.evaluate(call(self.program, "add", 2, 3)), 5)
+        self.assertEqual(self.evaluator.evaluate(call(self.program, "sum", 100)), 5050)
+
+    def test_ricorsione_memorizzata(self):
+        self.assertEqual(self.evaluator.evaluate(call(self.program, "fib", 60)), 1548008755920)
+        # Un risultato per ciascun argomento distinto
+        self.assertEqual(len(self.evaluator.cache), 61)
+
+    def test_budget(self):
+        self.assertIsNone(self.evaluator.evaluate(call(self.program, "forever", 0)))
+        self.assertIn(("forever", (0,)), self.evaluator.cache)
+        self.assertIsNone(self.evaluator.evaluate(call(self.program, "deep", 0)))
+        self.assertIsNone(CompileTimeEvaluator(budget=100).evaluate(call(self.program, "sum", 100)))
+
+    def test_funzioni_con_effetti(self):
+        self.assertIsNone(self.evaluator.evaluate(call(self.program, "noisy", 1)))
+        argument = ast.VariableExpr("x")
+        node = call(self.program, "add", 1, 2)
+        node.args[0] = argument
+        self.assertIsNone(self.evaluator.evaluate(node))
+
+    def test_espressione_costante(self):
+        main = self.program.declarations[-1]
+        Optimizer(evaluator=self.evaluator).visit(main)
+        # add(2, 3) * fib(10) + sum(3) -> 281; le altre chiamate restano
+        value = main.body.statements[0].value
+        callees = [node.callee for node in ast.walk(value) if isinstance(node, ast.CallExpr)]
+        self.assertEqual(callees, ["forever", "deep", "noisy"])
+        self.assertIn(ast.LiteralExpr(281), list(ast.walk(value)))
+
+class TestPipeline(PipelineTestCase):
+    SOURCE = """
+        extern func print(n);
+        func fib(n) { if (n < 2) { return n; } return fib(n - 1) + fib(n - 2); }
+        func main() { print(fib(20)); return fib(30) - fib(29) * 2; }
+    """
+
+    def test_chiamate_valutate(self):
+        evaluated = self.compile(self.SOURCE, opt_level=2)
+        not_evaluated = self.compile(self.SOURCE, opt_level=2, ctfe_budget=0)
+        main = lambda llvm_ir: llvm_ir.split('define i64 @"main"')[1]
+        self.assertIn('call i64 @"fib"', main(not_evaluated))
+        self.assertNotIn('call i64 @"fib"', main(evaluated))
+        self.assertIn('call i64 @"print"(i64 6765)', evaluated)
+        self.assertIn("ret i64 -196418", evaluated)
+
+if __name__ == '__main__':
+    unittest.main()
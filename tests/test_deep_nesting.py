@@ -0,0 +1,61 @@
+import unittest
+from src.lexer import RegexLexer
+from src.parser import Parser
+from src.desugaring import Desugarer
+from src.semantic_analysis import SemanticAnalyzer
+from src.optimizer import Optimizer
+from src.codegen import LLVMCodeGen
+import src.ast_nodes as ast
+
+# Profondità ben oltre il limite di ricorsione di default (1000)
+DEPTH = 20000
+
+def parse(source):
+    return Parser(list(RegexLexer(source).tokenize())).parse()
+
+def compile_program(source):
+    program = Desugarer().visit(parse(source))
+    SemanticAnalyzer().visit(program)
+    program = Optimizer().visit(program)
+    return LLVMCodeGen().generate_code(program)
+
+class TestDeepNesting(unittest.TestCase):
+
+    def test_catena_binaria(self):
+        source = "func main() { let a = 1; return " + " + ".join(["a"] * DEPTH) + "; }"
+        llvm_ir = compile_program(source)
+        self.assertEqual(llvm_ir.count(" = add i64"), DEPTH - 1)
+
+    def test_catena_unaria(self):
+        source = "func main() { let a = 1; return " + "-" * DEPTH + "a; }"
+        llvm_ir = compile_program(source)
+        self.assertEqual(llvm_ir.count(" = sub i64 0"), DEPTH)
+
+    def test_catena_unaria_costante(self):
+        # Il constant folding attraversa tutta la catena
+        source = "func main() { return " + "-" * DEPTH + "7; }"
+        program = Optimizer().visit(Desugarer().visit(parse(source)))
+        self.assertEqual(program.declarations[0].body.statements[0].value, ast.LiteralExpr(7))
+
+    def test_catena_pipe(self):
+        source = "func main() { return 1" + " |> f" * DEPTH + "; }"
+        expr = parse(source).declarations[0].body.statements[0].value
+
+        # Associativa a destra come nella grammatica ricorsiva
+        depth = 0
+        while isinstance(expr, ast.PipeExpr):
+            self.assertIsInstance(expr.left, (ast.LiteralExpr, ast.VariableExpr))
+            expr = expr.right
+            depth += 1
+        self.assertEqual(depth, DEPTH)
+
+    def test_chiamata_diretta_del_visitor(self):
+        # I metodi iterativi restano invocabili direttamente
+        node = ast.UnaryExpr(None, ast.LiteralExpr(1))
+        for _ in range(DEPTH):
+            node = ast.BinaryExpr(node, None, ast.LiteralExpr(1))
+        visited = SemanticAnalyzer().visit_BinaryExpr(node)
+        self.assertIsNone(visited)
+
+if __name__ == '__main__':
+    unittest.main()
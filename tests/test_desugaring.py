@@ -49,6 +49,27 @@ class TestDesugaring(unittest.TestCase):
         while_stmt = stmts[1]
         self.assertEqual(while_stmt.condition.operator, TokenType.LT)
 
+    def test_repeat_conteggio_valutato_una_volta(self):
+        # repeat(f(n)) { body } -> contatore, limite nascosto, while contato
+        repeat_node = ast.RepeatStmt(
+            count=ast.CallExpr("f", [ast.VariableExpr("n")]),
+            body=ast.Block([])
+        )
+
+        counter, limit, while_stmt = self.desugarer.visit_RepeatStmt(repeat_node)
+
+        self.assertEqual(limit.name, "__repeat_limit_1")
+        self.assertIsInstance(limit.initializer, ast.CallExpr)
+        self.assertEqual(while_stmt.condition.right.name, limit.name)
+        self.assertTrue(while_stmt.counted)
+
+        # Un conteggio costante resta nella condizione
+        repeat_node = ast.RepeatStmt(
+            count=ast.BinaryExpr(ast.LiteralExpr(2), TokenType.MUL, ast.LiteralExpr(3)),
+            body=ast.Block([])
+        )
+        self.assertEqual(len(self.desugarer.visit_RepeatStmt(repeat_node)), 2)
+
     def test_pipe_invalid_right_operand(self):
         # x |> 5 -> Errore, 5 non è chiamabile
         pipe_expr = ast.PipeExpr(
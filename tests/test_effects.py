@@ -0,0 +1,120 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+import llvmlite.binding as llvm
+from src.lexer import RegexLexer
+from src.tokens import TokenStore
+from src.parser import Parser
+from src.parallel_parser import split_declarations
+from src.symbols import SymbolTable
+from src.desugaring import Desugarer
+from src.semantic_analysis import SemanticAnalyzer
+from src.optimizer import Optimizer
+from src.effects import infer_effects
+from src.serialization import dumps, loads
+from src.ast_nodes import Effect
+import src.ast_nodes as ast
+import aether
+
+SOURCE = """
+    extern pure func isqrt(n);
+    extern readonly func peek(n);
+    extern func print(n);
+    func sq(x) { return x * x; }
+    func rd(x) { return peek(x) + sq(x); }
+    func out(x) { return print(x) |> sq; }
+    func loop(n) { while (n > 0) { n = n - 1; } return n; }
+    func even(n) { if (n < 1) { return 1; } return odd(n - 1); }
+    func odd(n) { if (n < 1) { return 0; } return even(n - 1); }
+    func lam(n) { return n |> (q) => isqrt(q); }
+    func main() {
+        sq(3);
+        rd(2);
+        isqrt(4);
+        5 |> sq;
+        lam(1);
+        sq(print(1));
+        loop(5);
+        even(3);
+        out(1);
+        return isqrt(16);
+    }
+"""
+
+def parse(source, symbols=None):
+    return Parser(list(RegexLexer(source, symbols).tokenize()), symbols=symbols).parse()
+
+def compile(source, **kwargs):
+    with redirect_stdout(io.StringIO()):
+        return aether.compile_source(source, **kwargs)
+
+class TestEffetti(unittest.TestCase):
+    def test_sintassi_extern(self):
+        program = parse(SOURCE)
+        effects = [decl.effect for decl in program.declarations[:3]]
+        self.assertEqual(effects, [Effect.PURE, Effect.READONLY, Effect.IMPURE])
+        # 'pure' e 'readonly' restano identificatori validi
+        source = "func main() { let pure = 1; let readonly = pure; return readonly; }"
+        self.assertEqual(parse(source).declarations[0].body.statements[0].name, "pure")
+
+    def test_inferenza(self):
+        symbols = SymbolTable()
+        program = Desugarer(symbols).visit(parse(SOURCE, symbols))
+        infer_effects(program)
+        decls = {decl.name: decl for decl in program.declarations}
+        self.assertEqual(decls["sq"].effect, Effect.PURE)
+        self.assertEqual(decls["rd"].effect, Effect.READONLY)
+        self.assertEqual(decls["out"].effect, Effect.IMPURE)
+        self.assertEqual(decls["lam"].effect, Effect.PURE)
+        self.assertTrue(decls["sq"].willreturn)
+        self.assertTrue(decls["lam"].willreturn)
+        # Cicli e ricorsione (anche mutua) non garantiscono la terminazione
+        self.assertEqual(decls["loop"].effect, Effect.PURE)
+        self.assertFalse(decls["loop"].willreturn)
+        self.assertFalse(decls["even"].willreturn)
+        self.assertFalse(decls["odd"].willreturn)
+
+    def test_chiamate_inutilizzate_rimosse(self):
+        symbols = SymbolTable()
+        program = Desugarer(symbols).visit(parse(SOURCE, symbols))
+        SemanticAnalyzer(symbols).visit(program)
+        infer_effects(program)
+        program = Optimizer().visit(program)
+        main = next(decl for decl in program.declarations if decl.name == "main")
+        kept = [stmt.expr.callee for stmt in main.body.statements if isinstance(stmt, ast.ExprStmt)]
+        self.assertEqual(kept, ["sq", "loop", "even", "out"])
+
+    def test_senza_annotazioni_nessuna_rimozione(self):
+        program = Optimizer().visit(Desugarer().visit(parse(SOURCE)))
+        main = next(decl for decl in program.declarations if decl.name == "main")
+        self.assertEqual(len(main.body.statements), 10)
+
+    def test_attributi_llvm(self):
+        llvm_ir = compile(SOURCE)
+        lines = {line.split('@"')[1].split('"')[0]: line
+                 for line in llvm_ir.splitlines() if line.startswith(("define", "declare"))}
+        self.assertIn("willreturn nounwind readnone", lines["isqrt"])
+        self.assertIn("nounwind readonly", lines["peek"])
+        self.assertTrue(lines["print"].endswith(')'))
+        self.assertIn("willreturn nounwind readnone", lines["sq"])
+        self.assertIn("readonly", lines["rd"])
+        self.assertNotIn("willreturn", lines["loop"])
+        self.assertNotIn("readnone", lines["out"])
+        llvm.parse_assembly(llvm_ir).verify()
+
+    def test_middle_end_fuso(self):
+        self.assertEqual(compile(SOURCE, fused=True), compile(SOURCE))
+
+    def test_parsing_parallelo(self):
+        store = TokenStore.from_tokens(RegexLexer(SOURCE).tokenize(), SOURCE)
+        ranges = split_declarations(store, 100)
+        self.assertEqual(len(ranges), 11)
+        self.assertEqual(compile(SOURCE, jobs=2), compile(SOURCE))
+
+    def test_serializzazione(self):
+        program = parse(SOURCE)
+        self.assertEqual([decl.effect for decl in loads(dumps(program)).declarations[:3]],
+                         [Effect.PURE, Effect.READONLY, Effect.IMPURE])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,111 @@
+import unittest
+from src.lexer import RegexLexer
+from src.parser import Parser
+from src.symbols import SymbolTable
+from src.hashcons import HashConsFactory
+from src.desugaring import Desugarer
+from src.semantic_analysis import SemanticAnalyzer, SemanticError
+from src.optimizer import Optimizer
+from src.effects import infer_effects
+from src.middle_end import FusedMiddleEnd
+from src.codegen import LLVMCodeGen
+from src.tokens import TokenType
+import src.ast_nodes as ast
+
+SOURCE = """
+    extern func print(n);
+    func add(a, b) { return a * b + a * b; }
+    func main() {
+        let x = (1 + 2) * 3;
+        let y = (1 + 2) * x;
+        repeat(2) { x = x |> add(1 + 2); }
+        repeat(x * 0 + 2) { print(-(-x)); }
+        let f = y |> (q) => q * (1 + 2);
+        if (x > 1) { print(x * 1); } else { print(0); }
+        return y - (1 + 2);
+    }
+"""
+
+def parse(source, symbols, exprs=None):
+    return Parser(list(RegexLexer(source, symbols).tokenize()), symbols=symbols, exprs=exprs).parse()
+
+def sequential_ir(source, exprs=None):
+    symbols = SymbolTable()
+    program = Desugarer(symbols, exprs).visit(parse(source, symbols, exprs))
+    SemanticAnalyzer(symbols).visit(program)
+    infer_effects(program)
+    program = Optimizer(exprs).visit(program)
+    return str(LLVMCodeGen(symbols).generate_code(program))
+
+def fused_ir(source, exprs=None):
+    symbols = SymbolTable()
+    program = FusedMiddleEnd(symbols, exprs).visit(parse(source, symbols, exprs))
+    return str(LLVMCodeGen(symbols).generate_code(program))
+
+class TestHashConsing(unittest.TestCase):
+    def test_sottoespressioni_condivise(self):
+        factory = HashConsFactory()
+        program = parse(SOURCE, SymbolTable(), factory)
+        body = program.declarations[1].body.statements[0].value
+        self.assertIs(body.left, body.right)
+        main = program.declarations[2].body.statements
+        self.assertIs(main[0].initializer.left, main[1].initializer.left)
+        self.assertGreater(factory.hits, 0)
+
+    def test_variabili_condivise_per_funzione(self):
+        # Lo slot annotato dipende dalla funzione: 'x' non è condivisa tra corpi diversi
+        source = "func f(x) { return x + x; } func g(a) { let x = a; return x + x; }"
+        symbols, factory = SymbolTable(), HashConsFactory()
+        program = parse(source, symbols, factory)
+        f_sum = program.declarations[0].body.statements[0].value
+        g_sum = program.declarations[1].body.statements[1].value
+        self.assertIs(f_sum.left, f_sum.right)
+        self.assertIsNot(f_sum.left, g_sum.left)
+        SemanticAnalyzer(symbols).visit(program)
+        self.assertEqual((f_sum.left.slot, g_sum.left.slot), (0, 1))
+
+    def test_operandi_non_puri_non_condivisi(self):
+        factory = HashConsFactory()
+        call = ast.CallExpr('f', [])
+        one = factory.literal(1)
+        first = factory.binary(call, TokenType.PLUS, one)
+        self.assertIsNot(first, factory.binary(call, TokenType.PLUS, one))
+        self.assertFalse(factory.is_shared(first))
+
+    def test_uguaglianza_senza_visita(self):
+        factory = HashConsFactory()
+        node = factory.literal(1)
+        for _ in range(20000):
+            node = factory.unary(TokenType.MINUS, node)
+        # Il confronto tra nodi condivisi non ricorre nei figli
+        self.assertEqual(node, node)
+        self.assertIs(node, factory.unary(TokenType.MINUS, node.operand))
+
+    def test_stesso_ir(self):
+        expected = sequential_ir(SOURCE)
+        self.assertEqual(sequential_ir(SOURCE, HashConsFactory()), expected)
+        self.assertEqual(fused_ir(SOURCE, HashConsFactory()), expected)
+
+    def test_nodi_condivisi_non_modificati(self):
+        factory = HashConsFactory()
+        symbols = SymbolTable()
+        program = parse(SOURCE, symbols, factory)
+        add = program.declarations[1].body.statements[0].value
+        Optimizer(factory).visit(Desugarer(symbols, factory).visit(program))
+        shared = factory.binary(factory.literal(1), TokenType.PLUS, factory.literal(2))
+        self.assertEqual(shared, ast.BinaryExpr(ast.LiteralExpr(1), TokenType.PLUS, ast.LiteralExpr(2)))
+        self.assertIs(add.left, add.right)
+
+    def test_errori_semantici(self):
+        # 'h' a destra del pipe è la stessa istanza di 'h' usata come variabile
+        source = "func h(a) { return a; } func main() { let y = 1 |> h; return h; }"
+        with self.assertRaises(SemanticError) as expected:
+            symbols = SymbolTable()
+            SemanticAnalyzer(symbols).visit(Desugarer(symbols).visit(parse(source, symbols)))
+        with self.assertRaises(SemanticError) as actual:
+            symbols, factory = SymbolTable(), HashConsFactory()
+            FusedMiddleEnd(symbols, factory).visit(parse(source, symbols, factory))
+        self.assertEqual(str(actual.exception), str(expected.exception))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+import llvmlite.binding as llvm
+from src.lexer import RegexLexer
+from src.parser import Parser
+from src.symbols import SymbolTable
+from src.desugaring import Desugarer
+from src.semantic_analysis import SemanticAnalyzer
+from src.optimizer import Optimizer
+from src.icf import fold_identical_functions
+import src.ast_nodes as ast
+import aether
+
+SOURCE = """
+    extern func print(n);
+    func twice(a) { return a * 2; }
+    func double(b) { return b * 2; }
+    func triple(c) { return c * 3; }
+    func fact(n) { if (n < 1) { return 1; } return n * fact(n - 1); }
+    func fact2(m) { if (m < 1) { return 1; } return m * fact2(m - 1); }
+    func use1(x) { let t = twice(x); return t + 1; }
+    func use2(y) { let u = double(y); return u + 1; }
+    func main() {
+        let a = 3 |> (q) => q * 2 + 1;
+        let b = 4 |> (r) => r * 2 + 1;
+        let c = 5 |> (s) => s * (1 + 1) + 1;
+        let d = 6 |> (v) => v * 3 + 1;
+        print(use1(a) + use2(b) + c + d + fact2(5) + fact(3) + triple(1));
+        return 0;
+    }
+"""
+
+def analyze(source):
+    symbols = SymbolTable()
+    program = Parser(list(RegexLexer(source, symbols).tokenize()), symbols=symbols).parse()
+    program = Desugarer(symbols).visit(program)
+    SemanticAnalyzer(symbols).visit(program)
+    return Optimizer().visit(program)
+
+def compile(source, **kwargs):
+    with redirect_stdout(io.StringIO()):
+        return aether.compile_source(source, **kwargs)
+
+class TestFoldingFunzioniIdentiche(unittest.TestCase):
+    def test_funzioni_unite(self):
+        program = analyze(SOURCE)
+        folded = fold_identical_functions(program)
+        # use2 diventa identica a use1 solo dopo l'unione di double con twice;
+        # la terza lambda lo è dopo il folding di (1 + 1)
+        self.assertEqual(sorted(folded), ["__lambda_1", "__lambda_2", "double", "fact2", "use2"])
+        names = [decl.name for decl in program.declarations]
+        self.assertNotIn("__lambda_1", names)
+        self.assertIn("__lambda_3", names)
+
+    def test_inoltro_e_chiamate_reindirizzate(self):
+        program = analyze(SOURCE)
+        fold_identical_functions(program)
+        decls = {decl.name: decl for decl in program.declarations}
+        # Le funzioni del sorgente restano, come inoltro al rappresentante
+        call = decls["fact2"].body.statements[0].value
+        self.assertEqual(call.callee, "fact")
+        self.assertIs(call.decl, decls["fact"])
+        self.assertEqual([arg.slot for arg in call.args], [0])
+        callees = [node.callee for node in ast.walk(decls["main"]) if isinstance(node, ast.CallExpr)]
+        self.assertEqual(callees, ["__lambda_0", "__lambda_0", "__lambda_0", "__lambda_3",
+                                   "print", "use1", "use1", "fact", "fact", "triple"])
+
+    def test_nessuna_unione_se_diverse(self):
+        program = analyze("func f(a, b) { return a - b; } func g(a, b) { return b - a; }"
+                          "func h(a) { let x = 1; let y = 2; return x + a; }"
+                          "func k(a) { let x = 1; let y = 2; return y + a; }"
+                          "func main() { return f(1, 2) + g(1, 2) + h(1) + k(1); }")
+        self.assertEqual(fold_identical_functions(program), [])
+
+    def test_stesso_risultato(self):
+        llvm_ir = compile(SOURCE, icf=True)
+        # Restano le 8 funzioni del sorgente e 2 delle 4 lambda
+        self.assertEqual(compile(SOURCE).count("\ndefine "), 12)
+        self.assertEqual(llvm_ir.count("\ndefine "), 10)
+        llvm.parse_assembly(llvm_ir).verify()
+        self.assertEqual(compile(SOURCE, icf=True, fused=True), llvm_ir)
+        self.assertEqual(compile(SOURCE, icf=True, hash_cons=True), llvm_ir)
+
+if __name__ == '__main__':
+    unittest.main()
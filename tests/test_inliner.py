@@ -0,0 +1,101 @@
+import unittest
+from src.hashcons import HashConsFactory
+from src.callgraph import call_graph, strongly_connected, recursive_functions
+from src.inliner import Inliner, lower_returns, local_variable
+import src.ast_nodes as ast
+from support import analyze, function, PipelineTestCase
+
+def calls(decl):
+    return [node.callee for node in ast.walk(decl.body) if isinstance(node, ast.CallExpr)]
+
+SOURCE = """
+    extern func print(n);
+    func clamp(x) { if (x > 10) { return 10; } if (x < 0) { return 0; } return x; }
+    func twice(x) { return clamp(x) * 2; }
+    func fact(n) { if (n < 2) { return 1; } return n * fact(n - 1); }
+    func main() { let v = 7; print(twice(v) + (v |> (q) => q + 1)); return fact(v); }
+"""
+
+class TestInliner(unittest.TestCase):
+    def test_grafo_delle_chiamate(self):
+        program = analyze(SOURCE)
+        graph = call_graph(program)
+        components = strongly_connected(graph)
+        order = [name for component in components for name in component]
+        # Le funzioni chiamate precedono i chiamanti
+        self.assertLess(order.index("clamp"), order.index("twice"))
+        self.assertLess(order.index("twice"), order.index("main"))
+        self.assertEqual(recursive_functions(graph, components), {"fact"})
+
+    def test_espansione(self):
+        program = analyze(SOURCE)
+        main = function(program, "main")
+        frame_size = main.frame_size
+        self.assertEqual(Inliner().run(program), 3)
+        # twice contiene già clamp espansa; la ricorsiva fact resta una chiamata
+        self.assertEqual(calls(function(program, "twice")), [])
+        self.assertEqual(calls(main), ["print", "fact"])
+        self.assertGreater(main.frame_size, frame_size)
+        slots = [node.slot for node in ast.walk(main.body) if isinstance(node, ast.VarDecl)]
+        self.assertEqual(len(slots), len(set(slots)))
+
+    def test_return_multipli(self):
+        program = analyze(SOURCE)
+        result = local_variable("r", 0)
+        statements = lower_returns(function(program, "clamp").body.statements, result)
+        # if (x > 10) { r = 10; } else { if (x < 0) { r = 0; } else { r = x; } }
+        self.assertEqual(len(statements), 1)
+        inner = statements[0].else_branch.statements[0]
+        self.assertEqual(inner.else_branch.statements[0].expr, ast.AssignExpr("r", ast.VariableExpr("x")))
+        self.assertFalse(any(isinstance(node, ast.ReturnStmt) for stmt in statements for node in ast.walk(stmt)))
+
+    def test_return_in_ciclo_o_resto_da_duplicare(self):
+        program = analyze("""
+            func f(x) { while (x) { return 1; } return 0; }
+            func g(x) { if (x) { if (x > 1) { return 1; } } return 0; }
+            func main() { return f(1) + g(2); }
+        """)
+        result = local_variable("r", 0)
+        self.assertIsNone(lower_returns(function(program, "f").body.statements, result))
+        self.assertIsNone(lower_returns(function(program, "g").body.statements, result))
+        self.assertEqual(Inliner().run(program), 0)
+
+    def test_ordine_di_valutazione(self):
+        # id non può essere anticipata: prima viene valutata print, oppure una
+        # lettura di a che l'assegnamento negli argomenti cambierebbe
+        program = analyze("""
+            extern func print(n);
+            func id(x) { return x; }
+            func main() { let a = 1; let b = print(a) + id(2); let c = a + id(a = 5); return b + c; }
+        """)
+        self.assertEqual(Inliner().run(program), 0)
+        self.assertEqual(calls(function(program, "main")), ["print", "id", "id"])
+
+    def test_budget(self):
+        program = analyze(SOURCE)
+        self.assertEqual(Inliner(budget=3).run(program), 2)
+        # Lambda e twice, chiamate una volta, rientrano nel budget moltiplicato; clamp no
+        self.assertEqual(calls(function(program, "main")), ["clamp", "print", "fact"])
+
+    def test_espressioni_condivise(self):
+        exprs = HashConsFactory()
+        program = analyze("func sq(x) { return x * x; } func main() { let a = 2; return (a + 1) * sq(a + 1); }", exprs)
+        Inliner(exprs).run(program)
+        value = function(program, "main").body.statements[-1].value
+        self.assertIsInstance(value.right, ast.VariableExpr)
+        self.assertEqual(value.left, ast.BinaryExpr(ast.VariableExpr("a"), value.left.operator, ast.LiteralExpr(1)))
+
+class TestPipeline(PipelineTestCase):
+    def test_pipeline(self):
+        # Senza valutazione a compile time, che calcolerebbe anche fact(7)
+        inlined = self.compile(SOURCE, opt_level=2, ctfe_budget=0)
+        not_inlined = self.compile(SOURCE, opt_level=2, inline_budget=0, ctfe_budget=0)
+        self.assertIn('call i64 @"twice"', not_inlined)
+        self.assertNotIn('call i64 @"twice"', inlined)
+        self.assertNotIn('call i64 @"clamp"', inlined)
+        self.assertIn('call i64 @"fact"', inlined)
+        # clamp(7) * 2 + 8 ripiegato
+        self.assertIn('call i64 @"print"(i64 22)', inlined)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,10 @@
 import unittest
 from src.tokens import TokenType, Token
-from src.lexer import Lexer
+import os
+import random
+import tempfile
+from src.lexer import Lexer, RegexLexer, tokenize_file, relex
+from src.tokens import TokenStore
 
 class TestLexer(unittest.TestCase):
 
@@ -101,5 +105,117 @@ class TestLexer(unittest.TestCase):
         with self.assertRaises(Exception):
             lexer.get_next_token()
 
+
+MENU_PATH = os.path.join(os.path.dirname(__file__), 'test_menu', 'test_menu.ae')
+
+def token_pairs(lexer):
+    return [(tok.type, tok.value) for tok in lexer.tokenize()]
+
+class TestRegexLexer(unittest.TestCase):
+
+    def assertSameStream(self, text):
+        self.assertEqual(token_pairs(RegexLexer(text)), token_pairs(Lexer(text)))
+
+    def test_stesso_flusso_operatori(self):
+        self.assertSameStream("= == => ! != < <= > >= && || |> + - * / ( ) { } , ;")
+        self.assertSameStream("a==b=>c!=d<=e>=f|>g")
+
+    def test_stesso_flusso_letterali_e_keyword(self):
+        self.assertSameStream("let func extern return if else while repeat myVar x_1 1var 007")
+        self.assertSameStream("  \n\t ")
+        self.assertSameStream("")
+
+    def test_stesso_flusso_programma(self):
+        with open(MENU_PATH) as f:
+            self.assertSameStream(f.read())
+
+    def test_get_next_token(self):
+        lexer = RegexLexer("x |> f")
+        self.assertEqual(lexer.get_next_token().type, TokenType.ID)
+        self.assertEqual(lexer.get_next_token().type, TokenType.PIPE)
+        self.assertEqual(lexer.get_next_token().value, "f")
+        self.assertEqual(lexer.get_next_token().type, TokenType.EOF)
+        self.assertEqual(lexer.get_next_token().type, TokenType.EOF)
+
+    def test_gestione_errori(self):
+        for text in ("&", "a | b", "let _x = 1;", "x = 1; @"):
+            with self.assertRaises(Exception) as cm:
+                list(RegexLexer(text).tokenize())
+            self.assertIn("Carattere non valido", str(cm.exception))
+
+    def test_sorgente_bytes(self):
+        with open(MENU_PATH) as f:
+            text = f.read()
+        self.assertEqual(token_pairs(RegexLexer(text.encode('ascii'))), token_pairs(Lexer(text)))
+
+    def test_tokenize_file_mmap(self):
+        stream = tokenize_file(MENU_PATH)
+        self.assertFalse(isinstance(stream, list))
+        with open(MENU_PATH) as f:
+            expected = token_pairs(Lexer(f.read()))
+        self.assertEqual([(tok.type, tok.value) for tok in stream], expected)
+
+    def test_tokenize_file_vuoto(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "vuoto.ae")
+            open(path, 'w').close()
+            self.assertEqual([tok.type for tok in tokenize_file(path)], [TokenType.EOF])
+
+    def test_posizione_errore(self):
+        with self.assertRaises(Exception) as cm:
+            list(RegexLexer("let x =  $").tokenize())
+        self.assertIn("alla posizione 9", str(cm.exception))
+
+class TestRelex(unittest.TestCase):
+
+    def setUp(self):
+        with open(MENU_PATH) as f:
+            self.text = f.read()
+        self.store = TokenStore.from_tokens(RegexLexer(self.text).tokenize(), self.text)
+
+    def assertMatchesFullLex(self, store):
+        expected = [(t.type, t.value, t.start, t.end) for t in RegexLexer(store.text).tokenize()][:-1]
+        actual = [(store.type_at(i), store.value_at(i), store.start(i), store.end(i))
+                  for i in range(len(store))]
+        self.assertEqual(actual, expected)
+
+    def test_fusione_token_adiacenti(self):
+        # "running" -> "running2" e "= 1" -> "== 1"
+        offset = self.text.index("running") + len("running")
+        relex(self.store, offset, 0, "2")
+        self.assertMatchesFullLex(self.store)
+        offset = self.store.text.index("= 1;")
+        relex(self.store, offset, 0, "=")
+        self.assertMatchesFullLex(self.store)
+
+    def test_cancellazione_e_sostituzione(self):
+        offset = self.text.index("calculate(choice")
+        relex(self.store, offset, len("calculate"), "f")
+        self.assertMatchesFullLex(self.store)
+        relex(self.store, 0, 6, "")
+        self.assertMatchesFullLex(self.store)
+        relex(self.store, len(self.store.text), 0, "\nfunc tail() { return 1; }")
+        self.assertMatchesFullLex(self.store)
+
+    def test_edit_casuali(self):
+        rng = random.Random(7)
+        alphabet = "ab1 =>|(){};\n-+*!<"
+        for _ in range(300):
+            text = self.store.text
+            offset = rng.randrange(len(text) + 1)
+            deleted = min(rng.choice([0, 0, 1, 3]), len(text) - offset)
+            inserted = "".join(rng.choice(alphabet) for _ in range(rng.choice([0, 1, 2])))
+            try:
+                relex(self.store, offset, deleted, inserted)
+            except Exception:
+                continue  # edit che produce un carattere non valido: store invariato
+            self.assertMatchesFullLex(self.store)
+
+    def test_errore_lascia_store_invariato(self):
+        before = [(t.type, t.start) for t in self.store]
+        with self.assertRaises(Exception):
+            relex(self.store, 10, 0, "$")
+        self.assertEqual([(t.type, t.start) for t in self.store], before)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
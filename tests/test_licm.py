@@ -0,0 +1,142 @@
+import unittest
+from src.hashcons import HashConsFactory
+from src.tokens import TokenType
+from src.licm import LoopInvariantMotion
+import src.ast_nodes as ast
+from support import analyze_body, function, PipelineTestCase
+
+HELPERS = """
+    extern func print(n);
+    extern pure func scale(n);
+    func sq(x) { return x * x; }
+    func ratio(x, y) { return x / y; }
+    func fact(n) { if (n < 2) { return 1; } return n * fact(n - 1); }
+"""
+
+def analyze(body, exprs=None):
+    return analyze_body(body, HELPERS, exprs)
+
+def hoisted(decl):
+    # Inizializzatori delle temporanee, nell'ordine in cui sono dichiarate
+    return [node.initializer for node in ast.walk(decl.body)
+            if isinstance(node, ast.VarDecl) and node.name.startswith("__licm")]
+
+def loops(decl):
+    return [node for node in ast.walk(decl.body) if isinstance(node, ast.WhileStmt)]
+
+class TestLicm(unittest.TestCase):
+    def test_condizione_e_corpo(self):
+        program = analyze("let s = 0; let i = 0; while (i < n * 2) { s = s + a * b; i = i + 1; } return s;")
+        decl = function(program)
+        frame_size = decl.frame_size
+        self.assertEqual(LoopInvariantMotion().run(decl), 2)
+        first, second = hoisted(decl)
+        self.assertEqual(first, ast.BinaryExpr(ast.VariableExpr("n"), first.operator, ast.LiteralExpr(2)))
+        self.assertEqual(second, ast.BinaryExpr(ast.VariableExpr("a"), second.operator, ast.VariableExpr("b")))
+        # Temporanee prima del ciclo, in nuovi slot del frame
+        statements = decl.body.statements
+        self.assertIsInstance(statements[4], ast.WhileStmt)
+        self.assertEqual([stmt.slot for stmt in statements[2:4]], [frame_size, frame_size + 1])
+        loop = statements[4]
+        self.assertEqual(loop.condition.right.name, statements[2].name)
+        self.assertEqual(loop.body.statements[0].expr.value.right.slot, frame_size + 1)
+
+    def test_variabili_assegnate_nel_ciclo(self):
+        program = analyze("let s = 0; let i = 0; "
+                          "while (i < 10) { let t = a + i; s = s + t * b; b = b + 1; i = i + 1; } return s;")
+        self.assertEqual(LoopInvariantMotion().run(function(program)), 0)
+
+    def test_chiamate_e_divisioni(self):
+        program = analyze("""
+            let s = 0; let i = 0;
+            while (i < 10) {
+                s = s + sq(a) + scale(b) + a / 2;
+                if (s > 5) { s = s + b / a + ratio(a, 2) + fact(3) + print(a); }
+                i = i + 1;
+            }
+            return s;
+        """)
+        decl = function(program)
+        LoopInvariantMotion().run(decl)
+        # Anticipate solo le espressioni che non possono fallire né avere effetti
+        first, second, third = hoisted(decl)
+        self.assertEqual([first.callee, second.callee], ["sq", "scale"])
+        self.assertEqual(third, ast.BinaryExpr(ast.VariableExpr("a"), TokenType.DIV, ast.LiteralExpr(2)))
+        remaining = [node.callee for node in ast.walk(loops(decl)[0]) if isinstance(node, ast.CallExpr)]
+        self.assertEqual(remaining, ["ratio", "fact", "print"])
+
+    def test_cicli_annidati(self):
+        program = analyze("""
+            let s = 0; let i = 0;
+            while (i < 10) { let j = 0; while (j < i) { s = s + a * b + j * i; j = j + 1; } i = i + 1; }
+            return s;
+        """)
+        decl = function(program)
+        LoopInvariantMotion().run(decl)
+        outer, inner = loops(decl)
+        # a * b esce da entrambi i cicli, j * i resta nel ciclo interno
+        self.assertEqual(len(hoisted(decl)), 2)
+        self.assertEqual(decl.body.statements[2].initializer,
+                         ast.BinaryExpr(ast.VariableExpr("a"), TokenType.MUL, ast.VariableExpr("b")))
+        self.assertTrue(any(isinstance(node, ast.BinaryExpr) and node.left == ast.VariableExpr("j")
+                            for node in ast.walk(inner.body)))
+
+    def test_contatore_del_repeat(self):
+        program = analyze("let s = 0; repeat (4) { s = s + a * b; } return s;")
+        decl = function(program)
+        LoopInvariantMotion().run(decl)
+        statements = decl.body.statements
+        loop = next(stmt for stmt in statements if isinstance(stmt, ast.WhileStmt))
+        index = statements.index(loop)
+        # Il contatore resta subito prima del ciclo per lo srotolamento
+        self.assertEqual(statements[index - 1].name, loop.condition.left.name)
+        self.assertTrue(statements[index - 2].name.startswith("__licm"))
+
+    def test_ciclo_non_piu_contato(self):
+        program = analyze("let s = 0; repeat (n) { s = s + a * b; } return s;")
+        decl = function(program)
+        loop = loops(decl)[0]
+        # Condizione ridotta a una variabile da un altro passo, counted ancora impostato
+        loop.condition = ast.VariableExpr(loop.condition.left.name)
+        self.assertEqual(LoopInvariantMotion().run(decl), 1)
+        self.assertTrue(decl.body.statements[-3].name.startswith("__licm"))
+
+    def test_espressioni_condivise(self):
+        exprs = HashConsFactory()
+        program = analyze("let s = a * b; let i = 0; while (i < a * b) { s = s + a * b; i = i + 1; } return s;", exprs)
+        decl = function(program)
+        shared = decl.body.statements[0].initializer
+        LoopInvariantMotion(exprs).run(decl)
+        # Una sola temporanea; il nodo condiviso fuori dal ciclo è intatto
+        self.assertEqual(hoisted(decl), [shared])
+        self.assertIs(decl.body.statements[0].initializer, shared)
+
+class TestPipeline(PipelineTestCase):
+    SOURCE = """
+        extern func print(n);
+        func main() {
+            let a = print(3);
+            let b = print(4);
+            let s = 0;
+            let i = 0;
+            while (i < a * b * 1000) { s = s + (a * b - 1) * i; i = i + 1; }
+            return s;
+        }
+    """
+
+    def test_repeat_con_return(self):
+        source = ("extern func print(n); extern func tick(); "
+                  "func main() { let a = tick(); repeat (tick() + 2) { print(a * 3); return 0; } return 0; }")
+        llvm_ir = self.compile(source, opt_level=2)
+        self.assertEqual(llvm_ir.count('call i64 @"print"'), 1)
+
+    def test_ciclo_senza_moltiplicazioni_invarianti(self):
+        moved = self.compile(self.SOURCE, opt_level=2)
+        kept = self.compile(self.SOURCE, opt_level=2, licm=False)
+        loop = lambda llvm_ir: llvm_ir.split("while_cond:")[1].split("while_after:")[0]
+        self.assertEqual(loop(kept).count(" mul "), 4)
+        # Resta solo quella per i
+        self.assertEqual(loop(moved).count(" mul "), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,86 @@
+import unittest
+from src.lexer import RegexLexer
+from src.parser import Parser
+from src.symbols import SymbolTable
+from src.desugaring import Desugarer
+from src.semantic_analysis import SemanticAnalyzer, SemanticError
+from src.optimizer import Optimizer
+from src.effects import infer_effects
+from src.middle_end import FusedMiddleEnd
+from src.codegen import LLVMCodeGen
+import src.ast_nodes as ast
+
+def parse(source, symbols):
+    return Parser(list(RegexLexer(source, symbols).tokenize()), symbols=symbols).parse()
+
+def sequential(source):
+    symbols = SymbolTable()
+    program = Desugarer(symbols).visit(parse(source, symbols))
+    SemanticAnalyzer(symbols).visit(program)
+    infer_effects(program)
+    return Optimizer().visit(program), symbols
+
+def fused(source):
+    symbols = SymbolTable()
+    return FusedMiddleEnd(symbols).visit(parse(source, symbols)), symbols
+
+class TestFusedMiddleEnd(unittest.TestCase):
+    SOURCE = """
+        extern func print(n);
+        func add(a, b) { return a + b * 1; }
+        func main() {
+            let x = 10 - 0;
+            repeat(2 + 1) { x = x |> add(1); }
+            let y = 4 |> (q) => q + (2 * 3);
+            if (1 < 2) { print(x); } else { print(0); }
+            if (x > 5) { print(-(-x)); }
+            while (0) { print(1); }
+            while (x > 0) { x = x - 1; repeat(x) { print(x |> add(1 + 1)); } }
+            return !0;
+        }
+    """
+
+    def test_stesso_ast(self):
+        expected, _ = sequential(self.SOURCE)
+        actual, _ = fused(self.SOURCE)
+        self.assertEqual(actual, expected)
+
+    def test_stesso_ir(self):
+        expected, expected_symbols = sequential(self.SOURCE)
+        actual, actual_symbols = fused(self.SOURCE)
+        self.assertEqual(LLVMCodeGen(actual_symbols).generate_code(actual),
+                         LLVMCodeGen(expected_symbols).generate_code(expected))
+
+    def test_errori_semantici(self):
+        invalid = [
+            "func main() { return y; }",
+            "func main() { y = 1; return 0; }",
+            "func f(a) { return a; } func main() { return f(1, 2); }",
+            "func f(a) { return a; } func main() { return 1 |> f(2); }",
+            "func main() { let z = 1; let f = (q) => q + z; return 0; }",
+            "func main() { let f = (q, q) => q; return 0; }",
+            "func main() { let f = (q) => q; return 0; }",
+            "func main() { return 1 |> (a) => (b) => a + c; }",
+            "func main() { return 1 |> (a) => 2 |> (b) => x; }",
+        ]
+        for source in invalid:
+            with self.assertRaises(SemanticError, msg=source) as expected:
+                sequential(source)
+            with self.assertRaises(SemanticError, msg=source) as actual:
+                fused(source)
+            self.assertEqual(str(actual.exception), str(expected.exception))
+
+    def test_let_globali_non_controllati(self):
+        source = "let g = undefined_name * (2 + 3); func main() { return 0; }"
+        expected, _ = sequential(source)
+        actual, _ = fused(source)
+        self.assertEqual(actual, expected)
+
+    def test_dispatch_per_classe(self):
+        fused(self.SOURCE)
+        method, step = FusedMiddleEnd._dispatch[ast.BinaryExpr]
+        self.assertIs(step, FusedMiddleEnd.visit_BinaryExpr.step)
+        self.assertIs(FusedMiddleEnd.resolve(ast.LazyBlock)[0], FusedMiddleEnd.visit_Block)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -36,6 +36,13 @@ class TestOptimizer(unittest.TestCase):
         with self.assertRaises(ZeroDivisionError):
             self.optimizer.visit(expr)
 
+    def test_fold_aritmetica_a_64_bit(self):
+        # Stessa semantica del codice generato: wrap-around e divisione troncata
+        expr = ast.BinaryExpr(ast.LiteralExpr(2 ** 62), TokenType.MUL, ast.LiteralExpr(2))
+        self.assertEqual(self.optimizer.visit(expr).value, -2 ** 63)
+        expr = ast.BinaryExpr(ast.LiteralExpr(-7), TokenType.DIV, ast.LiteralExpr(2))
+        self.assertEqual(self.optimizer.visit(expr).value, -3)
+
     def test_fold_confronto(self):
         # (MAGGIORE) 10 > 5 -> 1 (True)
         expr = ast.BinaryExpr(ast.LiteralExpr(10), TokenType.GT, ast.LiteralExpr(5))
@@ -101,6 +108,12 @@ class TestOptimizer(unittest.TestCase):
         self.assertIsInstance(res, ast.LiteralExpr)
         self.assertEqual(res.value, 0)
 
+    def test_moltiplicazione_zero_con_assegnamento(self):
+        # (x = 6) * 0 resta: l'assegnamento non può essere scartato
+        expr = ast.BinaryExpr(ast.AssignExpr("x", ast.LiteralExpr(6)), TokenType.MUL, ast.LiteralExpr(0))
+        res = self.optimizer.visit(expr)
+        self.assertIsInstance(res, ast.BinaryExpr)
+
     def test_moltiplicazione_uno(self):
         # x * 1 -> x
         expr = ast.BinaryExpr(ast.VariableExpr("x"), TokenType.MUL, ast.LiteralExpr(1))
@@ -156,5 +169,16 @@ class TestOptimizer(unittest.TestCase):
         res = self.optimizer.visit(stmt)
         self.assertIsNone(res)
 
+    def test_dead_code_dopo_return(self):
+        # { if (1) { return 1; } return 2; } -> { return 1; }
+        taken = ast.Block([ast.ReturnStmt(ast.LiteralExpr(1))])
+        block = ast.Block([
+            ast.IfStmt(ast.LiteralExpr(1), taken, None),
+            ast.ReturnStmt(ast.LiteralExpr(2))
+        ])
+        res = self.optimizer.visit(block)
+        self.assertEqual(res.statements, [ast.ReturnStmt(ast.LiteralExpr(1))])
+        self.assertEqual(self.optimizer.removed, 2)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,51 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+from src.options import CompileOptions, resolve_options
+from src.lexer import RegexLexer
+from src.symbols import SymbolTable
+import aether
+
+SOURCE = "extern func print(n); func main() { let s = 0; repeat(3) { s = s + 2; } print(s); return s; }"
+
+class TestOpzioni(unittest.TestCase):
+    def test_argomenti_con_nome(self):
+        options = CompileOptions(opt_level=2, exports=('f',))
+        self.assertIs(resolve_options(options, {}), options)
+        resolved = resolve_options(options, {'licm': False})
+        self.assertEqual((resolved.opt_level, resolved.licm), (2, False))
+        self.assertEqual(resolve_options(None, {}), CompileOptions())
+        with self.assertRaises(TypeError):
+            resolve_options(None, {'licm_': False})
+
+    def test_radici(self):
+        self.assertIsNone(CompileOptions(exports=('f',)).roots)
+        self.assertEqual(CompileOptions(prune=True, exports=('f',)).roots, ['main', 'f'])
+
+    def test_opzioni_ignorate(self):
+        self.assertEqual(CompileOptions(jobs=4, ast_cache='c').ignored(), [])
+        self.assertEqual(len(CompileOptions(lazy=True, jobs=4, ast_cache='c').ignored()), 2)
+        streamed = CompileOptions(lexer_kind='manual', jobs=4, ast_cache='c')
+        self.assertEqual(len(streamed.ignored(pretokenized=True, streaming=True)), 3)
+        # Da un TokenStore il parsing parallelo resta possibile
+        self.assertEqual(len(streamed.ignored(pretokenized=True)), 2)
+
+    def test_opzioni_di_o2(self):
+        self.assertEqual(CompileOptions(opt_level=2, unroll_budget=8, licm=False).ignored(), [])
+        self.assertEqual(CompileOptions(unroll_budget=CompileOptions().unroll_budget).ignored(), [])
+        messages = CompileOptions(unroll_budget=8, cse=False).ignored()
+        self.assertEqual([message.split()[0] for message in messages], ["--unroll-budget", "--no-cse"])
+        self.assertEqual(len(CompileOptions(opt_level=0, inline_budget=0, ctfe_budget=0).ignored()), 2)
+
+    def test_stesso_ir_dagli_ingressi(self):
+        options = CompileOptions(hash_cons=True, opt_level=2, inline_budget=0)
+        with redirect_stdout(io.StringIO()) as output:
+            expected = aether.compile_source(SOURCE, options)
+            self.assertEqual(aether.compile_source(SOURCE, hash_cons=True, opt_level=2, inline_budget=0), expected)
+            symbols = SymbolTable()
+            tokens = RegexLexer(SOURCE, symbols).tokenize()
+            self.assertEqual(aether.compile_tokens(tokens, options, symbols=symbols, jobs=2), expected)
+        self.assertIn("[AVVISO] -j ignorato", output.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
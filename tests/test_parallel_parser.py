@@ -0,0 +1,77 @@
+import pickle
+import unittest
+from src.lexer import RegexLexer
+from src.tokens import TokenStore, TokenType
+from src.parser import Parser
+from src.parallel_parser import declaration_starts, split_declarations, parse_parallel
+from src.hashcons import HashConsFactory
+import src.ast_nodes as ast
+
+def make_store(source):
+    return TokenStore.from_tokens(RegexLexer(source).tokenize(), source)
+
+class TestParallelParser(unittest.TestCase):
+    SOURCE = "extern func print(n);\nlet g = 1;\n" + "".join(
+        f"func f{i}(a) {{ let x = a + {i}; if (x > 2) {{ return x; }} return f{i}(x); }}\n"
+        for i in range(40)) + "func main() { return f0(1); }\n"
+
+    def test_confini_dichiarazioni(self):
+        store = make_store(self.SOURCE)
+        starts = declaration_starts(store.types)
+
+        self.assertEqual(len(starts), 43)
+        # 'func' dopo 'extern' e i 'let' locali non aprono una nuova dichiarazione
+        self.assertEqual(store.type_at(starts[0]), TokenType.EXTERN)
+        self.assertEqual(store.type_at(starts[1]), TokenType.LET)
+        self.assertTrue(all(store.type_at(i) == TokenType.FUNC for i in starts[2:]))
+
+    def test_blocchi_contigui(self):
+        store = make_store(self.SOURCE)
+        ranges = split_declarations(store, 8)
+
+        self.assertGreater(len(ranges), 1)
+        self.assertEqual(ranges[0][0], 0)
+        self.assertEqual(ranges[-1][1], len(store))
+        for (_, hi), (lo, _) in zip(ranges, ranges[1:]):
+            self.assertEqual(hi, lo)
+
+    def test_stesso_ast_del_parsing_sequenziale(self):
+        store = make_store(self.SOURCE)
+        expected = Parser(list(store)).parse()
+        self.assertEqual(parse_parallel(store, jobs=2), expected)
+
+    def test_hash_consing(self):
+        store = make_store(self.SOURCE)
+        expected = Parser(list(store), exprs=HashConsFactory()).parse()
+        program = parse_parallel(store, jobs=2, exprs=HashConsFactory())
+        self.assertEqual(program, expected)
+
+        # Stessa condivisione del parsing sequenziale: letterali tra le
+        # funzioni, variabili solo nel corpo della stessa funzione
+        shared = lambda root: len({id(node) for node in ast.walk(root)})
+        self.assertEqual(shared(program), shared(expected))
+        twos = {id(node) for node in ast.walk(program) if isinstance(node, ast.LiteralExpr) and node.value == 2}
+        self.assertEqual(len(twos), 1)
+        first, second = program.declarations[2], program.declarations[3]
+        variables = lambda decl: {id(node) for node in ast.walk(decl) if isinstance(node, ast.VariableExpr) and node.name == "x"}
+        self.assertEqual(len(variables(first)), 1)
+        self.assertFalse(variables(first) & variables(second))
+
+    def test_errore_come_sequenziale(self):
+        source = self.SOURCE.replace("func f30(a) { let x = a + 30;", "func f30(a) { let x = a + ;")
+        store = make_store(source)
+        with self.assertRaises(SyntaxError) as serial:
+            Parser(list(store), line_index=store.line_index).parse()
+        with self.assertRaises(SyntaxError) as parallel:
+            parse_parallel(store, jobs=2, line_index=store.line_index)
+        self.assertEqual(str(parallel.exception), str(serial.exception))
+
+    def test_pickle_dei_nodi(self):
+        program = Parser(list(make_store(self.SOURCE)), lazy=True).parse()
+        restored = pickle.loads(pickle.dumps(program))
+
+        self.assertEqual(restored, program)
+        self.assertIs(type(restored.declarations[2].body), ast.Block)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 from src.tokens import TokenType, Token
 from src.parser import Parser
+from src.lexer import RegexLexer
 import src.ast_nodes as ast
 
 class TestParser(unittest.TestCase):
@@ -255,5 +256,134 @@ class TestParser(unittest.TestCase):
         with self.assertRaises(SyntaxError): # Si aspetta LBRACE
             parser.parse_stmt()
 
+class TestParserStreaming(unittest.TestCase):
+    SOURCE = """
+        extern func print(n);
+        func add(a, b) { return a + b; }
+        func main() {
+            let x = 10;
+            repeat(3) { x = x |> add(1); }
+            let f = (y) => y * 2;
+            if (x > 5) { print(x); } else { print(0); }
+            return 0;
+        }
+    """
+
+    def test_stesso_ast_lista_e_generatore(self):
+        from_list = Parser(list(RegexLexer(self.SOURCE).tokenize())).parse()
+        from_stream = Parser(RegexLexer(self.SOURCE).tokenize()).parse()
+        self.assertEqual(from_list, from_stream)
+
+    def test_lookahead_limitato(self):
+        body = "".join(f"let v{i} = v{i - 1} + {i} * 2;" for i in range(1, 2000))
+        source = f"func main() {{ let v0 = 0; {body} return v0; }}"
+        parser = Parser(RegexLexer(source).tokenize())
+        program = parser.parse()
+
+        self.assertEqual(len(program.declarations[0].body.statements), 2001)
+        self.assertLessEqual(parser.lookahead.max_depth, 4)
+
+    def test_errore_con_riga_e_colonna(self):
+        from src.tokens import TokenStore
+        source = "func main() {\n  let x = 1\n  return x;\n}"
+        store = TokenStore.from_tokens(RegexLexer(source).tokenize(), source)
+        with self.assertRaises(SyntaxError) as cm:
+            Parser(store, line_index=store.line_index).parse()
+        self.assertIn("line 3, column 3", str(cm.exception))
+
+    def test_errore_in_streaming(self):
+        tokens = iter([Token(TokenType.LET), Token(TokenType.ID, "x"), Token(TokenType.ASSIGN),
+                       Token(TokenType.INTEGER, 5), Token(TokenType.EOF)])
+        with self.assertRaises(SyntaxError):
+            Parser(tokens).parse_decl()
+
+class TestParserPrecedenza(unittest.TestCase):
+
+    def parse_expr(self, source):
+        return Parser(RegexLexer(source + ";").tokenize()).parse_stmt().expr
+
+    def test_precedenza_mista(self):
+        # a || b == 1 + 2 * c - d  ->  a || (b == ((1 + (2 * c)) - d))
+        expected = ast.BinaryExpr(
+            ast.VariableExpr("a"), TokenType.OR,
+            ast.BinaryExpr(
+                ast.VariableExpr("b"), TokenType.EQ,
+                ast.BinaryExpr(
+                    ast.BinaryExpr(ast.LiteralExpr(1), TokenType.PLUS,
+                                   ast.BinaryExpr(ast.LiteralExpr(2), TokenType.MUL, ast.VariableExpr("c"))),
+                    TokenType.MINUS, ast.VariableExpr("d"))))
+        self.assertEqual(self.parse_expr("a || b == 1 + 2 * c - d"), expected)
+
+    def test_associativita_sinistra(self):
+        # 10 - 3 - 2  ->  (10 - 3) - 2
+        expected = ast.BinaryExpr(
+            ast.BinaryExpr(ast.LiteralExpr(10), TokenType.MINUS, ast.LiteralExpr(3)),
+            TokenType.MINUS, ast.LiteralExpr(2))
+        self.assertEqual(self.parse_expr("10 - 3 - 2"), expected)
+
+    def test_unario_e_relazionale(self):
+        # -a * b < c  ->  ((-a) * b) < c
+        expected = ast.BinaryExpr(
+            ast.BinaryExpr(ast.UnaryExpr(TokenType.MINUS, ast.VariableExpr("a")),
+                           TokenType.MUL, ast.VariableExpr("b")),
+            TokenType.LT, ast.VariableExpr("c"))
+        self.assertEqual(self.parse_expr("-a * b < c"), expected)
+
+    def test_gruppo_non_lambda(self):
+        self.assertEqual(self.parse_expr("((x))"), ast.VariableExpr("x"))
+        self.assertEqual(self.parse_expr("(x) + 1"),
+                         ast.BinaryExpr(ast.VariableExpr("x"), TokenType.PLUS, ast.LiteralExpr(1)))
+
+    def test_lambda_con_piu_parametri(self):
+        expected = ast.LambdaExpr(["a", "b"], ast.BinaryExpr(ast.VariableExpr("a"), TokenType.PLUS, ast.VariableExpr("b")))
+        self.assertEqual(self.parse_expr("(a, b) => a + b"), expected)
+
+    def test_lookahead_lambda_costante(self):
+        params = ", ".join(f"p{i}" for i in range(500))
+        parser = Parser(RegexLexer(f"let f = ({params}) => p0;").tokenize())
+        decl = parser.parse_decl()
+
+        self.assertEqual(len(decl.initializer.params), 500)
+        self.assertLessEqual(parser.lookahead.max_depth, 4)
+
+class TestParserPigro(unittest.TestCase):
+    SOURCE = TestParserStreaming.SOURCE + """
+        func unused(z) { let w = z * ; }
+    """
+
+    def test_corpi_non_analizzati(self):
+        source = TestParserStreaming.SOURCE
+        parser = Parser(list(RegexLexer(source).tokenize()), lazy=True)
+        program = parser.parse()
+
+        self.assertEqual(parser.bodies_parsed, 0)
+        self.assertIsInstance(program.declarations[1].body, ast.LazyBlock)
+        self.assertFalse(program.declarations[1].body.materialized)
+        # Al primo accesso il corpo coincide con quello del parsing completo
+        self.assertEqual(program, Parser(list(RegexLexer(source).tokenize())).parse())
+        self.assertEqual(parser.bodies_parsed, 2)
+
+    def test_errore_differito(self):
+        from src.tokens import TokenStore
+        store = TokenStore.from_tokens(RegexLexer(self.SOURCE).tokenize(), self.SOURCE)
+        program = Parser(store, line_index=store.line_index, lazy=True).parse()
+
+        unused = program.declarations[-1]
+        self.assertEqual(unused.name, "unused")
+        with self.assertRaises(SyntaxError):
+            unused.body.statements
+
+    def test_pigro_in_streaming(self):
+        program = Parser(RegexLexer(TestParserStreaming.SOURCE).tokenize(), lazy=True).parse()
+        expected = Parser(RegexLexer(TestParserStreaming.SOURCE).tokenize()).parse()
+        self.assertEqual(program, expected)
+
+    def test_visitor_su_lazy_block(self):
+        from src.desugaring import Desugarer
+        source = TestParserStreaming.SOURCE
+        lazy = Desugarer().visit(Parser(list(RegexLexer(source).tokenize()), lazy=True).parse())
+        eager = Desugarer().visit(Parser(list(RegexLexer(source).tokenize())).parse())
+        self.assertEqual(lazy, eager)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
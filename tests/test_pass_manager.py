@@ -0,0 +1,100 @@
+import io
+import unittest
+from contextlib import redirect_stdout
+from src.lexer import RegexLexer
+from src.parser import Parser
+from src.symbols import SymbolTable
+from src.desugaring import Desugarer
+from src.semantic_analysis import SemanticAnalyzer
+from src.options import CompileOptions
+from src.pass_manager import PassManager, Pass, FoldPass, EffectsPass, IcfPass, UnrollPass, ConstPropPass, InlinePass, PrunePass, LicmPass, CsePass, build_pipeline
+import src.ast_nodes as ast
+import aether
+
+SOURCE = """
+    extern func print(n);
+    func f(x) { if (0) { print(x); } return x; }
+    func g(x) { if (1) { return x * 2; } print(x); return 0; }
+    func main() { f(1); g(2); return f(3) + g(4 + 0); }
+"""
+
+def analyze(source):
+    symbols = SymbolTable()
+    program = Parser(list(RegexLexer(source, symbols).tokenize()), symbols=symbols).parse()
+    program = Desugarer(symbols).visit(program)
+    SemanticAnalyzer(symbols).visit(program)
+    return program
+
+def function(program, name):
+    return next(decl for decl in program.declarations if decl.name == name)
+
+class CountingPass(Pass):
+    # Passo di funzione che modifica ogni dichiarazione una sola volta
+    name = "conta"
+
+    def __init__(self):
+        self.seen = []
+
+    def run(self, decl, stats):
+        stats.count("visite")
+        self.seen.append(decl.name)
+        return self.seen.count(decl.name) == 1
+
+class TestPassManager(unittest.TestCase):
+    def test_punto_fisso(self):
+        program = analyze(SOURCE)
+        stats = PassManager([EffectsPass(), FoldPass()]).run(program)
+        # Codice morto dopo il return del ramo preso
+        self.assertEqual(len(function(program, "g").body.statements), 1)
+        # f e g diventano pure solo dopo l'eliminazione del codice morto:
+        # le chiamate inutilizzate in main sono rimosse al giro successivo
+        main = function(program, "main").body.statements
+        self.assertEqual(len(main), 1)
+        self.assertIsInstance(main[0], ast.ReturnStmt)
+        self.assertEqual(stats.rounds, 3)
+        self.assertEqual(stats.counters["fold"]["nodi semplificati"], 1)
+        self.assertEqual(stats.counters["fold"]["istruzioni rimosse"], 6)
+
+    def test_worklist(self):
+        program = analyze(SOURCE)
+        counting = CountingPass()
+        stats = PassManager([counting]).run(program)
+        # Primo giro su tutte le dichiarazioni, secondo solo su quelle modificate
+        self.assertEqual(counting.seen, ["f", "g", "main"] * 2)
+        self.assertEqual(stats.runs["conta"], 6)
+        self.assertEqual(stats.changes["conta"], 3)
+        self.assertEqual(stats.counters["conta"]["visite"], 6)
+
+    def test_pipeline(self):
+        kinds = lambda passes: [type(pass_) for pass_ in passes]
+        pipeline = lambda **options: kinds(build_pipeline(CompileOptions(**options)))
+        self.assertEqual(pipeline(opt_level=0), [])
+        simplify = [FoldPass, ConstPropPass]
+        # -O1: solo effetti e semplificazioni, anche con i budget dei passi di -O2
+        self.assertEqual(pipeline(), [EffectsPass, *simplify])
+        self.assertEqual(pipeline(prune=True, icf=True), [EffectsPass, *simplify, PrunePass, IcfPass])
+        self.assertEqual(pipeline(opt_level=2),
+                         [EffectsPass, *simplify, InlinePass, *simplify, LicmPass, CsePass, IcfPass, UnrollPass])
+        self.assertEqual(pipeline(opt_level=2, unroll_budget=0, inline_budget=0, licm=False, cse=False),
+                         [EffectsPass, *simplify, IcfPass])
+        self.assertEqual(pipeline(opt_level=2, prune=True, unroll_budget=0, inline_budget=0),
+                         [EffectsPass, *simplify, LicmPass, CsePass, PrunePass, IcfPass])
+        self.assertEqual(pipeline(opt_level=2, prune=True),
+                         [EffectsPass, *simplify, InlinePass, PrunePass, *simplify, LicmPass, CsePass, IcfPass, UnrollPass])
+        self.assertEqual(pipeline(opt_level=0, prune=True, icf=True)[1:], [IcfPass])
+
+    def test_livelli(self):
+        with redirect_stdout(io.StringIO()) as output:
+            unoptimized = aether.compile_source(SOURCE, opt_level=0)
+            optimized = aether.compile_source(SOURCE, stats=True)
+            self.assertEqual(aether.compile_source(SOURCE, fused=True), optimized)
+            inlined = aether.compile_source(SOURCE, opt_level=2, ctfe_budget=0)
+        self.assertIn("add i64 4, 0", unoptimized)
+        self.assertEqual(optimized.count("call i64"), 2)
+        # Corpi espansi, propagati e ripiegati: main restituisce una costante
+        self.assertEqual(inlined.count("call i64"), 0)
+        self.assertIn("ret i64 11", inlined)
+        self.assertIn("[STATISTICHE] fold", output.getvalue())
+
+if __name__ == '__main__':
+    unittest.main()
@@ -48,5 +48,45 @@ class TestSemanticAnalysis(unittest.TestCase):
             self.analyzer.visit(prog)
         self.assertIn("Parametro duplicato", str(cm.exception))
 
+    def test_slot_del_frame(self):
+        # func f(a, b) { let x = a; let y = b; let x = y; x = 1; return x; }
+        decl_x = ast.VarDecl("x", ast.VariableExpr("a"))
+        decl_y = ast.VarDecl("y", ast.VariableExpr("b"))
+        redecl_x = ast.VarDecl("x", ast.VariableExpr("y"))
+        assign = ast.AssignExpr("x", ast.LiteralExpr(1))
+        use = ast.VariableExpr("x")
+        func = ast.FunctionDecl("f", ["a", "b"], ast.Block([
+            decl_x, decl_y, redecl_x, ast.ExprStmt(assign), ast.ReturnStmt(use)
+        ]))
+        self.analyzer.visit(ast.Program([func]))
+
+        self.assertEqual(decl_x.initializer.slot, 0)
+        self.assertEqual(decl_y.initializer.slot, 1)
+        self.assertEqual((decl_x.slot, decl_y.slot), (2, 3))
+        # Scope piatto: la nuova 'let' riusa lo slot del nome
+        self.assertEqual(redecl_x.slot, 2)
+        self.assertEqual((assign.slot, use.slot), (2, 2))
+        self.assertEqual(func.frame_size, 4)
+
+    def test_slot_per_funzione(self):
+        # Lo stesso nome ha slot diversi in funzioni diverse
+        g_use = ast.VariableExpr("x")
+        f = ast.FunctionDecl("f", ["x"], ast.Block([ast.ReturnStmt(ast.VariableExpr("x"))]))
+        g = ast.FunctionDecl("g", ["a"], ast.Block([
+            ast.VarDecl("x", ast.LiteralExpr(1)), ast.ReturnStmt(g_use)
+        ]))
+        self.analyzer.visit(ast.Program([f, g]))
+        self.assertEqual(f.body.statements[0].value.slot, 0)
+        self.assertEqual(g_use.slot, 1)
+
+    def test_dichiarazione_risolta(self):
+        ext = ast.ExternDecl("print", ["n"])
+        call_expr = ast.CallExpr("print", [ast.LiteralExpr(1)])
+        main_func = ast.FunctionDecl("main", [], ast.Block([ast.ExprStmt(call_expr)]))
+        self.analyzer.visit(ast.Program([ext, main_func]))
+        self.assertIs(call_expr.decl, ext)
+        # La dichiarazione annotata non è un figlio della chiamata
+        self.assertEqual(list(ast.iter_child_nodes(call_expr)), call_expr.args)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
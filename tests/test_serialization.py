@@ -0,0 +1,145 @@
+import io
+import os
+import tempfile
+import unittest
+from contextlib import redirect_stdout
+from src.lexer import RegexLexer
+from src.parser import Parser
+from src.symbols import SymbolTable
+from src.desugaring import Desugarer
+from src.semantic_analysis import SemanticAnalyzer
+from src.optimizer import Optimizer
+from src.codegen import LLVMCodeGen
+from src.tokens import TokenStore
+from src.serialization import dumps, loads, cache_path, SerializationError, MAGIC
+import src.ast_nodes as ast
+import aether
+
+SOURCE = """
+    extern func print(n);
+    func add(a, b) { return a + b; }
+    func main() {
+        let x = -5 + 4294967296;
+        repeat(3) { x = x |> add(1); }
+        let f = 2 |> (q) => q * 2;
+        if (x > 1) { print(x); }
+        if (!x) { print(1); } else { print(0); }
+        while (x > 0) { x = x - 1; }
+        return -x;
+    }
+"""
+
+def parse(source, symbols=None, **kwargs):
+    tokens = list(RegexLexer(source, symbols).tokenize())
+    return Parser(tokens, symbols=symbols, **kwargs).parse()
+
+def generate_ir(program, symbols):
+    program = Desugarer(symbols).visit(program)
+    SemanticAnalyzer(symbols).visit(program)
+    program = Optimizer().visit(program)
+    return str(LLVMCodeGen(symbols).generate_code(program))
+
+class TestSerializzazione(unittest.TestCase):
+    def test_andata_e_ritorno(self):
+        program = parse(SOURCE + "let g = 7;")
+        self.assertEqual(loads(dumps(program)), program)
+
+    def test_interi_e_rami_vuoti(self):
+        for value in (0, 1, -1, 127, 128, -129, 2 ** 63, -(2 ** 70)):
+            node = ast.IfStmt(ast.LiteralExpr(value), ast.Block([]), None)
+            self.assertEqual(loads(dumps(node)), node)
+
+    def test_blocchi_pigri(self):
+        symbols = SymbolTable()
+        tokens = TokenStore.from_tokens(RegexLexer(SOURCE, symbols).tokenize(), SOURCE, symbols)
+        lazy = Parser(tokens, symbols=symbols, lazy=True).parse()
+        restored = loads(dumps(lazy))
+        self.assertEqual(restored, parse(SOURCE))
+        self.assertIs(type(restored.declarations[1].body), ast.Block)
+
+    def test_simboli_ricalcolati(self):
+        symbols = SymbolTable()
+        program = loads(dumps(parse(SOURCE)), symbols)
+        add = program.declarations[1]
+        self.assertEqual(add.sym, symbols.intern('add'))
+        self.assertEqual(add.param_syms, [symbols.intern('a'), symbols.intern('b')])
+        left = add.body.statements[0].value.left
+        self.assertEqual(left.sym, symbols.intern('a'))
+        self.assertIsNone(loads(dumps(parse(SOURCE))).declarations[1].param_syms)
+
+    def test_stesso_ir(self):
+        expected_symbols = SymbolTable()
+        expected = generate_ir(parse(SOURCE, expected_symbols), expected_symbols)
+        symbols = SymbolTable()
+        data = dumps(parse(SOURCE, SymbolTable()))
+        self.assertEqual(generate_ir(loads(data, symbols), symbols), expected)
+
+    def test_annidamento_profondo(self):
+        depth = 20000
+        source = "func main() { return " + "-" * depth + "1; }"
+        data = dumps(parse(source))
+        # Il confronto tra nodi è ricorsivo: si confrontano le codifiche
+        self.assertEqual(dumps(loads(data)), data)
+
+    def test_dati_non_validi(self):
+        data = dumps(parse(SOURCE))
+        with self.assertRaises(SerializationError):
+            loads(b'XXXXX' + data[len(MAGIC):])
+        with self.assertRaises(SerializationError):
+            loads(MAGIC + bytes([99]) + data[len(MAGIC) + 1:])
+        with self.assertRaises(SerializationError):
+            loads(data[:-3])
+
+    def test_dati_troncati(self):
+        # Ogni prefisso proprio, intestazione e ultimo varint compresi
+        data = dumps(parse(SOURCE))
+        for length in range(len(data)):
+            with self.subTest(length=length), self.assertRaises(SerializationError):
+                loads(data[:length])
+        with self.assertRaises(SerializationError):
+            loads(data + bytes([0x80]))
+
+    def test_nomi_non_utf8(self):
+        data = dumps(parse("func main() { let x = 1; return x; }"))
+        start = data.index(b'main')
+        with self.assertRaises(SerializationError):
+            loads(data[:start] + b'\xff\xfe\xfd\xfc' + data[start + 4:])
+
+class TestCacheAST(unittest.TestCase):
+    def compile(self, source, cache_dir):
+        with redirect_stdout(io.StringIO()):
+            return aether.compile_source(source, ast_cache=cache_dir)
+
+    def test_cache_riusata(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            first = self.compile(SOURCE, cache_dir)
+            path = cache_path(cache_dir, SOURCE)
+            self.assertTrue(os.path.exists(path))
+            self.assertEqual(self.compile(SOURCE, cache_dir), first)
+            self.assertIsNotNone(first)
+
+    def test_cache_corrotta(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            expected = self.compile(SOURCE, cache_dir)
+            with open(cache_path(cache_dir, SOURCE), 'wb') as f:
+                f.write(b'corrotto')
+            self.assertEqual(self.compile(SOURCE, cache_dir), expected)
+
+    def test_cache_troncata(self):
+        with tempfile.TemporaryDirectory() as cache_dir:
+            expected = self.compile(SOURCE, cache_dir)
+            path = cache_path(cache_dir, SOURCE)
+            with open(path, 'rb') as f:
+                data = f.read()
+            for damaged in (MAGIC, data[:len(data) // 2], data.replace(b'main', b'\xffain')):
+                with open(path, 'wb') as f:
+                    f.write(damaged)
+                self.assertEqual(self.compile(SOURCE, cache_dir), expected)
+            # Nessun file temporaneo rimasto dopo le riscritture
+            self.assertEqual(os.listdir(cache_dir), [os.path.basename(path)])
+
+    def test_chiave_dipende_dal_sorgente(self):
+        self.assertNotEqual(cache_path('c', SOURCE), cache_path('c', SOURCE + ' '))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import unittest
+import src.ast_nodes as ast
+from src.symbols import SymbolTable, ScopeMap
+from src.lexer import Lexer, RegexLexer
+from src.tokens import TokenType, TokenStore
+from src.parser import Parser
+from src.desugaring import Desugarer
+from src.semantic_analysis import SemanticAnalyzer, SemanticError
+from src.codegen import LLVMCodeGen
+
+SOURCE = """
+extern func print(n);
+func add(a, b) { return a + b; }
+func main() {
+    let x = 1;
+    x = x |> add(2);
+    print(x);
+    return 0;
+}
+"""
+
+def front_end(source, symbols):
+    tokens = TokenStore.from_tokens(RegexLexer(source, symbols).tokenize(), source, symbols)
+    program = Parser(tokens, symbols=symbols).parse()
+    return Desugarer(symbols).visit(program)
+
+class TestSymbolTable(unittest.TestCase):
+
+    def test_intern(self):
+        symbols = SymbolTable()
+        self.assertEqual(symbols.intern("x"), 0)
+        self.assertEqual(symbols.intern("y"), 1)
+        self.assertEqual(symbols.intern("x"), 0)
+        self.assertEqual(symbols.name(1), "y")
+        self.assertEqual(len(symbols), 2)
+        self.assertIn("x", symbols)
+
+    def test_scope_map_reset(self):
+        scope = ScopeMap()
+        scope.set(3, "a")
+        self.assertIn(3, scope)
+        self.assertEqual(scope.get(3), "a")
+        self.assertNotIn(0, scope)
+        self.assertNotIn(10, scope)
+
+        outer = scope.generation
+        scope.reset()
+        self.assertNotIn(3, scope)
+        scope.generation = outer
+        scope.reset()
+        # una generazione ripristinata non viene mai riutilizzata
+        self.assertNotIn(3, scope)
+
+class TestInterning(unittest.TestCase):
+
+    def test_lexer_assegna_id(self):
+        for lexer_cls in (Lexer, RegexLexer):
+            symbols = SymbolTable()
+            tokens = list(lexer_cls("let x = y + x;", symbols).tokenize())
+            self.assertIsNone(tokens[0].sym)  # keyword
+            self.assertEqual(tokens[1].sym, symbols.intern("x"))
+            self.assertEqual(tokens[3].sym, symbols.intern("y"))
+            self.assertEqual(tokens[5].sym, tokens[1].sym)
+
+    def test_id_sui_nodi(self):
+        symbols = SymbolTable()
+        program = front_end(SOURCE, symbols)
+        add, main = program.declarations[1], program.declarations[2]
+
+        self.assertEqual(add.sym, symbols.intern("add"))
+        self.assertEqual(add.param_syms, [symbols.intern("a"), symbols.intern("b")])
+        decl = main.body.statements[0]
+        self.assertEqual(decl.sym, symbols.intern("x"))
+        # la pipe desugarata mantiene l'id della funzione chiamata
+        call = main.body.statements[1].expr
+        self.assertEqual(call.sym, symbols.intern("add"))
+
+    def test_pipeline_con_tabella_condivisa(self):
+        symbols = SymbolTable()
+        program = front_end(SOURCE, symbols)
+        SemanticAnalyzer(symbols).visit(program)
+        shared_ir = LLVMCodeGen(symbols).generate_code(program)
+
+        local_ir = LLVMCodeGen().generate_code(front_end(SOURCE, None))
+        self.assertEqual(shared_ir, local_ir)
+
+    def test_scope_non_condiviso_tra_funzioni(self):
+        symbols = SymbolTable()
+        program = front_end("func f() { let x = 1; return x; } func g() { return x; }", symbols)
+        with self.assertRaises(SemanticError) as cm:
+            SemanticAnalyzer(symbols).visit(program)
+        self.assertIn("Variabile non definita: 'x'", str(cm.exception))
+
+    def test_nodi_senza_id(self):
+        # Nodi costruiti a mano: l'analizzatore interna i nomi al volo
+        symbols = SymbolTable()
+        func = ast.FunctionDecl("main", ["a"], ast.Block([ast.ReturnStmt(ast.VariableExpr("a"))]))
+        SemanticAnalyzer(symbols).visit(ast.Program([func]))
+        self.assertIn("a", symbols)
+
+if __name__ == '__main__':
+    unittest.main()
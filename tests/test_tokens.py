@@ -0,0 +1,62 @@
+import unittest
+from src.tokens import TokenType, Token, TokenStore, LineIndex
+from src.lexer import Lexer, RegexLexer
+
+SOURCE = "func main() {\n    let x = 10;\n    return x |> f;\n}\n"
+
+class TestTokenStore(unittest.TestCase):
+
+    def test_round_trip(self):
+        tokens = list(RegexLexer(SOURCE).tokenize())
+        store = TokenStore.from_tokens(tokens, SOURCE)
+
+        self.assertEqual(len(store), len(tokens) - 1)  # EOF escluso
+        for tok, stored in zip(tokens, store):
+            self.assertEqual((stored.type, stored.value, stored.start, stored.end),
+                             (tok.type, tok.value, tok.start, tok.end))
+        self.assertEqual(store[4].value, "{")
+        self.assertEqual(store.type_at(8), TokenType.INTEGER)
+        self.assertEqual(store.value_at(8), 10)
+
+    def test_valori_internati(self):
+        store = TokenStore.from_tokens(RegexLexer("x + x + 1").tokenize())
+        self.assertEqual(store.values[0], store.values[2])
+        self.assertNotEqual(store.values[1], store.values[4])
+        self.assertEqual(len(store.value_table), 3)
+
+    def test_posizioni_token(self):
+        store = TokenStore.from_tokens(RegexLexer(SOURCE).tokenize(), SOURCE)
+        # 'let' è il sesto token, seconda riga colonna 5
+        self.assertEqual(store.value_at(5), "let")
+        self.assertEqual(store.location(5), (2, 5))
+        self.assertEqual(SOURCE[store.starts[5]:store.ends[5]], "let")
+
+    def test_span_lexer_manuale(self):
+        manual = [(t.start, t.end) for t in Lexer(SOURCE).tokenize()]
+        regex = [(t.start, t.end) for t in RegexLexer(SOURCE).tokenize()]
+        self.assertEqual(manual, regex)
+
+class TestLineIndex(unittest.TestCase):
+
+    def test_location(self):
+        index = LineIndex("ab\ncd\n\nef")
+        self.assertEqual(index.location(0), (1, 1))
+        self.assertEqual(index.location(2), (1, 3))
+        self.assertEqual(index.location(3), (2, 1))
+        self.assertEqual(index.location(6), (3, 1))
+        self.assertEqual(index.location(8), (4, 2))
+
+    def test_sorgente_bytes(self):
+        index = LineIndex(b"a\nb")
+        self.assertEqual(index.describe(2), "line 2, column 1")
+
+class TestToken(unittest.TestCase):
+
+    def test_token_senza_dict(self):
+        tok = Token(TokenType.ID, "x")
+        self.assertFalse(hasattr(tok, '__dict__'))
+        self.assertIsNone(tok.start)
+        self.assertEqual(repr(tok), "Token(ID, 'x')")
+
+if __name__ == '__main__':
+    unittest.main()
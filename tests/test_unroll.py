@@ -0,0 +1,150 @@
+import ctypes
+import io
+import unittest
+from contextlib import redirect_stdout
+import llvmlite.binding as llvm
+from src.lexer import RegexLexer
+from src.parser import Parser
+from src.symbols import SymbolTable
+from src.desugaring import Desugarer
+from src.semantic_analysis import SemanticAnalyzer
+from src.optimizer import Optimizer
+from src.unroll import unroll_loops, counter_name
+import src.ast_nodes as ast
+import aether
+
+def analyze(body):
+    source = "extern func print(n); func main() { let s = 0; " + body + " return s; }"
+    symbols = SymbolTable()
+    program = Parser(list(RegexLexer(source, symbols).tokenize()), symbols=symbols).parse()
+    program = Desugarer(symbols).visit(program)
+    SemanticAnalyzer(symbols).visit(program)
+    return Optimizer().visit(program)
+
+def execute(source, **options):
+    # Risultato di main e valori passati a print, eseguendo l'IR con MCJIT
+    printed = []
+    callback = ctypes.CFUNCTYPE(ctypes.c_int64, ctypes.c_int64)(lambda n: printed.append(n) or 0)
+    llvm.initialize_native_target()
+    llvm.initialize_native_asmprinter()
+    llvm.add_symbol("print", ctypes.cast(callback, ctypes.c_void_p).value)
+    with redirect_stdout(io.StringIO()):
+        llvm_ir = aether.compile_source(source, **options)
+    module = llvm.parse_assembly(llvm_ir.replace("x86_64-pc-windows-gnu", llvm.get_process_triple()))
+    engine = llvm.create_mcjit_compiler(module, llvm.Target.from_default_triple().create_target_machine())
+    engine.finalize_object()
+    result = ctypes.CFUNCTYPE(ctypes.c_int64)(engine.get_function_address("main"))()
+    return result, printed
+
+def main_statements(program):
+    return program.declarations[-1].body.statements
+
+def calls(program):
+    return sum(isinstance(node, ast.CallExpr) for node in ast.walk(program))
+
+class TestSrotolamento(unittest.TestCase):
+    def test_srotolamento_completo(self):
+        program = analyze("repeat(2 * 10) { print(s); }")
+        self.assertEqual(unroll_loops(program), (1, 0))
+        statements = main_statements(program)
+        # Niente contatore né ciclo: solo le 20 chiamate
+        self.assertEqual(len(statements), 22)
+        self.assertFalse(any(isinstance(stmt, ast.WhileStmt) for stmt in statements))
+        self.assertEqual(sum(isinstance(stmt, ast.VarDecl) for stmt in statements), 1)
+        self.assertEqual(calls(program), 20)
+
+    def test_copie_indipendenti(self):
+        program = analyze("repeat(3) { print(s + 1); }")
+        unroll_loops(program)
+        first, second = [stmt.expr for stmt in main_statements(program)[1:3]]
+        self.assertIsNot(first, second)
+        self.assertIsNot(first.args[0], second.args[0])
+        # Le annotazioni sono condivise
+        self.assertIs(first.decl, second.decl)
+        self.assertEqual(first.args[0].left.slot, second.args[0].left.slot)
+
+    def test_srotolamento_parziale(self):
+        # Corpo di 8 nodi, 10 iterazioni: 4 copie per iterazione e 2 in coda
+        program = analyze("repeat(10) { s = s + 1; print(s); }")
+        self.assertEqual(unroll_loops(program), (0, 1))
+        statements = main_statements(program)
+        loop = next(stmt for stmt in statements if isinstance(stmt, ast.WhileStmt))
+        self.assertTrue(loop.counted)
+        self.assertEqual(loop.condition.right.value, 8)
+        self.assertEqual(loop.body.statements[-1].expr.value.right.value, 4)
+        self.assertEqual(len(loop.body.statements), 9)
+        self.assertEqual(len(statements[statements.index(loop) + 1:-1]), 4)
+
+    def test_budget(self):
+        program = analyze("repeat(3) { print(s); }")
+        self.assertEqual(unroll_loops(program, budget=5), (0, 0))
+        # Conteggio non costante: il ciclo resta
+        program = analyze("repeat(s) { print(s); }")
+        self.assertEqual(unroll_loops(program), (0, 0))
+
+    def test_corpo_vuoto(self):
+        program = analyze("repeat(1000000000) { }")
+        self.assertEqual(unroll_loops(program), (1, 0))
+        # Né ciclo né contatore
+        self.assertEqual(len(main_statements(program)), 2)
+
+    def test_corpo_morto_con_molte_iterazioni(self):
+        # Il corpo svuotato dall'ottimizzazione non viene ripetuto a compile time
+        for body in ("", "let t = 1;"):
+            source = f"func main() {{ repeat(1000000000) {{ {body} }} return 0; }}"
+            with self.subTest(body=body):
+                with redirect_stdout(io.StringIO()):
+                    llvm_ir = aether.compile_source(source, opt_level=2)
+                self.assertNotIn("repeat_body", llvm_ir)
+                self.assertEqual(execute(source, opt_level=2), (0, []))
+
+    def test_cicli_annidati(self):
+        program = analyze("repeat(2) { repeat(3) { print(s); } }")
+        self.assertEqual(unroll_loops(program), (2, 0))
+        self.assertEqual(calls(program), 6)
+
+    def test_stesso_ir_tra_le_modalita(self):
+        source = ("extern func print(n); func main() { let s = 1; "
+                  "repeat(10) { let t = s * 2; print(t); s = s + t; } "
+                  "repeat(2) { repeat(3) { print(s); } } return s; }")
+        with redirect_stdout(io.StringIO()):
+            llvm_ir = aether.compile_source(source, opt_level=2)
+            self.assertEqual(aether.compile_source(source, opt_level=2, fused=True, hash_cons=True), llvm_ir)
+            self.assertNotEqual(aether.compile_source(source, opt_level=2, unroll_budget=0), llvm_ir)
+        llvm.parse_assembly(llvm_ir).verify()
+
+class TestCicliRiscritti(unittest.TestCase):
+    # Corpi che terminano con un return: l'incremento del contatore è codice
+    # morto e la condizione può diventare costante
+    SOURCES = [
+        "extern func print(n); func main() { let x = 2; repeat(3) { print(x); return 0; } return 0; }",
+        "extern func print(n); func main() { let x = 2; repeat(3) { print(x); if (x > 1) { return 0; } } return 0; }",
+    ]
+
+    def test_forma_non_contata(self):
+        program = analyze("repeat(3) { print(s); }")
+        loop = next(stmt for stmt in main_statements(program) if isinstance(stmt, ast.WhileStmt))
+        self.assertIsNotNone(counter_name(loop))
+        loop.condition = ast.LiteralExpr(1)
+        self.assertIsNone(counter_name(loop))
+        self.assertEqual(unroll_loops(program), (0, 0))
+
+    def test_incremento_dopo_il_return(self):
+        # Il folding toglie l'incremento, irraggiungibile: il ciclo non è più contato
+        program = analyze("repeat(3) { print(s); return 0; }")
+        loop = next(stmt for stmt in main_statements(program) if isinstance(stmt, ast.WhileStmt))
+        self.assertIsInstance(loop.body.statements[-1], ast.ReturnStmt)
+        self.assertFalse(loop.counted)
+        self.assertEqual(unroll_loops(program), (0, 0))
+        self.assertEqual(execute(self.SOURCES[0], opt_level=2, inline_budget=0, ctfe_budget=0, licm=False, cse=False),
+                         (0, [2]))
+
+    def test_return_nel_corpo(self):
+        for source in self.SOURCES:
+            for options in ({}, dict(opt_level=0), dict(opt_level=2), dict(opt_level=2, fused=True, hash_cons=True),
+                            dict(opt_level=2, ctfe_budget=0)):
+                with self.subTest(source=source, options=options):
+                    self.assertEqual(execute(source, **options), (0, [2]))
+
+if __name__ == '__main__':
+    unittest.main()